@@ -19,7 +19,18 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.packages.cleanup.cleanup import cleanup
+from app.packages.caching.file_id_filter import (
+    DEFAULT_FILE_FILTER_REBUILD_INTERVAL,
+    refresh_file_id_filter,
+)
+from app.get_configuration import get_config
 from app.packages.tokens.get_secret_key import get_secret_key
+from app.packages.storage_driver.storage_executor import shutdown_storage_executor
+from app.packages.storage_driver.get_storage_backend import (
+    get_storage_backend,
+    close_storage_backends,
+)
+from app.packages.mime.detect_mimetype import shutdown_mime_executor
 from app.limiter import limiter
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -29,6 +40,9 @@ import asyncio
 # Import routers
 from app.routers.files import router as files_router
 from app.routers.users import router as users_router
+from app.routers.uploads import router as uploads_router
+from app.routers.metrics import router as metrics_router
+from app.routers.admin import router as admin_router
 
 # Configure logging
 logging.basicConfig(
@@ -38,14 +52,23 @@ logging.basicConfig(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Resolve the storage backend up front, so that a bad configuration fails now
+    get_storage_backend()
     await cleanup_scheduler()
+    await file_id_filter_scheduler()
     await set_secret_key()
     yield
+    await close_storage_backends()
+    shutdown_storage_executor()
+    shutdown_mime_executor()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(files_router, prefix="/files")
 app.include_router(users_router, prefix="/users")
+app.include_router(uploads_router, prefix="/uploads")
+app.include_router(metrics_router, prefix="/metrics")
+app.include_router(admin_router, prefix="/admin")
 
 # This is necessary to handle Rate Limit Exceeded error properly.
 app.state.limiter = limiter
@@ -70,3 +93,16 @@ async def cleanup_scheduler():
     scheduler = AsyncIOScheduler()
     scheduler.add_job(cleanup, IntervalTrigger(minutes=5))
     scheduler.start()
+
+
+# Build the file ID filter, then rebuild it at the configured interval
+async def file_id_filter_scheduler():
+    interval = get_config().get(
+        "file_filter_rebuild_interval", DEFAULT_FILE_FILTER_REBUILD_INTERVAL
+    )
+    if interval <= 0:
+        return
+    await refresh_file_id_filter()
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(refresh_file_id_filter, IntervalTrigger(seconds=interval))
+    scheduler.start()
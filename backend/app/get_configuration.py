@@ -12,16 +12,67 @@ the MIT License. See the LICENSE file for more details.
 
 import os
 import json
+import time
+import logging
+from types import MappingProxyType
+from app.packages.responses.offload_response import OFFLOAD_MODES
+from app.packages.storage_driver.s3_settings import MIN_S3_PART_SIZE
 
+logger = logging.getLogger(__name__)
 
-def get_config():
+# Seconds for which a loaded config is trusted before its file is checked for changes
+CONFIG_CHECK_INTERVAL = 1.0
+
+# Loaded configs by path, each as (config, (mtime_ns, size), time last checked)
+_config_snapshots = {}
+
+
+def get_config_path():
     config_path = os.environ.get("CONFIG_PATH")
     # If a config_path is not specified in the environment variables, use the default config
     if config_path is None:
         config_path = os.path.join(
             os.path.dirname(os.path.dirname(__file__)), "config.json"
         )
-    elif not os.path.exists(config_path):
+    return config_path
+
+
+def get_config():
+    """
+    Get the current configuration, which is read-only and shared between callers.
+
+    The config file is loaded once and checked for changes at most once every
+    CONFIG_CHECK_INTERVAL seconds. A changed file replaces the config only once
+    it has been validated, so an invalid edit leaves the previous config in place.
+    """
+    config_path = get_config_path()
+    snapshot = _config_snapshots.get(config_path)
+    now = time.monotonic()
+    if snapshot is not None and now - snapshot[2] < CONFIG_CHECK_INTERVAL:
+        return snapshot[0]
+
+    try:
+        stat = os.stat(config_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if snapshot is not None and snapshot[1] == version:
+            _config_snapshots[config_path] = (snapshot[0], version, now)
+            return snapshot[0]
+        config = load_config(config_path)
+    except Exception as e:
+        if snapshot is None:
+            raise
+        logger.error(f"Keeping the previous config, as reloading it failed: {e}")
+        _config_snapshots[config_path] = (snapshot[0], snapshot[1], now)
+        return snapshot[0]
+
+    _config_snapshots[config_path] = (config, version, now)
+    if snapshot is not None:
+        logger.info(f"Reloaded the config from {config_path}")
+    return config
+
+
+def load_config(config_path: str):
+    if not os.path.exists(config_path):
         raise FileNotFoundError(f"Config file was not found at {config_path}")
     elif not os.path.isfile(config_path):
         raise IsADirectoryError(
@@ -46,7 +97,10 @@ def get_config():
         raise e
 
     if is_config_valid(config):
-        return config
+        # Allow-lists are looked up on every upload, so hold them as sets
+        config["allowed_mimetypes"] = frozenset(config["allowed_mimetypes"])
+        config["allowed_extensions"] = frozenset(config["allowed_extensions"])
+        return MappingProxyType(config)
 
 
 def is_config_valid(config):
@@ -74,4 +128,180 @@ def is_config_valid(config):
     ):
         raise ValueError("'filesize_limit'' must be an integer greater than 0.")
 
+    # Check if the optional storage thread count is an integer greater than 0
+    if "storage_threads" in config and (
+        not isinstance(config["storage_threads"], int) or config["storage_threads"] <= 0
+    ):
+        raise ValueError("'storage_threads' must be an integer greater than 0.")
+
+    # Check if the optional storage mode is one of the supported modes
+    if config.get("storage_mode", "flat") not in ["flat", "content_addressed"]:
+        raise ValueError("'storage_mode' must be 'flat' or 'content_addressed'.")
+
+    # Check if the optional upload expiry is an integer greater than 0
+    if "upload_expiry" in config and (
+        not isinstance(config["upload_expiry"], int) or config["upload_expiry"] <= 0
+    ):
+        raise ValueError("'upload_expiry' must be an integer greater than 0.")
+
+    # Check if the optional download chunk size is an integer greater than 0
+    if "download_chunk_size" in config and (
+        not isinstance(config["download_chunk_size"], int)
+        or config["download_chunk_size"] <= 0
+    ):
+        raise ValueError("'download_chunk_size' must be an integer greater than 0.")
+
+    # Check if the optional download readahead is an integer of at least 0
+    if "download_readahead" in config and (
+        not isinstance(config["download_readahead"], int)
+        or config["download_readahead"] < 0
+    ):
+        raise ValueError("'download_readahead' must be an integer of at least 0.")
+
+    # Check if the optional file cache sizes are integers of at least 0
+    for field in ["file_cache_size", "file_cache_max_file_size"]:
+        if field in config and (
+            not isinstance(config[field], int) or config[field] < 0
+        ):
+            raise ValueError(f"'{field}' must be an integer of at least 0.")
+
+    # Check if the optional cache, filter and index settings are integers of at least 0
+    for field in [
+        "metadata_cache_ttl",
+        "metadata_negative_ttl",
+        "metadata_cache_size",
+        "file_filter_rebuild_interval",
+        "file_filter_refresh_interval",
+    ]:
+        if field in config and (
+            not isinstance(config[field], int) or config[field] < 0
+        ):
+            raise ValueError(f"'{field}' must be an integer of at least 0.")
+
+    # Check if the optional purging of files missing from storage is a boolean
+    if "purge_missing_files" in config and not isinstance(
+        config["purge_missing_files"], bool
+    ):
+        raise ValueError("'purge_missing_files' must be a boolean.")
+
+    # Check if the optional limit on the fraction of files purged at once is from 0 to 1
+    if "purge_missing_limit" in config and (
+        not isinstance(config["purge_missing_limit"], (int, float))
+        or isinstance(config["purge_missing_limit"], bool)
+        or not 0 <= config["purge_missing_limit"] <= 1
+    ):
+        raise ValueError("'purge_missing_limit' must be a number from 0 to 1.")
+
+    # Check if the optional storage backend is supported
+    if config.get("storage_backend", "local") not in [
+        "local",
+        "memory",
+        "s3",
+        "erasure_coded",
+    ]:
+        raise ValueError(
+            "'storage_backend' must be 'local', 'memory', 's3' or 'erasure_coded'."
+        )
+
+    # Check if the object store is given for the 's3' storage backend
+    if config.get("storage_backend") == "s3":
+        for field in ["s3_endpoint_url", "s3_bucket"]:
+            if not isinstance(config.get(field), str):
+                raise ValueError(f"'{field}' must be set for the 's3' storage backend.")
+    for field in ["s3_prefix", "s3_region"]:
+        if field in config and not isinstance(config[field], str):
+            raise ValueError(f"'{field}' must be a string.")
+
+    # Check if the optional object store connection and upload settings are integers
+    # greater than 0
+    for field in [
+        "s3_max_connections",
+        "s3_multipart_threshold",
+        "s3_upload_concurrency",
+    ]:
+        if field in config and (
+            not isinstance(config[field], int) or config[field] <= 0
+        ):
+            raise ValueError(f"'{field}' must be an integer greater than 0.")
+
+    # Check if the optional part size is one S3 accepts, which is at least 5 MiB
+    if "s3_part_size" in config and (
+        not isinstance(config["s3_part_size"], int)
+        or config["s3_part_size"] < MIN_S3_PART_SIZE
+    ):
+        raise ValueError(
+            f"'s3_part_size' must be an integer of at least {MIN_S3_PART_SIZE}."
+        )
+
+    # Check if the optional storage roots each have a path, and a weight of at least 0
+    if "storage_roots" in config:
+        storage_roots = config["storage_roots"]
+        if not isinstance(storage_roots, list) or not all(
+            isinstance(root, dict)
+            and isinstance(root.get("path"), str)
+            and (
+                root.get("weight") is None
+                or (isinstance(root["weight"], (int, float)) and root["weight"] >= 0)
+            )
+            for root in storage_roots
+        ):
+            raise ValueError(
+                "'storage_roots' must be a list of roots, each with a 'path' and an optional 'weight' of at least 0."
+            )
+        if storage_roots and config.get("storage_backend", "local") not in [
+            "local",
+            "erasure_coded",
+        ]:
+            raise ValueError(
+                "'storage_roots' requires the 'local' or 'erasure_coded' storage backend."
+            )
+        if len(storage_roots) > 1 and "download_offload_location" in config:
+            raise ValueError(
+                "'download_offload_location' cannot be used with several 'storage_roots'."
+            )
+
+    # Check if the optional erasure coding has at least one data and one parity shard,
+    # and if there is a storage root for each shard of the 'erasure_coded' backend
+    erasure_coding = config.get("erasure_coding", {})
+    if not isinstance(erasure_coding, dict) or not all(
+        isinstance(erasure_coding.get(field, 1), int)
+        and erasure_coding.get(field, 1) > 0
+        for field in ["data_shards", "parity_shards"]
+    ):
+        raise ValueError(
+            "'erasure_coding' must be an object whose 'data_shards' and 'parity_shards' are integers greater than 0."
+        )
+    shard_count = erasure_coding.get("data_shards", 4) + erasure_coding.get(
+        "parity_shards", 2
+    )
+    if shard_count > 256:
+        raise ValueError("'erasure_coding' can have at most 256 shards.")
+    if config.get("storage_backend") == "erasure_coded" and (
+        len(config.get("storage_roots") or []) < shard_count
+    ):
+        raise ValueError(
+            f"'storage_roots' must have at least {shard_count} roots for the 'erasure_coded' storage backend."
+        )
+
+    # Check if the optional storage layout is supported
+    if config.get("storage_layout", "flat") not in ["flat", "sharded"]:
+        raise ValueError("'storage_layout' must be 'flat' or 'sharded'.")
+
+    # Check if the optional download offload mode is supported, and has a location
+    if config.get("download_offload", "none") not in OFFLOAD_MODES:
+        raise ValueError(
+            "'download_offload' must be 'none', 'x_accel_redirect' or 'x_sendfile'."
+        )
+    if config.get("download_offload") == "x_accel_redirect" and not isinstance(
+        config.get("download_offload_location"), str
+    ):
+        raise ValueError(
+            "'download_offload_location' must be set for 'x_accel_redirect'."
+        )
+    if (
+        config.get("download_offload", "none") != "none"
+        and config.get("storage_backend", "local") != "local"
+    ):
+        raise ValueError("'download_offload' requires the 'local' storage backend.")
+
     return True
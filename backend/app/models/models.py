@@ -10,9 +10,9 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.ext.asyncio import AsyncEngine
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, true
 from app.database import Base
 from sqlalchemy.orm import relationship
 
@@ -32,7 +32,56 @@ class File(Base):
     size = Column(Integer, nullable=False, index=True)
     upload_datetime = Column(DateTime, server_default=func.now())
     lifetime = Column(Integer, nullable=False, index=True, default=3600)
+    sha256 = Column(String, nullable=True)
+    # Whether the file's binary was present in storage when last reconciled
+    is_file_available = Column(
+        Boolean, nullable=False, default=True, server_default=true(), index=True
+    )
+    # When the file's binary was first found missing, while it has not returned
+    missing_since = Column(DateTime, nullable=True)
+    blob_sha256 = Column(String, ForeignKey("blobs.sha256"), nullable=True, index=True)
     owner = relationship("User", back_populates="files")
+    blob = relationship("Blob", back_populates="files")
+
+    # Indexes which serve the listing's keyset pagination, for each sort order and
+    # for the filters which narrow it
+    __table_args__ = (
+        Index("ix_files_upload_datetime_id", "upload_datetime", "id"),
+        Index("ix_files_size_id", "size", "id"),
+        Index(
+            "ix_files_owner_username_upload_datetime_id",
+            "owner_username",
+            "upload_datetime",
+            "id",
+        ),
+        Index(
+            "ix_files_mimetype_upload_datetime_id", "mimetype", "upload_datetime", "id"
+        ),
+    )
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+    sha256 = Column(String, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    reference_count = Column(Integer, nullable=False, default=0)
+    files = relationship("File", back_populates="blob")
+
+
+class Upload(Base):
+    __tablename__ = "uploads"
+    id = Column(String, primary_key=True, index=True)
+    owner_username = Column(String, ForeignKey("users.username"))
+    original_filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    offset = Column(Integer, nullable=False, default=0)
+    created_datetime = Column(DateTime, server_default=func.now())
+    updated_datetime = Column(
+        DateTime, server_default=func.now(), onupdate=func.now(), index=True
+    )
+    owner = relationship("User", back_populates="uploads")
 
 
 class User(Base):
@@ -42,3 +91,4 @@ class User(Base):
     hashed_token = Column(String, default=None)
     is_admin = Column(Boolean, default=False)
     files = relationship("File", back_populates="owner")
+    uploads = relationship("Upload", back_populates="owner")
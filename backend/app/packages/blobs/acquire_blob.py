@@ -0,0 +1,54 @@
+"""
+blobs/acquire_blob.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Store a staged upload as a content-addressed blob, reusing an identical blob if
+one is already held
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Blob
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.storage_writer import StorageWriter
+
+
+async def acquire_blob(db: AsyncSession, writer: StorageWriter):
+    """
+    Take a reference to the blob of the upload's content and return the blob, which
+    is created for the first copy of the content.
+
+    The reference is counted by a single upsert, so that concurrent uploads of the
+    same content each count once. The upsert holds the blob's row until the upload
+    is committed, so that a release of its last reference cannot remove the binary
+    in the meantime. A blob whose only reference is this one may have had its
+    binary removed, so the upload is stored as the binary.
+    """
+    result = await db.execute(
+        insert(Blob)
+        .values(
+            sha256=writer.sha256,
+            filename=writer.sha256,
+            size=writer.size,
+            reference_count=1,
+        )
+        .on_conflict_do_update(
+            index_elements=[Blob.sha256],
+            set_={"reference_count": Blob.reference_count + 1},
+        )
+        .returning(Blob.reference_count)
+    )
+    reference_count = result.scalar_one()
+    blob = await db.get(Blob, writer.sha256, populate_existing=True)
+
+    # The content is already held, so drop the new copy unless the binary is missing
+    if reference_count > 1 and await get_storage_backend().is_present(blob.filename):
+        await writer.discard()
+    else:
+        await writer.commit(blob.filename)
+    return blob
@@ -0,0 +1,64 @@
+"""
+blobs/release_file_binary.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Release a file's claim on its binary, removing the binary from storage once
+nothing references it
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from sqlalchemy import update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Blob
+from app.models.models import File as FileModel
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+
+
+async def release_file_binary(db: AsyncSession, file: FileModel):
+    """
+    Release a file's reference to its blob, in the transaction which deletes the
+    file. The count is decremented in the database, so that concurrent releases and
+    uploads of the same content each count. Nothing is removed from storage until
+    remove_released_binary() is called once the transaction is committed.
+    """
+    if file.blob_sha256 is not None:
+        await db.execute(
+            update(Blob)
+            .where(Blob.sha256 == file.blob_sha256)
+            .values(reference_count=Blob.reference_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def remove_released_binary(db: AsyncSession, file: FileModel):
+    """
+    Remove the binary of a file whose deletion has been committed, returning True if
+    it was removed. Binaries shared through a blob are only removed with the blob's
+    last reference.
+
+    The blob's row is deleted only if it still has no references, and is held
+    while the binary is removed, so that an upload of the same content either took
+    its reference first and keeps the binary, or waits and stores it afresh.
+    """
+    try:
+        if file.blob_sha256 is not None:
+            result = await db.execute(
+                delete(Blob)
+                .where(Blob.sha256 == file.blob_sha256, Blob.reference_count <= 0)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0 and await db.get(
+                Blob, file.blob_sha256, populate_existing=True
+            ):
+                return False
+        storage = get_storage_backend()
+        if not await storage.is_present(file.filename):
+            return False
+        await storage.delete(file.filename)
+        return True
+    finally:
+        await db.commit()
@@ -0,0 +1,81 @@
+"""
+caching/file_body_cache.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold the bodies of small, frequently downloaded files in memory, evicting the least
+recently used bodies to stay within a byte budget
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import threading
+from collections import OrderedDict
+
+from app.packages.metrics.metrics import increment_counter
+
+# Total bytes of file bodies held when "file_cache_size" is not configured
+DEFAULT_FILE_CACHE_SIZE = 64 * 1024 * 1024
+
+# Largest file held when "file_cache_max_file_size" is not configured
+DEFAULT_FILE_CACHE_MAX_FILE_SIZE = 1024 * 1024
+
+# Bodies by storage filename, from least to most recently used
+_bodies = OrderedDict()
+_cached_bytes = 0
+# Bodies are invalidated from storage threads as well as the event loop
+_lock = threading.Lock()
+
+
+# Check whether a file of the given size may be held in the cache
+def is_file_cacheable(size: int, config: dict):
+    cache_size = config.get("file_cache_size", DEFAULT_FILE_CACHE_SIZE)
+    max_file_size = config.get(
+        "file_cache_max_file_size", DEFAULT_FILE_CACHE_MAX_FILE_SIZE
+    )
+    return size <= max_file_size and size <= cache_size
+
+
+# Return the cached body of a file in storage, or None if it is not cached
+def get_cached_file_body(filename: str):
+    with _lock:
+        body = _bodies.get(filename)
+        if body is not None:
+            _bodies.move_to_end(filename)
+    increment_counter("file_cache.hits" if body is not None else "file_cache.misses")
+    return body
+
+
+def cache_file_body(filename: str, body: bytes, config: dict):
+    global _cached_bytes
+    if not is_file_cacheable(len(body), config):
+        return
+    cache_size = config.get("file_cache_size", DEFAULT_FILE_CACHE_SIZE)
+    with _lock:
+        previous = _bodies.pop(filename, None)
+        if previous is not None:
+            _cached_bytes -= len(previous)
+        _bodies[filename] = body
+        _cached_bytes += len(body)
+        while _cached_bytes > cache_size:
+            _, evicted = _bodies.popitem(last=False)
+            _cached_bytes -= len(evicted)
+            increment_counter("file_cache.evictions")
+
+
+# Drop the cached body of a file whose binary has been removed or replaced
+def invalidate_file_body(filename: str):
+    global _cached_bytes
+    with _lock:
+        body = _bodies.pop(filename, None)
+        if body is not None:
+            _cached_bytes -= len(body)
+
+
+def clear_file_body_cache():
+    global _cached_bytes
+    with _lock:
+        _bodies.clear()
+        _cached_bytes = 0
@@ -0,0 +1,221 @@
+"""
+caching/file_id_filter.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold a counting Bloom filter of the IDs of every file, so that requests for IDs
+which do not exist can be refused without querying the database
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, literal, String
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.models import File as FileModel
+from app.packages.metrics.metrics import increment_counter
+from app.packages.pagination.file_listing import datetime_key
+
+logger = logging.getLogger(__name__)
+
+# Seconds between rebuilds when "file_filter_rebuild_interval" is not configured
+DEFAULT_FILE_FILTER_REBUILD_INTERVAL = 3600
+
+# Seconds between lookups of the files uploaded by other processes, made when an ID
+# is not in the filter, when "file_filter_refresh_interval" is not configured
+DEFAULT_FILE_FILTER_REFRESH_INTERVAL = 1
+
+# Seconds of uploads before the last lookup which each lookup reads again, so that
+# files whose upload was committed some time after it began are not passed over
+FILTER_REFRESH_OVERLAP = 60
+
+# Proportion of unknown IDs which the filter is sized to let through to the database
+FALSE_POSITIVE_RATE = 0.01
+
+# Fewest IDs the filter is sized for, and the room it leaves for uploads between
+# rebuilds as a multiple of the number of files
+MIN_FILTER_CAPACITY = 1024
+FILTER_GROWTH_FACTOR = 2
+
+# Each counter is a byte, and one which reaches this is never decremented again
+MAX_COUNT = 255
+
+# The filter is None until it is first built, and every ID is let through until then.
+# Uploads are looked up from the time of the last rebuild or lookup, and lookups are
+# spaced by the monotonic time of the last.
+_filter = None
+_rebuild = None
+_uploaded_since = None
+_last_refresh = None
+_lock = threading.Lock()
+
+
+def _new_filter(capacity: int):
+    capacity = max(capacity, MIN_FILTER_CAPACITY)
+    size = math.ceil(-capacity * math.log(FALSE_POSITIVE_RATE) / math.log(2) ** 2)
+    return {
+        "counters": bytearray(size),
+        "hash_count": max(1, round(size / capacity * math.log(2))),
+    }
+
+
+# Positions of an ID's counters, by double hashing one 128-bit digest
+def _positions(bloom_filter: dict, file_id: str):
+    digest = hashlib.blake2b(file_id.encode(), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "little")
+    second = int.from_bytes(digest[8:], "little") | 1
+    size = len(bloom_filter["counters"])
+    return [(first + i * second) % size for i in range(bloom_filter["hash_count"])]
+
+
+def _add(bloom_filter: dict, file_id: str):
+    counters = bloom_filter["counters"]
+    for position in _positions(bloom_filter, file_id):
+        if counters[position] < MAX_COUNT:
+            counters[position] += 1
+
+
+def _remove(bloom_filter: dict, file_id: str):
+    counters = bloom_filter["counters"]
+    for position in _positions(bloom_filter, file_id):
+        if 0 < counters[position] < MAX_COUNT:
+            counters[position] -= 1
+
+
+def _build(file_ids: list):
+    bloom_filter = _new_filter(len(file_ids) * FILTER_GROWTH_FACTOR)
+    for file_id in file_ids:
+        _add(bloom_filter, file_id)
+    return bloom_filter
+
+
+def _contains(bloom_filter: dict, file_id: str):
+    counters = bloom_filter["counters"]
+    return all(counters[position] for position in _positions(bloom_filter, file_id))
+
+
+# Whether a file with the ID may exist, which is certain to be so for every file
+# stored by this process, and by others as of the last rebuild or lookup
+def might_contain_file_id(file_id: str):
+    with _lock:
+        return _filter is None or _contains(_filter, file_id)
+
+
+# Record the ID of a file which has just been stored
+def add_file_id(file_id: str):
+    with _lock:
+        if _rebuild is not None:
+            _rebuild["added"].add(file_id)
+        if _filter is not None:
+            _add(_filter, file_id)
+
+
+async def add_uploaded_file_ids(db: AsyncSession, interval: int):
+    """
+    Add the IDs of the files uploaded since the filter was built or last brought up
+    to date, which other processes may have stored, by the upload_datetime index.
+    Returns False without querying where this was done less than interval seconds
+    ago, or the filter has not been built.
+
+    IDs which the filter already holds are not added again, so that reading the
+    same uploads more than once cannot saturate their counters.
+    """
+    global _uploaded_since, _last_refresh
+    now = time.monotonic()
+    with _lock:
+        if _filter is None or _uploaded_since is None:
+            return False
+        if _last_refresh is not None and now - _last_refresh < interval:
+            return False
+        _last_refresh = now
+        since = _uploaded_since - timedelta(seconds=FILTER_REFRESH_OVERLAP)
+    started = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(FileModel.id).where(
+            FileModel.upload_datetime >= literal(datetime_key(since), String)
+        )
+    )
+    file_ids = result.scalars().all()
+    with _lock:
+        for file_id in file_ids:
+            if _rebuild is not None:
+                _rebuild["added"].add(file_id)
+            if _filter is not None and not _contains(_filter, file_id):
+                _add(_filter, file_id)
+        _uploaded_since = max(_uploaded_since, started)
+    increment_counter("file_filter.refreshes")
+    return True
+
+
+# Forget the ID of a file which has just been removed
+def remove_file_id(file_id: str):
+    with _lock:
+        if _rebuild is not None:
+            _rebuild["removed"].add(file_id)
+        if _filter is not None:
+            _remove(_filter, file_id)
+
+
+async def rebuild_file_id_filter(db: AsyncSession):
+    """
+    Build the filter afresh from the files table, replacing the current filter.
+
+    Files stored or removed while the table is read are applied to the new
+    filter afterwards. A removal is only applied to IDs which were read from the
+    table, since removing an ID which was never added could hide another.
+    """
+    global _filter, _rebuild, _uploaded_since
+    started = datetime.now(timezone.utc)
+    with _lock:
+        _rebuild = {"added": set(), "removed": set()}
+    try:
+        result = await db.execute(select(FileModel.id))
+        file_ids = result.scalars().all()
+        bloom_filter = await asyncio.to_thread(_build, file_ids)
+        with _lock:
+            known_ids = set(file_ids)
+            for file_id in _rebuild["added"] - known_ids:
+                _add(bloom_filter, file_id)
+            for file_id in _rebuild["removed"] & known_ids:
+                _remove(bloom_filter, file_id)
+            _filter = bloom_filter
+            _uploaded_since = started
+    finally:
+        with _lock:
+            _rebuild = None
+    increment_counter("file_filter.rebuilds")
+    return len(file_ids)
+
+
+# Rebuild the filter in a session of its own, as is done at startup and periodically
+async def refresh_file_id_filter():
+    async for db in get_db():
+        file_count = await rebuild_file_id_filter(db)
+        logger.info(f"Rebuilt the file ID filter of {file_count} files")
+
+
+# Empty the filter once every file has been removed
+def empty_file_id_filter():
+    global _filter
+    with _lock:
+        if _filter is not None:
+            _filter = _new_filter(MIN_FILTER_CAPACITY)
+
+
+# Drop the filter entirely, letting every ID through until it is rebuilt
+def clear_file_id_filter():
+    global _filter, _uploaded_since, _last_refresh
+    with _lock:
+        _filter = None
+        _uploaded_since = None
+        _last_refresh = None
@@ -0,0 +1,125 @@
+"""
+caching/file_metadata_cache.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold the metadata of recently requested files in memory for a short time, along with
+the IDs which were found not to exist
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.get_configuration import get_config
+from app.models.models import File as FileModel
+from app.packages.caching.file_id_filter import (
+    DEFAULT_FILE_FILTER_REFRESH_INTERVAL,
+    might_contain_file_id,
+    add_uploaded_file_ids,
+)
+from app.packages.metrics.metrics import increment_counter
+
+# Seconds for which metadata is cached when "metadata_cache_ttl" is not configured
+DEFAULT_METADATA_CACHE_TTL = 60
+
+# Seconds for which an unknown ID is cached when "metadata_negative_ttl" is not
+# configured, kept short so that other processes' uploads are soon seen
+DEFAULT_METADATA_NEGATIVE_TTL = 5
+
+# Number of IDs cached when "metadata_cache_size" is not configured
+DEFAULT_METADATA_CACHE_SIZE = 10000
+
+# Entries by file ID, from least to most recently used, each as (expiry time,
+# metadata), where the metadata of an ID known not to exist is None
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def file_metadata(file: FileModel):
+    return {
+        "id": file.id,
+        "owner_username": file.owner_username,
+        "original_filename": file.original_filename,
+        "filename": file.filename,
+        "mimetype": file.mimetype,
+        "size": file.size,
+        "sha256": file.sha256,
+        "upload_datetime": file.upload_datetime,
+        "lifetime": file.lifetime,
+        "is_file_available": file.is_file_available,
+    }
+
+
+def _store(file_id: str, metadata: dict, config: dict):
+    if metadata is None:
+        ttl = config.get("metadata_negative_ttl", DEFAULT_METADATA_NEGATIVE_TTL)
+    else:
+        ttl = config.get("metadata_cache_ttl", DEFAULT_METADATA_CACHE_TTL)
+    cache_size = config.get("metadata_cache_size", DEFAULT_METADATA_CACHE_SIZE)
+    with _lock:
+        _entries.pop(file_id, None)
+        if ttl <= 0 or cache_size <= 0:
+            return
+        _entries[file_id] = (time.monotonic() + ttl, metadata)
+        while len(_entries) > cache_size:
+            _entries.popitem(last=False)
+
+
+# Cache the metadata of a file which has just been loaded or stored
+def cache_file_metadata(file: FileModel):
+    _store(file.id, file_metadata(file), get_config())
+
+
+async def get_file_metadata(db: AsyncSession, file_id: str):
+    """
+    Return the metadata of a file as a dict, or None if there is no such file,
+    consulting the database only when the ID is not cached and may exist.
+
+    The file ID filter is only rebuilt from time to time, so an ID which it does
+    not hold is checked again once the filter has taken in the files which other
+    processes uploaded since, which is looked up at most once every
+    "file_filter_refresh_interval" seconds.
+    """
+    if not might_contain_file_id(file_id):
+        interval = get_config().get(
+            "file_filter_refresh_interval", DEFAULT_FILE_FILTER_REFRESH_INTERVAL
+        )
+        if not await add_uploaded_file_ids(db, interval) or not might_contain_file_id(
+            file_id
+        ):
+            increment_counter("file_filter.rejections")
+            return None
+    with _lock:
+        entry = _entries.get(file_id)
+        if entry is not None and entry[0] > time.monotonic():
+            _entries.move_to_end(file_id)
+            increment_counter(
+                "metadata_cache.hits"
+                if entry[1] is not None
+                else "metadata_cache.negative_hits"
+            )
+            return entry[1]
+
+    increment_counter("metadata_cache.misses")
+    file = await db.get(FileModel, file_id)
+    metadata = file_metadata(file) if file is not None else None
+    _store(file_id, metadata, get_config())
+    return metadata
+
+
+# Drop the cached metadata of a file which has been removed, or which has just
+# been stored under an ID that may have been cached as unknown
+def invalidate_file_metadata(file_id: str):
+    with _lock:
+        _entries.pop(file_id, None)
+
+
+def clear_file_metadata_cache():
+    with _lock:
+        _entries.clear()
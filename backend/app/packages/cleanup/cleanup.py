@@ -11,8 +11,15 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import logging
+from datetime import datetime
 from app.packages.cleanup.remove_expired_files import remove_expired_files
 from app.packages.cleanup.remove_orphaned_files import remove_orphaned_files
+from app.packages.cleanup.remove_abandoned_uploads import remove_abandoned_uploads
+from app.packages.cleanup.reconcile_file_availability import (
+    reconcile_file_availability,
+)
+from app.packages.cleanup.remove_missing_files import remove_missing_files
+from app.get_configuration import get_config
 from app.database import get_db
 
 logger = logging.getLogger(__name__)
@@ -37,4 +44,30 @@ async def cleanup():
             logger.info("No orphaned files found")
         else:
             logger.info(f"Removed the following orphaned files: {filenames_removed}")
+
+        # Remove abandoned uploads
+        filenames_removed = await remove_abandoned_uploads(db)
+        if len(filenames_removed) == 0:
+            logger.info("No abandoned uploads found")
+        else:
+            logger.info(f"Removed the following abandoned uploads: {filenames_removed}")
+
+        # Record which files' binaries have gone missing from storage, or returned
+        reconciled_at = datetime.now()
+        reconciled = await reconcile_file_availability(db)
+        if reconciled["missing"]:
+            logger.warning(f"Files missing from storage: {reconciled['missing']}")
+        if reconciled["restored"]:
+            logger.info(f"Files restored to storage: {reconciled['restored']}")
+        if get_config().get("purge_missing_files", False):
+            try:
+                missing_files_removed = await remove_missing_files(db, reconciled_at)
+            except ValueError as e:
+                logger.warning(f"Not removing the missing files: {e}")
+                missing_files_removed = []
+            if missing_files_removed:
+                filenames_removed = [
+                    file["original_filename"] for file in missing_files_removed
+                ]
+                logger.info(f"Removed the following missing files: {filenames_removed}")
         logger.info("Cleanup complete\n")
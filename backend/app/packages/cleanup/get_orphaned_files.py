@@ -10,22 +10,16 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import os
 from sqlalchemy import select
 from app.models.models import File as FileModel
-from app.packages.storage_driver.get_storage_directory import get_storage_directory
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
 
 
 async def get_orphaned_files(db):
     files = await db.execute(select(FileModel))
     files = files.scalars().all()
-    filenames_in_database = [file.filename for file in files]
-    filenames_in_storage = [
-        filename
-        for filename in os.listdir(get_storage_directory())
-        if os.path.isfile(os.path.join(get_storage_directory(), filename))
-        and filename != ".gitignore"
-    ]
+    filenames_in_database = {file.filename for file in files}
+    filenames_in_storage = await get_storage_backend().list()
     orphaned_files = [
         filename
         for filename in filenames_in_storage
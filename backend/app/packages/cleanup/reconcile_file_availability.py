@@ -0,0 +1,79 @@
+"""
+reconcile_file_availability.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Bring the availability recorded for each file into line with storage
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import File as FileModel
+from app.packages.caching.file_metadata_cache import invalidate_file_metadata
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.presence_index import list_present_filenames
+
+# Number of files read from, and updated in, the database at a time
+RECONCILE_BATCH_SIZE = 500
+
+
+# Mark files available, or missing since now
+async def set_file_availability(db: AsyncSession, file_ids: list, available: bool):
+    missing_since = None if available else datetime.now()
+    for start in range(0, len(file_ids), RECONCILE_BATCH_SIZE):
+        await db.execute(
+            update(FileModel)
+            .where(FileModel.id.in_(file_ids[start : start + RECONCILE_BATCH_SIZE]))
+            .values(is_file_available=available, missing_since=missing_since)
+        )
+
+
+async def reconcile_file_availability(db: AsyncSession):
+    """
+    List the files in storage and walk it alongside the files table, both sorted
+    by filename, marking the files whose binaries have gone missing or returned.
+
+    The listing takes in the files stored and deleted while storage is listed. A
+    file is only marked missing once its absence is confirmed in storage, so that
+    one stored during the walk is not, and records when it was found missing.
+
+    Returns the IDs of the files marked missing and of those marked available.
+    """
+    storage = get_storage_backend()
+    present_filenames = await list_present_filenames(storage)
+    query = (
+        select(FileModel.id, FileModel.filename, FileModel.is_file_available)
+        .order_by(FileModel.filename)
+        .execution_options(yield_per=RECONCILE_BATCH_SIZE)
+    )
+
+    missing, restored = [], []
+    position = 0
+    rows = await db.stream(query)
+    async for file_id, filename, is_file_available in rows:
+        while (
+            position < len(present_filenames) and present_filenames[position] < filename
+        ):
+            position += 1
+        present = (
+            position < len(present_filenames)
+            and present_filenames[position] == filename
+        )
+        if is_file_available and not present:
+            missing.append((file_id, filename))
+        elif present and not is_file_available:
+            restored.append(file_id)
+
+    confirmed = await storage.are_present([filename for _, filename in missing])
+    missing = [file_id for file_id, filename in missing if not confirmed[filename]]
+    await set_file_availability(db, missing, False)
+    await set_file_availability(db, restored, True)
+    await db.commit()
+    for file_id in missing + restored:
+        invalidate_file_metadata(file_id)
+    return {"missing": missing, "restored": restored}
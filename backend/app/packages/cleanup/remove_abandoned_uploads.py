@@ -0,0 +1,62 @@
+"""
+remove_abandoned_uploads.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Cleanup resumable uploads which have not been continued within the upload expiry,
+along with any other stale files left in the partial directory
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import time
+from datetime import datetime
+from sqlalchemy import select
+from app.models.models import Upload
+from app.get_configuration import get_config
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.list_storage_directory import (
+    list_partial_directory_async,
+    remove_staged_path_async,
+)
+
+# Seconds of inactivity after which an upload is abandoned, if not configured
+DEFAULT_UPLOAD_EXPIRY = 86400
+
+
+async def remove_abandoned_uploads(db):
+    upload_expiry = get_config().get("upload_expiry", DEFAULT_UPLOAD_EXPIRY)
+    uploads = await db.execute(select(Upload))
+    uploads = uploads.scalars().all()
+    # Assemble a list of the filenames of the abandoned uploads removed
+    abandoned_uploads_removed = []
+    abandoned_upload_ids = set()
+    active_upload_ids = set()
+    for upload in uploads:
+        upload_age = datetime.now() - upload.updated_datetime
+        if upload_age.total_seconds() > upload_expiry:
+            await db.delete(upload)
+            abandoned_upload_ids.add(upload.id)
+            abandoned_uploads_removed.append(upload.original_filename)
+        else:
+            active_upload_ids.add(upload.id)
+    await db.commit()
+
+    # Remove the staged files and directories of abandoned uploads, and those of
+    # uploads which were interrupted without a trace in the database, such as a
+    # single request upload cut short by a restart
+    for partial_directory in get_storage_backend().list_partial_directories():
+        staged = await list_partial_directory_async(partial_directory)
+        for name, stat in staged.items():
+            upload_id = name.split(".")[0]
+            if upload_id in active_upload_ids:
+                continue
+            if (
+                upload_id in abandoned_upload_ids
+                or time.time() - stat.st_mtime > upload_expiry
+            ):
+                await remove_staged_path_async(os.path.join(partial_directory, name))
+    return abandoned_uploads_removed
@@ -13,8 +13,12 @@ the MIT License. See the LICENSE file for more details.
 from datetime import datetime
 from sqlalchemy import select
 from app.models.models import File as FileModel
-from app.packages.storage_driver.delete_file import delete_file
-from app.packages.storage_driver.is_file_present import is_file_present
+from app.packages.blobs.release_file_binary import (
+    release_file_binary,
+    remove_released_binary,
+)
+from app.packages.caching.file_id_filter import remove_file_id
+from app.packages.caching.file_metadata_cache import invalidate_file_metadata
 
 
 async def remove_expired_files(db):
@@ -22,6 +26,7 @@ async def remove_expired_files(db):
     files = files.scalars().all()
     # Assemble a list of the ID's of the expired files removed
     expired_files_removed = []
+    released_files = []
     for file in files:
         # File's with a lifetime of 0 should not be subject to cleanup
         if file.lifetime <= 0:
@@ -44,10 +49,19 @@ async def remove_expired_files(db):
                         "lifetime": file.lifetime,
                     }
                 )
-                if is_file_present(file.filename):
-                    delete_file(file.filename)
+                # Shared blobs are only reclaimed once their last reference expires
+                await release_file_binary(db, file)
+                released_files.append(file)
             except Exception as e:
                 print(f"Error deleting file {file.filename}: {str(e)}")
 
     await db.commit()
+    for file in released_files:
+        try:
+            await remove_released_binary(db, file)
+        except Exception as e:
+            print(f"Error deleting file {file.filename}: {str(e)}")
+    for expired_file in expired_files_removed:
+        remove_file_id(expired_file["id"])
+        invalidate_file_metadata(expired_file["id"])
     return expired_files_removed
@@ -0,0 +1,72 @@
+"""
+remove_missing_files.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Remove the files whose binaries were found to be missing from storage
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.get_configuration import get_config
+from app.models.models import File as FileModel
+from app.packages.blobs.release_file_binary import (
+    release_file_binary,
+    remove_released_binary,
+)
+from app.packages.caching.file_id_filter import remove_file_id
+from app.packages.caching.file_metadata_cache import invalidate_file_metadata
+
+# Fraction of all files which may be removed at once when "purge_missing_limit" is
+# not set. More are more likely on storage which is not mounted than lost.
+DEFAULT_PURGE_MISSING_LIMIT = 0.1
+
+
+async def remove_missing_files(db: AsyncSession, missing_before: datetime):
+    """
+    Remove the files which were already missing before missing_before, the start of
+    the latest reconcile, so that only files which two reconciles in a row found
+    missing are removed.
+
+    Should they be more than "purge_missing_limit" of all files, none are removed
+    and ValueError is raised.
+    """
+    files = await db.execute(
+        select(FileModel).where(
+            FileModel.is_file_available.is_(False),
+            FileModel.missing_since < missing_before,
+        )
+    )
+    files = files.scalars().all()
+    if not files:
+        return []
+    file_count = await db.scalar(select(func.count()).select_from(FileModel))
+    limit = get_config().get("purge_missing_limit", DEFAULT_PURGE_MISSING_LIMIT)
+    if len(files) > limit * file_count:
+        raise ValueError(
+            f"{len(files)} of {file_count} files are missing, more than 'purge_missing_limit' allows to be removed"
+        )
+    missing_files_removed = []
+    for file in files:
+        # Release any blob reference the file held, as its binary is already gone
+        await release_file_binary(db, file)
+        await db.delete(file)
+        missing_files_removed.append(
+            {
+                "id": file.id,
+                "original_filename": file.original_filename,
+                "filename": file.filename,
+            }
+        )
+    await db.commit()
+    for file in files:
+        await remove_released_binary(db, file)
+    for missing_file in missing_files_removed:
+        remove_file_id(missing_file["id"])
+        invalidate_file_metadata(missing_file["id"])
+    return missing_files_removed
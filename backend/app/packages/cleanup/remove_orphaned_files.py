@@ -11,11 +11,12 @@ the MIT License. See the LICENSE file for more details.
 """
 
 from app.packages.cleanup.get_orphaned_files import get_orphaned_files
-from app.packages.storage_driver.delete_file import delete_file
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
 
 
 async def remove_orphaned_files(db):
     orphaned_files = await get_orphaned_files(db)
+    storage = get_storage_backend()
     for filename in orphaned_files:
-        delete_file(filename)
+        await storage.delete(filename)
     return orphaned_files
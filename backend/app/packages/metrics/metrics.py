@@ -0,0 +1,67 @@
+"""
+metrics/metrics.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Count events and time the stages of requests, for reporting through GET metrics/
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+# Count an event, optionally broken down by a label such as a mimetype
+def increment_counter(name: str, label: str = None):
+    with _lock:
+        if label is None:
+            _counters[name] = _counters.get(name, 0) + 1
+        else:
+            counts = _counters.setdefault(name, {})
+            counts[label] = counts.get(label, 0) + 1
+
+
+# Record how many seconds a stage took
+def record_timing(name: str, seconds: float):
+    with _lock:
+        timing = _timings.setdefault(
+            name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        timing["count"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+
+# Time the body of a with statement as a stage
+@contextmanager
+def timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+def get_metrics():
+    with _lock:
+        return {
+            "counters": {
+                name: dict(value) if isinstance(value, dict) else value
+                for name, value in _counters.items()
+            },
+            "timings": {name: dict(timing) for name, timing in _timings.items()},
+        }
+
+
+def reset_metrics():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
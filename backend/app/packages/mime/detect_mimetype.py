@@ -0,0 +1,76 @@
+"""
+mime/detect_mimetype.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Detect the mimetype of a file from its leading bytes with libmagic, off the event
+loop and without reloading the magic database for every file
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import magic
+
+from app.packages.metrics.metrics import increment_counter, record_timing
+
+# Number of detection threads, which bounds the number of libmagic handles
+MIME_THREADS = min(4, os.cpu_count() or 1)
+
+_executor = None
+
+# libmagic handles are not thread-safe, so each detection thread keeps its own
+_thread_local = threading.local()
+
+
+def get_magic():
+    handle = getattr(_thread_local, "magic", None)
+    if handle is None:
+        handle = magic.Magic(mime=True)
+        _thread_local.magic = handle
+    return handle
+
+
+def detect_mimetype(content: bytes):
+    return get_magic().from_buffer(bytes(content))
+
+
+def get_mime_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MIME_THREADS, thread_name_prefix="mime"
+        )
+    return _executor
+
+
+# Detect the mimetype on a detection thread, recording how long it waited and ran
+async def detect_mimetype_async(content: bytes):
+    queued = time.perf_counter()
+
+    def timed_detect():
+        started = time.perf_counter()
+        return detect_mimetype(content), started, time.perf_counter()
+
+    loop = asyncio.get_running_loop()
+    mimetype, started, finished = await loop.run_in_executor(
+        get_mime_executor(), timed_detect
+    )
+    record_timing("mime.queue", started - queued)
+    record_timing("mime.detect", finished - started)
+    increment_counter("mime.detected", mimetype)
+    return mimetype
+
+
+def shutdown_mime_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,42 @@
+"""
+pagination/cursor.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Encode and decode the opaque cursors which mark a position in a paginated listing
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import base64
+import binascii
+from fastapi import HTTPException
+
+
+def invalid_cursor_exception() -> HTTPException:
+    return HTTPException(status_code=422, detail="Invalid cursor")
+
+
+# Encode the sort key of the last item of a page as a URL safe string
+def encode_cursor(sort: str, order: str, value, item_id: str):
+    payload = json.dumps([sort, order, value, item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    """
+    Return the (value, id) sort key held by a cursor, raising HTTP 422 for a cursor
+    which is malformed or which was issued for a different sort order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, cursor_order, value, item_id = payload
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise invalid_cursor_exception()
+    if cursor_sort != sort or cursor_order != order or not isinstance(item_id, str):
+        raise invalid_cursor_exception()
+    return value, item_id
@@ -0,0 +1,71 @@
+"""
+pagination/export_files.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Stream the whole file catalogue as newline delimited JSON, reading it from the
+database in keyset batches so that memory use does not grow with the number of files
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+from datetime import datetime
+from sqlalchemy import select, tuple_, literal, cast, String
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.models.models import File as FileModel
+from app.packages.caching.file_metadata_cache import file_metadata
+from app.packages.pagination.file_listing import datetime_key
+
+# Number of files read from the database, and sent, at a time
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_line(file: FileModel):
+    metadata = file_metadata(file)
+    if metadata["upload_datetime"] is not None:
+        metadata["upload_datetime"] = metadata["upload_datetime"].isoformat()
+    return json.dumps(metadata, separators=(",", ":")) + "\n"
+
+
+async def export_files(engine: AsyncEngine, since: datetime = None):
+    """
+    Yield the files uploaded at or after since, or every file, as NDJSON in order of
+    upload. Passing the upload_datetime of the last file exported as since sends
+    only the files which followed it, along with any others uploaded in the same
+    instant.
+
+    The files are read a batch at a time, each continuing after the last file of
+    the one before and read in a short session of its own, so that no read
+    transaction is held open, blocking writes, while the export is sent. The
+    request's session could not be used in any case, as it is closed once the
+    response begins.
+    """
+    query = select(
+        FileModel, cast(FileModel.upload_datetime, String).label("sort_key")
+    ).order_by(FileModel.upload_datetime, FileModel.id)
+    if since is not None:
+        query = query.where(
+            FileModel.upload_datetime >= literal(datetime_key(since), String)
+        )
+
+    after = None
+    while True:
+        batch_query = query.limit(EXPORT_BATCH_SIZE)
+        if after is not None:
+            batch_query = batch_query.where(
+                tuple_(FileModel.upload_datetime, FileModel.id)
+                > tuple_(literal(after[0], String), literal(after[1], String))
+            )
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            rows = (await db.execute(batch_query)).all()
+        if not rows:
+            return
+        yield "".join(export_line(file) for file, _ in rows).encode()
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        last_file, sort_key = rows[-1]
+        after = (sort_key, last_file.id)
@@ -0,0 +1,112 @@
+"""
+pagination/file_listing.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build the query for one page of the file listing, filtered and ordered so that each
+page is read from an index no matter how many files there are
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_, literal, cast, String, Integer
+
+from app.models.models import File as FileModel
+from app.packages.pagination.cursor import (
+    encode_cursor,
+    decode_cursor,
+    invalid_cursor_exception,
+)
+
+# Number of files in a page when no limit is requested, and the most allowed
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Columns which the listing may be sorted by, with the type of their cursor value.
+# The file ID breaks ties, so that every file has a unique position. SQLite holds
+# upload times as text, whose format depends upon what wrote them, so a cursor
+# holds that text as it was read rather than a parsed time.
+SORT_COLUMNS = {
+    "upload_datetime": (FileModel.upload_datetime, String),
+    "size": (FileModel.size, Integer),
+}
+
+
+# Compare a requested time with the upload times in the form in which they are held
+def datetime_key(value: datetime):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+
+def file_listing_query(
+    limit: int,
+    sort: str = "upload_datetime",
+    order: str = "asc",
+    cursor: str = None,
+    owner: str = None,
+    mimetype: str = None,
+    min_size: int = None,
+    max_size: int = None,
+    uploaded_after: datetime = None,
+    uploaded_before: datetime = None,
+):
+    """
+    Return a query for the page of files after the cursor, as rows of each file
+    and its sort key. One file more than the limit is fetched so that the caller
+    can tell whether another page follows.
+
+    A mimetype such as "image/*" matches every subtype of the type.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Cannot sort by {sort}, only by {', '.join(SORT_COLUMNS)}",
+        )
+    column, value_type = SORT_COLUMNS[sort]
+    query = select(FileModel, cast(column, value_type).label("sort_key"))
+
+    if owner is not None:
+        query = query.where(FileModel.owner_username == owner)
+    if mimetype is not None and mimetype.endswith("/*"):
+        # A range rather than LIKE, so that the mimetype index is used
+        prefix = mimetype[:-1]
+        query = query.where(
+            FileModel.mimetype >= prefix, FileModel.mimetype < prefix[:-1] + "0"
+        )
+    elif mimetype is not None:
+        query = query.where(FileModel.mimetype == mimetype)
+    if min_size is not None:
+        query = query.where(FileModel.size >= min_size)
+    if max_size is not None:
+        query = query.where(FileModel.size <= max_size)
+    if uploaded_after is not None:
+        key = literal(datetime_key(uploaded_after), String)
+        query = query.where(FileModel.upload_datetime >= key)
+    if uploaded_before is not None:
+        key = literal(datetime_key(uploaded_before), String)
+        query = query.where(FileModel.upload_datetime < key)
+
+    if cursor is not None:
+        value, file_id = decode_cursor(cursor, sort, order)
+        if not isinstance(value, str if value_type is String else int):
+            raise invalid_cursor_exception()
+        position = tuple_(column, FileModel.id)
+        after = tuple_(literal(value, value_type), literal(file_id, String))
+        query = query.where(position > after if order == "asc" else position < after)
+
+    if order == "asc":
+        query = query.order_by(column.asc(), FileModel.id.asc())
+    else:
+        query = query.order_by(column.desc(), FileModel.id.desc())
+    return query.limit(limit + 1)
+
+
+# The cursor which continues the listing after the last (file, sort key) of a page
+def next_page_cursor(rows: list, sort: str, order: str):
+    last_file, sort_key = rows[-1]
+    return encode_cursor(sort, order, sort_key, last_file.id)
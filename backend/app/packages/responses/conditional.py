@@ -0,0 +1,69 @@
+"""
+responses/conditional.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Answer conditional requests with 304 Not Modified when the client's copy is current
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import hashlib
+import calendar
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+# Format a naive UTC datetime, as stored by the database, as an HTTP date
+def http_date(value: datetime):
+    return formatdate(calendar.timegm(value.utctimetuple()), usegmt=True)
+
+
+# Weak ETag of a JSON body, which changes whenever any of its content does
+def content_etag(content):
+    serialized = json.dumps(jsonable_encoder(content), sort_keys=True)
+    return f'W/"{hashlib.sha256(serialized.encode()).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str = None, last_modified: str = None):
+    """
+    Check whether the client already holds the current representation, going by
+    If-None-Match where it is sent, and by If-Modified-Since otherwise
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+        opaque_tag = etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == opaque_tag
+            for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(
+            if_modified_since
+        )
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified_response(etag: str = None, last_modified: str = None):
+    headers = {}
+    if etag is not None:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = last_modified
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,21 @@
+"""
+responses/content_disposition.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build the Content-Disposition header with which a file is downloaded
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from urllib.parse import quote
+
+
+# Matches the header which FileResponse sends, escaping filenames which need it
+def content_disposition(filename: str):
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        return f"attachment; filename*=utf-8''{quoted_filename}"
+    return f'attachment; filename="{filename}"'
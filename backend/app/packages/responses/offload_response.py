@@ -0,0 +1,49 @@
+"""
+responses/offload_response.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hand the sending of a file to a reverse proxy, with X-Accel-Redirect (nginx) or
+X-Sendfile (Apache, lighttpd)
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from urllib.parse import quote
+from fastapi import Response
+
+# Supported values of "download_offload"
+OFFLOAD_MODES = ["none", "x_accel_redirect", "x_sendfile"]
+
+
+def offload_response(
+    config: dict,
+    storage_path: str,
+    storage_directory: str,
+    media_type: str,
+    headers: dict,
+):
+    """
+    Return an empty response telling the proxy which file to send in its place,
+    or None if downloads are not offloaded. The proxy serves any Range itself.
+
+    X-Accel-Redirect points at "download_offload_location", the internal nginx
+    location aliasing the storage directory. X-Sendfile is the path of the file
+    under "download_offload_location", which defaults to the storage directory.
+    storage_path is the path of the file relative to the storage directory.
+    """
+    mode = config.get("download_offload", "none")
+    if mode == "none":
+        return None
+
+    headers = dict(headers)
+    if mode == "x_accel_redirect":
+        location = config["download_offload_location"]
+        headers["X-Accel-Redirect"] = location.rstrip("/") + "/" + quote(storage_path)
+    else:
+        location = config.get("download_offload_location", storage_directory)
+        headers["X-Sendfile"] = os.path.join(location, storage_path)
+    return Response(status_code=200, media_type=media_type, headers=headers)
@@ -0,0 +1,95 @@
+"""
+responses/parse_range.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Parse the Range and If-Range headers of a request for part of a file
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from fastapi import HTTPException
+
+# Largest number of ranges served in one response, beyond which the whole file is sent
+MAX_RANGES = 16
+
+
+def range_not_satisfiable_exception(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+def parse_range(range_header: str, size: int):
+    """
+    Return the (start, end) byte ranges requested of a file of the given size,
+    with both ends inclusive, sorted and with overlapping ranges merged.
+
+    Returns None when the whole file should be sent instead, which is the case
+    for a missing, malformed or overly fragmented Range header. Raises HTTP 416
+    when none of the requested ranges lie within the file.
+    """
+    if range_header is None:
+        return None
+    unit, _, range_set = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set.strip():
+        return None
+
+    ranges = []
+    specs = range_set.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+    for spec in specs:
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            return None
+        if not first:
+            # A suffix range, for the last bytes of the file
+            if not last.isdigit():
+                return None
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            continue
+        end = min(int(last), size - 1) if last else size - 1
+        ranges.append((start, end))
+
+    if not ranges:
+        raise range_not_satisfiable_exception(size)
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(if_range: str, etag: str, last_modified: str):
+    """
+    Check whether the If-Range header of a request, if any, allows a partial
+    response, which requires the file to be unchanged since the client saw it
+    """
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        # Only a strong ETag can validate a range
+        return etag is not None and if_range == etag
+    if if_range.startswith("W/"):
+        return False
+    return last_modified is not None and if_range == last_modified
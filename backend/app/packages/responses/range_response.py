@@ -0,0 +1,82 @@
+"""
+responses/range_response.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build a 206 Partial Content response for one or more byte ranges of a file
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import secrets
+from fastapi.responses import StreamingResponse
+
+
+def range_response(
+    ranges: list,
+    size: int,
+    read_range,
+    media_type: str,
+    headers: dict = None,
+):
+    """
+    Stream the given (start, end) ranges of a file with both ends inclusive, as
+    parsed by parse_range(). read_range(start, end) must return an async iterator
+    over those bytes, which keeps the response independent of where the file is
+    stored. A single range is sent as it is, and several as multipart/byteranges.
+    """
+    headers = dict(headers or {})
+    headers["Accept-Ranges"] = "bytes"
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            read_range(start, end),
+            status_code=206,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    boundary = secrets.token_hex(16)
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+    async def multipart_body():
+        for index, (start, end) in enumerate(ranges):
+            # Every part after the first is preceded by the CRLF ending the last
+            yield (b"\r\n" if index else b"") + part_headers[index]
+            async for chunk in read_range(start, end):
+                yield chunk
+        yield closing
+
+    headers["Content-Length"] = str(
+        sum(len(part_header) for part_header in part_headers)
+        + 2 * (len(ranges) - 1)
+        + sum(end - start + 1 for start, end in ranges)
+        + len(closing)
+    )
+    return StreamingResponse(
+        multipart_body(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
+
+
+# Make a read_range() for a file body which is held in memory
+def body_range_reader(body: bytes):
+    async def read_range(start: int, end: int):
+        yield body[start : end + 1]
+
+    return read_range
@@ -0,0 +1,84 @@
+"""
+responses/storage_file_response.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Send a whole file from the storage directory, handing it to the server to send
+without copying where the server supports it
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from app.packages.storage_driver.read_file_range import read_file_range
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class StorageFileResponse(FileResponse):
+    """
+    A FileResponse for a file in the storage directory, which must be given
+    its stat_result, and its storage_path relative to the storage directory where
+    that is not its filename.
+
+    Servers offering the ASGI zero-copy send extension are handed the open file,
+    which they send with sendfile() so that no bytes pass through Python. Other
+    servers are streamed the file by read_file_range(), in the configured chunk
+    size and with readahead hints.
+    """
+
+    def __init__(
+        self,
+        storage_filename: str,
+        storage_directory: str,
+        storage_path: str = None,
+        **kwargs,
+    ):
+        super().__init__(
+            path=os.path.join(storage_directory, storage_path or storage_filename),
+            **kwargs,
+        )
+        self.storage_filename = storage_filename
+        self.storage_directory = storage_directory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        size = self.stat_result.st_size
+        if scope["method"].upper() == "HEAD" or size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            file = await run_in_storage_executor(open, self.path, "rb")
+            try:
+                await send(
+                    {
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": file,
+                        "offset": 0,
+                        "count": size,
+                        "more_body": False,
+                    }
+                )
+            finally:
+                await run_in_storage_executor(file.close)
+        else:
+            async for chunk in read_file_range(
+                self.storage_filename, 0, size - 1, self.storage_directory
+            ):
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
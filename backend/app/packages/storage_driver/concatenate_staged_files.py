@@ -0,0 +1,33 @@
+"""
+storage_driver/concatenate_staged_files.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Join files staged in the partial directory into one, copying their contents within
+the kernel rather than through Python
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from app.packages.storage_driver.copy_file_contents import copy_file_contents
+from app.packages.storage_driver.storage_writer import get_partial_path
+
+
+def concatenate_staged_files(source_filenames: list, target_filename: str):
+    """
+    Write the staged source files, in order, into the staged target file, then
+    remove the sources. The target is replaced if it already exists.
+    """
+    with open(get_partial_path(target_filename), "wb") as target_file:
+        for source_filename in source_filenames:
+            with open(get_partial_path(source_filename), "rb") as source_file:
+                copy_file_contents(
+                    source_file.fileno(),
+                    target_file.fileno(),
+                    os.fstat(source_file.fileno()).st_size,
+                )
+    for source_filename in source_filenames:
+        os.remove(get_partial_path(source_filename))
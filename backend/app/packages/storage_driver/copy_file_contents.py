@@ -0,0 +1,54 @@
+"""
+storage_driver/copy_file_contents.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Copy the contents of one file into another within the kernel rather than through
+Python
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import errno
+import shutil
+
+# Errors with which copy_file_range() reports that it cannot copy between two files,
+# such as when they are on different filesystems or the filesystem lacks support
+UNSUPPORTED_COPY_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+
+
+# Copy count bytes from the current position of one file to that of another
+def copy_file_contents(source_fd: int, target_fd: int, count: int):
+    # copy_file_range() lets the filesystem share extents (a reflink) where it can
+    if hasattr(os, "copy_file_range"):
+        try:
+            while count > 0:
+                copied = os.copy_file_range(source_fd, target_fd, count)
+                if copied == 0:
+                    return
+                count -= copied
+            return
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_COPY_ERRORS:
+                raise
+    # sendfile() still copies within the kernel, and supports more filesystems
+    if hasattr(os, "sendfile"):
+        try:
+            while count > 0:
+                copied = os.sendfile(target_fd, source_fd, None, count)
+                if copied == 0:
+                    return
+                count -= copied
+            return
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_COPY_ERRORS:
+                raise
+    # Both calls advance the file positions, which duplicated descriptors share, so
+    # the copy resumes from wherever they stopped
+    with os.fdopen(os.dup(source_fd), "rb") as source_file, os.fdopen(
+        os.dup(target_fd), "wb"
+    ) as target_file:
+        shutil.copyfileobj(source_file, target_file, 1024 * 1024)
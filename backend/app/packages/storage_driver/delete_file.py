@@ -11,20 +11,19 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import os
-from app.packages.storage_driver.is_file_present import is_file_present
-from app.packages.storage_driver.get_storage_directory import get_storage_directory
-
-
-def delete_file(filename: str):
-    if not is_file_present(filename):
-        raise FileNotFoundError
-    filepath = os.path.join(get_storage_directory(), filename)
-    try:
-        os.remove(filepath)
-    except Exception as e:
-        raise FileDeletionException(filename, e)
-    if os.path.exists(filepath):
-        raise FileDeletionException(filename)
+from app.packages.storage_driver.get_file_path import get_file_paths
+
+
+def delete_file(filename: str, storage_directory: str = None):
+    for filepath in get_file_paths(filename, storage_directory):
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            raise FileDeletionException(filename, e)
+        return
+    raise FileNotFoundError(filename)
 
 
 class FileDeletionException(Exception):
@@ -0,0 +1,399 @@
+"""
+storage_driver/erasure_coded_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold file binaries as data and parity shards across several storage roots, so that
+each file can still be read while some of its roots are lost
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import struct
+import asyncio
+from collections import Counter
+
+from app.get_configuration import get_config
+from app.packages.metrics.metrics import increment_counter
+from app.packages.storage_driver.storage_backend import StorageBackend, StoredFileStat
+from app.packages.storage_driver.local_storage_backend import LocalStorageBackend
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+from app.packages.storage_driver.get_file_path import get_relative_path
+from app.packages.storage_driver.locate_file import locate_file
+from app.packages.storage_driver.delete_file import delete_file
+from app.packages.storage_driver.get_storage_roots import (
+    get_storage_roots,
+    rank_storage_roots,
+)
+from app.packages.storage_driver.reed_solomon import encode_parity, reconstruct_data
+
+# Shards of each file when "erasure_coding" does not set them, which can lose any two
+# roots for 1.5 times the size of the file
+DEFAULT_DATA_SHARDS = 4
+DEFAULT_PARITY_SHARDS = 2
+
+# Bytes of each shard in a stripe, which is the unit in which files are coded
+ERASURE_CHUNK_SIZE = 256 * 1024
+
+# Each shard starts with a header naming its index, how the file was coded and the
+# size of the file
+SHARD_MAGIC = b"ATEC"
+SHARD_VERSION = 1
+SHARD_HEADER = struct.Struct(">4sBBBBQI")
+
+
+# Length of each shard of a stripe, which is shorter in the last stripe of a file
+def _chunk_length(stripe_length: int, data_shards: int):
+    return -(-stripe_length // data_shards)
+
+
+# Length of each shard of a file, after its header
+def _shard_length(size: int, data_shards: int, chunk_size: int):
+    stripes, remainder = divmod(size, data_shards * chunk_size)
+    return stripes * chunk_size + _chunk_length(remainder, data_shards)
+
+
+def _open_shard(storage_directory: str, filename: str):
+    """
+    Open the shard of a file held on a storage root, returning its header along with
+    the open file descriptor and its modification time, or None if there is no such
+    shard or it is not whole. The caller closes the file descriptor.
+    """
+    located = locate_file(filename, storage_directory)
+    if located is None:
+        return None
+    relative_path, _ = located
+    try:
+        fd = os.open(os.path.join(storage_directory, relative_path), os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        header = os.pread(fd, SHARD_HEADER.size, 0)
+        stat_result = os.fstat(fd)
+        if len(header) < SHARD_HEADER.size:
+            raise ValueError
+        magic, version, index, *coding = SHARD_HEADER.unpack(header)
+        data_shards, _, size, chunk_size = coding
+        if (
+            magic != SHARD_MAGIC
+            or version != SHARD_VERSION
+            or not data_shards * chunk_size
+        ):
+            raise ValueError
+        if stat_result.st_size != SHARD_HEADER.size + _shard_length(
+            size, data_shards, chunk_size
+        ):
+            raise ValueError
+    except (OSError, ValueError):
+        os.close(fd)
+        return None
+    return {
+        "fd": fd,
+        "index": index,
+        "coding": tuple(coding),
+        "mtime": stat_result.st_mtime,
+    }
+
+
+# Read the shard of a stripe from its open shard, or return None if it cannot be read
+def _read_chunk(fd: int, position: int, length: int):
+    try:
+        chunk = os.pread(fd, length, position)
+    except OSError:
+        return None
+    return chunk if len(chunk) == length else None
+
+
+def _write_shards(
+    staged_path: str,
+    shard_paths: list,
+    other_roots: list,
+    filename: str,
+    data_shards: int,
+    parity_shards: int,
+    chunk_size: int,
+):
+    """
+    Code a staged file one stripe at a time into a shard at each path, and remove
+    the staged file and any shards of an earlier copy held on the other roots.
+
+    The shards are written under hidden names, which listings skip, and renamed
+    into place once all are written.
+    """
+    size = os.path.getsize(staged_path)
+    writing_paths = [
+        os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.writing")
+        for path in shard_paths
+    ]
+    shard_files = []
+    try:
+        for index, path in enumerate(writing_paths):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shard_files.append(open(path, "wb"))
+            shard_files[-1].write(
+                SHARD_HEADER.pack(
+                    SHARD_MAGIC,
+                    SHARD_VERSION,
+                    index,
+                    data_shards,
+                    parity_shards,
+                    size,
+                    chunk_size,
+                )
+            )
+        with open(staged_path, "rb") as staged_file:
+            while stripe := staged_file.read(data_shards * chunk_size):
+                chunk_length = _chunk_length(len(stripe), data_shards)
+                stripe = stripe.ljust(data_shards * chunk_length, b"\0")
+                data = [
+                    stripe[index * chunk_length : (index + 1) * chunk_length]
+                    for index in range(data_shards)
+                ]
+                for shard_file, chunk in zip(
+                    shard_files, data + encode_parity(data, parity_shards)
+                ):
+                    shard_file.write(chunk)
+        for shard_file in shard_files:
+            shard_file.close()
+        for writing_path, path in zip(writing_paths, shard_paths):
+            os.replace(writing_path, path)
+    except BaseException:
+        for shard_file in shard_files:
+            shard_file.close()
+        for path in writing_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    os.remove(staged_path)
+    for storage_directory in other_roots:
+        try:
+            delete_file(filename, storage_directory)
+        except FileNotFoundError:
+            pass
+
+
+class ErasureCodedStorageBackend(StorageBackend):
+    """
+    Splits each file into "data_shards" shards and adds "parity_shards" shards of
+    Reed-Solomon parity, as set in "erasure_coding", holding each shard on a
+    different one of the roots in "storage_roots". A file can be read from any
+    "data_shards" of its shards, so that it survives the loss of as many roots as
+    it has parity shards, for (data_shards + parity_shards) / data_shards times its
+    size.
+
+    Files are coded in stripes of ERASURE_CHUNK_SIZE bytes of each data shard, and
+    read a stripe at a time from every root at once. A stripe whose data shards
+    cannot all be read is recovered from the parity shards as it is read. Each
+    shard is opened once for each read, and its stripes read by position.
+
+    Shards are placed on the roots ranked first for the file by weighted rendezvous
+    hashing, but are found on any root, since each records its index.
+    """
+
+    config_keys = ["erasure_coding", "storage_roots"]
+    environment_keys = ["STORAGE_PATH"]
+
+    def __init__(self):
+        erasure_coding = get_config().get("erasure_coding", {})
+        self.data_shards = erasure_coding.get("data_shards", DEFAULT_DATA_SHARDS)
+        self.parity_shards = erasure_coding.get("parity_shards", DEFAULT_PARITY_SHARDS)
+        self.chunk_size = ERASURE_CHUNK_SIZE
+        self.storage_roots = get_storage_roots()
+        self.roots = {path: LocalStorageBackend(path) for path, _ in self.storage_roots}
+        if len(self.roots) < self.data_shards + self.parity_shards:
+            raise ValueError(
+                f"Erasure coding needs {self.data_shards + self.parity_shards} distinct storage roots"
+            )
+
+    async def _open(self, filename: str):
+        """
+        Open the shards of a file, returning its coding and the file descriptor of
+        each of its shards by index, or None if too few of its shards are held to
+        read it. The shards are closed by _close().
+        """
+        headers = await asyncio.gather(
+            *(
+                run_in_storage_executor(_open_shard, path, filename)
+                for path in self.roots
+            )
+        )
+        headers = [header for header in headers if header is not None]
+        if not headers:
+            return None
+        # Shards left by an earlier copy of the file do not match the others
+        coding = Counter(header["coding"] for header in headers).most_common(1)[0][0]
+        matching = [header for header in headers if header["coding"] == coding]
+        data_shards, _, size, chunk_size = coding
+        stored = {
+            "filename": filename,
+            "data_shards": data_shards,
+            "size": size,
+            "chunk_size": chunk_size,
+            "mtime": max(header["mtime"] for header in matching),
+            "shards": {header["index"]: header["fd"] for header in matching},
+            "fds": [header["fd"] for header in headers],
+        }
+        if len(stored["shards"]) < data_shards:
+            self._close(stored)
+            return None
+        return stored
+
+    # Close every shard opened for a file, including any which do not match
+    def _close(self, stored: dict):
+        for fd in stored["fds"]:
+            os.close(fd)
+        stored["fds"] = []
+
+    # Read the shards of a stripe in parallel, dropping any which cannot be read
+    async def _read_chunks(self, stored: dict, indexes: list, stripe: int, length: int):
+        position = SHARD_HEADER.size + stripe * stored["chunk_size"]
+        chunks = await asyncio.gather(
+            *(
+                run_in_storage_executor(
+                    _read_chunk, stored["shards"][index], position, length
+                )
+                for index in indexes
+            )
+        )
+        for index, chunk in zip(indexes, chunks):
+            if chunk is None:
+                del stored["shards"][index]
+        return {
+            index: chunk for index, chunk in zip(indexes, chunks) if chunk is not None
+        }
+
+    async def _read_stripe(self, stored: dict, stripe: int, start: int, end: int):
+        """
+        Return the bytes of a file from start to end, both inclusive, which lie
+        within one stripe, recovering its missing data shards from its parity shards
+        """
+        data_shards = stored["data_shards"]
+        stripe_start = stripe * data_shards * stored["chunk_size"]
+        chunk_length = _chunk_length(
+            min(data_shards * stored["chunk_size"], stored["size"] - stripe_start),
+            data_shards,
+        )
+        first = (start - stripe_start) // chunk_length
+        last = (end - stripe_start) // chunk_length
+        wanted = list(range(first, last + 1))
+        chunks = await self._read_chunks(
+            stored,
+            [index for index in wanted if index in stored["shards"]],
+            stripe,
+            chunk_length,
+        )
+        if len(chunks) < len(wanted):
+            increment_counter("storage.degraded_reads")
+            while len(chunks) < data_shards:
+                spare = [
+                    index for index in sorted(stored["shards"]) if index not in chunks
+                ]
+                if not spare:
+                    raise FileNotFoundError(stored["filename"])
+                chunks.update(
+                    await self._read_chunks(
+                        stored, spare[: data_shards - len(chunks)], stripe, chunk_length
+                    )
+                )
+            data = await run_in_storage_executor(reconstruct_data, chunks, data_shards)
+            chunks = dict(enumerate(data))
+        offset = stripe_start + first * chunk_length
+        content = b"".join(chunks[index] for index in wanted)
+        return content[start - offset : end - offset + 1]
+
+    # Count the roots holding a shard of each file, which is read if enough do
+    async def are_present(self, filenames: list):
+        if not filenames:
+            return {}
+        results = await asyncio.gather(
+            *(root.are_present(filenames) for root in self.roots.values())
+        )
+        counts = Counter(
+            name for result in results for name, held in result.items() if held
+        )
+        return {
+            filename: counts[filename] >= self.data_shards for filename in filenames
+        }
+
+    async def is_present(self, filename: str):
+        return (await self.are_present([filename]))[filename]
+
+    async def stat(self, filename: str):
+        stored = await self._open(filename)
+        if stored is None:
+            return None
+        self._close(stored)
+        return StoredFileStat(st_size=stored["size"], st_mtime=stored["mtime"])
+
+    async def read(self, filename: str):
+        stored = await self._open(filename)
+        if stored is None:
+            raise FileNotFoundError(filename)
+        try:
+            if stored["size"] == 0:
+                return b""
+            return b"".join(
+                [
+                    chunk
+                    async for chunk in self._read_stored(stored, 0, stored["size"] - 1)
+                ]
+            )
+        finally:
+            self._close(stored)
+
+    async def _read_stored(self, stored: dict, start: int, end: int):
+        stripe_size = stored["data_shards"] * stored["chunk_size"]
+        for stripe in range(start // stripe_size, end // stripe_size + 1):
+            yield await self._read_stripe(
+                stored,
+                stripe,
+                max(start, stripe * stripe_size),
+                min(end, (stripe + 1) * stripe_size - 1),
+            )
+
+    async def read_range(self, filename: str, start: int, end: int):
+        stored = await self._open(filename)
+        if stored is None:
+            raise FileNotFoundError(filename)
+        try:
+            async for chunk in self._read_stored(stored, start, end):
+                yield chunk
+        finally:
+            self._close(stored)
+
+    # List every root in parallel, keeping the files with enough shards to be read
+    async def list(self):
+        listings = await asyncio.gather(*(root.list() for root in self.roots.values()))
+        counts = Counter(name for listing in listings for name in listing)
+        return [name for name, count in counts.items() if count >= self.data_shards]
+
+    async def _store(self, staged_path: str, filename: str):
+        ranked = rank_storage_roots(filename, self.storage_roots)
+        placed = [path for path, _ in ranked[: self.data_shards + self.parity_shards]]
+        await run_in_storage_executor(
+            _write_shards,
+            staged_path,
+            [
+                os.path.normpath(os.path.join(path, get_relative_path(filename)))
+                for path in placed
+            ],
+            [path for path in self.roots if path not in placed],
+            filename,
+            self.data_shards,
+            self.parity_shards,
+            self.chunk_size,
+        )
+
+    async def _delete(self, filename: str):
+        results = await asyncio.gather(
+            *(root._delete(filename) for root in self.roots.values()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if result is not None and not isinstance(result, FileNotFoundError):
+                raise result
+        if all(isinstance(result, FileNotFoundError) for result in results):
+            raise FileNotFoundError(filename)
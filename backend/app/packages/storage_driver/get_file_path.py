@@ -0,0 +1,63 @@
+"""
+storage_driver/get_file_path.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the path at which a file is held in the storage directory, under the configured
+storage layout
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import hashlib
+from app.get_configuration import get_config
+from app.packages.storage_driver.get_storage_directory import get_storage_directory
+
+# Levels of shard directories under the sharded layout, each named by two hex digits
+SHARD_DEPTH = 2
+
+
+def is_storage_sharded():
+    return get_config().get("storage_layout", "flat") == "sharded"
+
+
+# The shard directory of a file, such as "ab/cd", from a hash of its filename so that
+# files spread evenly across shards whatever their names
+def get_shard_directory(filename: str):
+    digest = hashlib.blake2b(filename.encode(), digest_size=SHARD_DEPTH).hexdigest()
+    return os.path.join(*(digest[i : i + 2] for i in range(0, len(digest), 2)))
+
+
+# The path of a file relative to the storage directory, where it is written
+def get_relative_path(filename: str):
+    if not is_storage_sharded():
+        return filename
+    return os.path.join(get_shard_directory(filename), filename)
+
+
+def get_relative_paths(filename: str):
+    """
+    The paths relative to the storage directory at which a file may be held, in
+    the order in which they are checked.
+
+    Under the sharded layout, a file which has not yet been moved into its shard by
+    migrate_storage_layout() is still found at its flat path. The sharded path is
+    checked again last, in case the file was moved between the first two checks.
+    """
+    if not is_storage_sharded():
+        return [filename]
+    sharded_path = os.path.join(get_shard_directory(filename), filename)
+    return [sharded_path, filename, sharded_path]
+
+
+# The paths at which a file may be held, in the storage directory unless another
+# storage root is given
+def get_file_paths(filename: str, storage_directory: str = None):
+    storage_directory = storage_directory or get_storage_directory()
+    return [
+        os.path.join(storage_directory, relative_path)
+        for relative_path in get_relative_paths(filename)
+    ]
@@ -0,0 +1,21 @@
+"""
+storage_driver/get_file_stat.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the size and modification time of a file in the storage directory
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from app.packages.storage_driver.locate_file import locate_file
+
+
+# Return the stat result of a file, or None if there is no such file
+def get_file_stat(filename: str, storage_directory: str = None):
+    located = locate_file(filename, storage_directory)
+    if located is None:
+        return None
+    return located[1]
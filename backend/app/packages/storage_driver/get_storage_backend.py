@@ -0,0 +1,128 @@
+"""
+storage_driver/get_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the storage backend selected by the configuration
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+import threading
+
+from app.get_configuration import get_config
+from app.packages.storage_driver.local_storage_backend import LocalStorageBackend
+from app.packages.storage_driver.multi_root_storage_backend import (
+    MultiRootStorageBackend,
+)
+from app.packages.storage_driver.memory_storage_backend import MemoryStorageBackend
+from app.packages.storage_driver.erasure_coded_storage_backend import (
+    ErasureCodedStorageBackend,
+)
+from app.packages.storage_driver.s3_storage_backend import S3StorageBackend
+
+# Backends by their name in "storage_backend", which is "local" when not configured
+STORAGE_BACKENDS = {
+    "local": LocalStorageBackend,
+    "memory": MemoryStorageBackend,
+    "s3": S3StorageBackend,
+    "erasure_coded": ErasureCodedStorageBackend,
+}
+
+# The backend in use, the class and settings it was created from, the backends it
+# has replaced, which may still be in use and are only closed at shutdown, and the
+# closing of backends which were dropped
+_backend = None
+_backend_key = None
+_replaced = []
+_closing = set()
+_lock = threading.Lock()
+
+
+# The backend class selected by the configuration, along with the values of the
+# config keys and environment variables which it is created from
+def _get_backend_key(config: dict):
+    name = config.get("storage_backend", "local")
+    if name == "local" and config.get("storage_roots"):
+        backend_class = MultiRootStorageBackend
+    else:
+        backend_class = STORAGE_BACKENDS[name]
+    return (
+        backend_class,
+        [config.get(key) for key in backend_class.config_keys],
+        [os.environ.get(key) for key in backend_class.environment_keys],
+    )
+
+
+# Close backends outside of any request, on the running event loop where there is
+# one, and otherwise on a loop of their own
+def _close_backends(backends: list):
+    if not backends:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        try:
+            for backend in backends:
+                loop.run_until_complete(backend.close())
+        finally:
+            loop.close()
+        return
+    for backend in backends:
+        task = loop.create_task(backend.close())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+
+def get_storage_backend():
+    """
+    Return the configured backend, creating it on first use. A backend is created
+    afresh only when the config keys or environment variables which it is created
+    from change, such as the storage directory, which is also where uploads are
+    staged, or the S3 credentials.
+
+    A backend which is replaced may still be serving requests, so it is kept until
+    shutdown rather than closed.
+
+    The local backend is spread across the roots in "storage_roots" where any are
+    configured.
+    """
+    global _backend, _backend_key
+    key = _get_backend_key(get_config())
+    with _lock:
+        if _backend is not None and _backend_key == key:
+            return _backend
+        backend = key[0]()
+        if _backend is not None:
+            _replaced.append(_backend)
+        _backend, _backend_key = backend, key
+    return backend
+
+
+# Close and drop the backends, so that the next use creates one afresh, which is
+# only done where none are in use
+def reset_storage_backends():
+    global _backend, _backend_key
+    with _lock:
+        backends = _replaced + ([_backend] if _backend is not None else [])
+        _replaced.clear()
+        _backend, _backend_key = None, None
+    _close_backends(backends)
+
+
+# Close and drop the backends, as is done at shutdown
+async def close_storage_backends():
+    global _backend, _backend_key
+    with _lock:
+        backends = _replaced + ([_backend] if _backend is not None else [])
+        _replaced.clear()
+        _backend, _backend_key = None, None
+    for backend in backends:
+        await backend.close()
+    if _closing:
+        await asyncio.gather(*_closing)
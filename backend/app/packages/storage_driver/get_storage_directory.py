@@ -12,9 +12,18 @@ the MIT License. See the LICENSE file for more details.
 
 import os
 
+# Subdirectory of the storage directory which holds files that are still being written
+PARTIAL_DIRECTORY = ".partial"
+
+# Storage directories which have already been validated, so that a directory is only
+# checked the first time it is used rather than on every storage operation
+_validated_directories = set()
+
 
 def get_storage_directory():
     storage_directory = os.environ.get("STORAGE_PATH")
+    if storage_directory in _validated_directories:
+        return storage_directory
     if storage_directory is None:
         raise EnvironmentError(
             "The environment variable 'STORAGE_DIRECTORY' is not set"
@@ -27,4 +36,5 @@ def get_storage_directory():
         raise NotADirectoryError(
             f"The environment variable 'STORAGE_DIRECTORY' does not represent a directory"
         )
+    _validated_directories.add(storage_directory)
     return storage_directory
@@ -0,0 +1,62 @@
+"""
+storage_driver/get_storage_roots.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the storage roots across which files are placed, and rank them for each file by
+weighted rendezvous hashing
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import math
+import hashlib
+from app.get_configuration import get_config
+from app.packages.storage_driver.get_storage_directory import get_storage_directory
+
+
+def get_storage_roots():
+    """
+    Return each storage root in "storage_roots" as its path and weight, or the
+    storage directory alone if none are configured.
+
+    A root without a "weight" is weighted by the capacity of its filesystem, so
+    that each disk fills at the same rate. A root weighted 0 has no files placed on
+    it, but is still looked in, so that it can be drained before it is removed.
+    """
+    configured_roots = get_config().get("storage_roots")
+    if not configured_roots:
+        return [(get_storage_directory(), 1)]
+    storage_roots = []
+    for root in configured_roots:
+        path = root["path"]
+        if not os.path.isdir(path):
+            raise NotADirectoryError(f"Storage root {path} is not a directory")
+        weight = root.get("weight")
+        if weight is None:
+            filesystem = os.statvfs(path)
+            weight = filesystem.f_blocks * filesystem.f_frsize
+        storage_roots.append((path, weight))
+    return storage_roots
+
+
+# Score of a root for a file, highest for the root the file is placed on. Each root
+# wins in proportion to its weight, and adding or removing a root only moves the
+# files which it wins or had won.
+def _score(filename: str, path: str, weight: float):
+    digest = hashlib.blake2b(f"{path}\0{filename}".encode(), digest_size=8).digest()
+    uniform = (int.from_bytes(digest, "big") + 1) / (2**64 + 1)
+    return -weight / math.log(uniform)
+
+
+# The storage roots in the order of preference for a file, the first being the
+# root on which it is placed
+def rank_storage_roots(filename: str, storage_roots: list):
+    return sorted(
+        storage_roots,
+        key=lambda root: _score(filename, root[0], root[1]),
+        reverse=True,
+    )
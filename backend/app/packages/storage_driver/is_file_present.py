@@ -10,13 +10,8 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import os
-from app.packages.storage_driver.get_storage_directory import get_storage_directory
+from app.packages.storage_driver.locate_file import locate_file
 
 
-def is_file_present(filename: str):
-    filepath = os.path.join(get_storage_directory(), filename)
-    if os.path.exists(filepath) and os.path.isfile(filepath):
-        return True
-    else:
-        return False
+def is_file_present(filename: str, storage_directory: str = None):
+    return locate_file(filename, storage_directory) is not None
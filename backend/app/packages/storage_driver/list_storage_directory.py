@@ -0,0 +1,88 @@
+"""
+storage_driver/list_storage_directory.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+List the files held in the storage directory
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import shutil
+import string
+from app.packages.storage_driver.get_storage_directory import get_storage_directory
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+
+
+# List the files held directly in the storage directory, or in another storage root
+# if one is given, as under the flat layout. Hidden files, such as .gitignore and
+# copies which are still being moved in, are not listed.
+def list_storage_directory(storage_directory: str = None):
+    with os.scandir(storage_directory or get_storage_directory()) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.is_file() and not entry.name.startswith(".")
+        ]
+
+
+def _is_shard_name(name: str):
+    return len(name) == 2 and all(character in string.hexdigits for character in name)
+
+
+# List the top level shard directories of the sharded layout
+def list_shards(storage_directory: str = None):
+    with os.scandir(storage_directory or get_storage_directory()) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.is_dir() and _is_shard_name(entry.name)
+        ]
+
+
+# List the files held under a top level shard directory
+def list_shard(shard: str, storage_directory: str = None):
+    filenames = []
+    storage_directory = storage_directory or get_storage_directory()
+    with os.scandir(os.path.join(storage_directory, shard)) as shards:
+        for subshard in shards:
+            if not subshard.is_dir():
+                continue
+            with os.scandir(subshard.path) as entries:
+                filenames.extend(
+                    entry.name
+                    for entry in entries
+                    if entry.is_file() and not entry.name.startswith(".")
+                )
+    return filenames
+
+
+# Map the entries of a partial directory, being staged files and the directories of
+# resumable uploads, to their stat results
+def list_partial_directory(partial_directory: str):
+    if not os.path.isdir(partial_directory):
+        return {}
+    with os.scandir(partial_directory) as entries:
+        return {entry.name: entry.stat() for entry in entries}
+
+
+async def list_partial_directory_async(partial_directory: str):
+    return await run_in_storage_executor(list_partial_directory, partial_directory)
+
+
+# Remove a staged file, or a directory along with everything staged in it
+def remove_staged_path(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def remove_staged_path_async(path: str):
+    await run_in_storage_executor(remove_staged_path, path)
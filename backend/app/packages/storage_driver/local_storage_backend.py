@@ -0,0 +1,105 @@
+"""
+storage_driver/local_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold file binaries in the storage directory on the local filesystem
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+from app.packages.storage_driver.storage_backend import StorageBackend
+from app.packages.storage_driver.get_storage_directory import get_storage_directory
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+from app.packages.storage_driver.get_file_path import (
+    is_storage_sharded,
+    get_relative_path,
+)
+from app.packages.storage_driver.locate_file import locate_file
+from app.packages.storage_driver.move_file import move_file
+from app.packages.storage_driver.is_file_present import is_file_present
+from app.packages.storage_driver.get_file_stat import get_file_stat
+from app.packages.storage_driver.read_file import read_file
+from app.packages.storage_driver.read_file_range import read_file_range
+from app.packages.storage_driver.delete_file import delete_file
+from app.packages.storage_driver.list_storage_directory import (
+    list_storage_directory,
+    list_shards,
+    list_shard,
+)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Holds files in the storage directory, or in another storage root if one is
+    given, which is resolved and validated once when the backend is created.
+    Blocking calls are made on the storage threads.
+
+    Files are held directly in the storage directory, or under the sharded layout
+    in shard directories named by a hash of their filenames, such as "ab/cd/".
+    """
+
+    local = True
+    environment_keys = ["STORAGE_PATH"]
+
+    def __init__(self, root: str = None):
+        self.root = root or get_storage_directory()
+
+    def _are_present(self, filenames: list):
+        return {
+            filename: is_file_present(filename, self.root) for filename in filenames
+        }
+
+    def _locate(self, filename: str):
+        located = locate_file(filename, self.root)
+        if located is None:
+            return None
+        return (self.root, *located)
+
+    async def is_present(self, filename: str):
+        return await run_in_storage_executor(is_file_present, filename, self.root)
+
+    # Check every file in one storage operation, rather than one for each
+    async def are_present(self, filenames: list):
+        if not filenames:
+            return {}
+        return await run_in_storage_executor(self._are_present, filenames)
+
+    async def stat(self, filename: str):
+        return await run_in_storage_executor(get_file_stat, filename, self.root)
+
+    async def locate(self, filename: str):
+        return await run_in_storage_executor(self._locate, filename)
+
+    async def read(self, filename: str):
+        return await run_in_storage_executor(read_file, filename, self.root)
+
+    def read_range(self, filename: str, start: int, end: int):
+        return read_file_range(filename, start, end, self.root)
+
+    # List the files under each shard in parallel, along with any held directly in
+    # the storage directory which have not yet been moved into their shards
+    async def list(self):
+        filenames = await run_in_storage_executor(list_storage_directory, self.root)
+        if is_storage_sharded():
+            shards = await run_in_storage_executor(list_shards, self.root)
+            listings = await asyncio.gather(
+                *(
+                    run_in_storage_executor(list_shard, shard, self.root)
+                    for shard in shards
+                )
+            )
+            for listing in listings:
+                filenames.extend(listing)
+        return filenames
+
+    async def _store(self, staged_path: str, filename: str):
+        path = os.path.normpath(os.path.join(self.root, get_relative_path(filename)))
+        await run_in_storage_executor(move_file, staged_path, path)
+
+    async def _delete(self, filename: str):
+        await run_in_storage_executor(delete_file, filename, self.root)
@@ -0,0 +1,30 @@
+"""
+storage_driver/locate_file.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Find where a file is held in the storage directory
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import stat
+from app.packages.storage_driver.get_storage_directory import get_storage_directory
+from app.packages.storage_driver.get_file_path import get_relative_paths
+
+
+# Return the path of a file relative to the storage directory, or to another storage
+# root if one is given, with its stat result, or None if there is no such file
+def locate_file(filename: str, storage_directory: str = None):
+    storage_directory = storage_directory or get_storage_directory()
+    for relative_path in get_relative_paths(filename):
+        try:
+            stat_result = os.stat(os.path.join(storage_directory, relative_path))
+        except FileNotFoundError:
+            continue
+        if stat.S_ISREG(stat_result.st_mode):
+            return relative_path, stat_result
+    return None
@@ -0,0 +1,64 @@
+"""
+storage_driver/memory_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold file binaries in memory, for tests and for short lived instances
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import time
+from app.packages.storage_driver.storage_backend import StorageBackend, StoredFileStat
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+
+
+def _take_staged_file(staged_path: str):
+    with open(staged_path, "rb") as file:
+        content = file.read()
+    os.remove(staged_path)
+    return content
+
+
+class MemoryStorageBackend(StorageBackend):
+    """
+    Holds each file as bytes along with the time it was stored. Nothing is kept
+    once the process exits.
+    """
+
+    def __init__(self):
+        self._files = {}
+
+    async def is_present(self, filename: str):
+        return filename in self._files
+
+    async def are_present(self, filenames: list):
+        return {filename: filename in self._files for filename in filenames}
+
+    async def stat(self, filename: str):
+        if filename not in self._files:
+            return None
+        content, mtime = self._files[filename]
+        return StoredFileStat(st_size=len(content), st_mtime=mtime)
+
+    async def read(self, filename: str):
+        if filename not in self._files:
+            raise FileNotFoundError(filename)
+        return self._files[filename][0]
+
+    async def read_range(self, filename: str, start: int, end: int):
+        yield (await self.read(filename))[start : end + 1]
+
+    async def list(self):
+        return list(self._files)
+
+    async def _store(self, staged_path: str, filename: str):
+        content = await run_in_storage_executor(_take_staged_file, staged_path)
+        self._files[filename] = (content, time.time())
+
+    async def _delete(self, filename: str):
+        if self._files.pop(filename, None) is None:
+            raise FileNotFoundError(filename)
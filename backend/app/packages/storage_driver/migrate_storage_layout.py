@@ -0,0 +1,61 @@
+"""
+storage_driver/migrate_storage_layout.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Move the files of a flat storage directory into the shard directories of the sharded
+layout, while Atto-Host keeps serving them
+
+    STORAGE_PATH=... CONFIG_PATH=... python -m app.packages.storage_driver.migrate_storage_layout
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from app.packages.storage_driver.get_storage_directory import get_storage_directory
+from app.packages.storage_driver.get_file_path import (
+    is_storage_sharded,
+    get_shard_directory,
+)
+from app.packages.storage_driver.list_storage_directory import list_storage_directory
+from app.packages.storage_driver.get_storage_roots import get_storage_roots
+
+
+def migrate_storage_layout(storage_directory: str = None):
+    """
+    Move each file held directly in the storage directory, or in another storage
+    root if one is given, into its shard, returning the number of files moved.
+
+    "storage_layout" must already be "sharded", so that files are written into their
+    shards while the migration runs and are found at either path until it is done.
+    Each file is moved with a single rename, so it is always at one path or the other.
+    """
+    if not is_storage_sharded():
+        raise ValueError("'storage_layout' must be 'sharded' to migrate storage.")
+    storage_directory = storage_directory or get_storage_directory()
+    created_shards = set()
+    moved = 0
+    for filename in list_storage_directory(storage_directory):
+        shard_directory = get_shard_directory(filename)
+        if shard_directory not in created_shards:
+            os.makedirs(os.path.join(storage_directory, shard_directory), exist_ok=True)
+            created_shards.add(shard_directory)
+        # A copy already stored in the shard is of the same file, so is replaced
+        os.replace(
+            os.path.join(storage_directory, filename),
+            os.path.join(storage_directory, shard_directory, filename),
+        )
+        moved += 1
+    return moved
+
+
+def main():
+    for storage_directory, _ in get_storage_roots():
+        moved = migrate_storage_layout(storage_directory)
+        print(f"Moved {moved} files into their shards in {storage_directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+storage_driver/move_file.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Move a file into storage, which may be on another filesystem than the file
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import errno
+from app.packages.storage_driver.copy_file_contents import copy_file_contents
+
+
+def move_file(source_path: str, target_path: str):
+    """
+    Move a file with a rename, creating the target's directory if needed.
+
+    Where the target is on another filesystem, the file is copied beside the target
+    under a hidden name, which listings skip, and renamed into place, so that the
+    target is never seen part written. The source is removed once it is copied,
+    and should it have been deleted meanwhile, the copy is removed too and
+    FileNotFoundError raised.
+    """
+    try:
+        os.replace(source_path, target_path)
+        return
+    except FileNotFoundError:
+        if not os.path.exists(source_path):
+            raise
+        # The first file of its shard, so create the shard directory
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        return move_file(source_path, target_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    target_directory, target_filename = os.path.split(target_path)
+    copy_path = os.path.join(target_directory, f".{target_filename}.moving")
+    try:
+        with open(source_path, "rb") as source_file, open(copy_path, "wb") as copy_file:
+            copy_file_contents(
+                source_file.fileno(),
+                copy_file.fileno(),
+                os.fstat(source_file.fileno()).st_size,
+            )
+            os.fsync(copy_file.fileno())
+        os.replace(copy_path, target_path)
+    except BaseException:
+        if os.path.exists(copy_path):
+            os.remove(copy_path)
+        raise
+    try:
+        os.remove(source_path)
+    except FileNotFoundError:
+        # The file was deleted while it was copied, so its copy must not outlive it
+        try:
+            os.remove(target_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,139 @@
+"""
+storage_driver/multi_root_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold file binaries across several storage roots on the local filesystem, such as one
+on each disk
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+from app.packages.storage_driver.storage_backend import StorageBackend
+from app.packages.storage_driver.local_storage_backend import LocalStorageBackend
+from app.packages.storage_driver.get_storage_directory import PARTIAL_DIRECTORY
+from app.packages.storage_driver.get_storage_roots import (
+    get_storage_roots,
+    rank_storage_roots,
+)
+
+
+class MultiRootStorageBackend(StorageBackend):
+    """
+    Places each file on one of the roots in "storage_roots" by weighted rendezvous
+    hashing of its filename, so that the root of a file is found from its name
+    alone and the roots fill in proportion to their weights.
+
+    A file which is not on its root, because roots were added or removed and it
+    has not yet been moved by rebalance_storage_roots(), is looked for on the other
+    roots in order of preference, which is where such a file most likely is.
+
+    Files are staged on the root which they are placed on, so that storing them is
+    a rename within one filesystem rather than a copy between disks.
+    """
+
+    local = True
+    config_keys = ["storage_roots"]
+    environment_keys = ["STORAGE_PATH"]
+
+    def __init__(self):
+        self.storage_roots = get_storage_roots()
+        self.roots = {path: LocalStorageBackend(path) for path, _ in self.storage_roots}
+
+    # The roots in the order in which they are checked for a file
+    def _ranked_roots(self, filename: str):
+        return [
+            self.roots[path]
+            for path, _ in rank_storage_roots(filename, self.storage_roots)
+        ]
+
+    def get_partial_directory(self, filename: str):
+        root = self._ranked_roots(filename.split(os.sep)[0])[0]
+        return os.path.join(root.root, PARTIAL_DIRECTORY)
+
+    # The partial directory of every root, and that of the storage directory, where
+    # files were staged before any roots were configured
+    def list_partial_directories(self):
+        partial_directories = [
+            os.path.join(path, PARTIAL_DIRECTORY) for path in self.roots
+        ]
+        if os.environ.get("STORAGE_PATH"):
+            partial_directories += super().list_partial_directories()
+        return list(dict.fromkeys(partial_directories))
+
+    async def _find_root(self, filename: str):
+        for root in self._ranked_roots(filename):
+            if await root.is_present(filename):
+                return root
+        return None
+
+    async def is_present(self, filename: str):
+        return await self._find_root(filename) is not None
+
+    async def are_present(self, filenames: list):
+        """
+        Check each file on its own root, batching the files of each root into one
+        storage operation, and then check those not found on their next choices
+        """
+        presence = dict.fromkeys(filenames, False)
+        remaining = list(filenames)
+        for choice in range(len(self.storage_roots)):
+            batches = {}
+            for filename in remaining:
+                root = self._ranked_roots(filename)[choice]
+                batches.setdefault(root, []).append(filename)
+            results = await asyncio.gather(
+                *(root.are_present(batch) for root, batch in batches.items())
+            )
+            for result in results:
+                presence.update({name: True for name, found in result.items() if found})
+            remaining = [filename for filename in remaining if not presence[filename]]
+            if not remaining:
+                break
+        return presence
+
+    async def locate(self, filename: str):
+        for root in self._ranked_roots(filename):
+            located = await root.locate(filename)
+            if located is not None:
+                return located
+        return None
+
+    async def stat(self, filename: str):
+        located = await self.locate(filename)
+        if located is None:
+            return None
+        return located[2]
+
+    async def read(self, filename: str):
+        for root in self._ranked_roots(filename):
+            try:
+                return await root.read(filename)
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(filename)
+
+    async def read_range(self, filename: str, start: int, end: int):
+        root = await self._find_root(filename)
+        if root is None:
+            raise FileNotFoundError(filename)
+        async for chunk in root.read_range(filename, start, end):
+            yield chunk
+
+    # List every root in parallel, so that each disk is read at once
+    async def list(self):
+        listings = await asyncio.gather(*(root.list() for root in self.roots.values()))
+        return list(dict.fromkeys(name for listing in listings for name in listing))
+
+    async def _store(self, staged_path: str, filename: str):
+        await self._ranked_roots(filename)[0]._store(staged_path, filename)
+
+    async def _delete(self, filename: str):
+        root = await self._find_root(filename)
+        if root is None:
+            raise FileNotFoundError(filename)
+        await root._delete(filename)
@@ -0,0 +1,55 @@
+"""
+storage_driver/presence_index.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+List the files held in storage for a reconcile, taking in the files which are
+written or deleted while storage is listed
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import threading
+
+# The changes made to storage during each listing in progress, by filename
+_listings = []
+_lock = threading.Lock()
+
+
+async def list_present_filenames(storage):
+    """
+    Return the filenames held by a storage backend in sorted order. Files written
+    or deleted while storage is listed are applied to the listing afterwards.
+    """
+    changes = {}
+    with _lock:
+        _listings.append(changes)
+    try:
+        filenames = set(await storage.list())
+    finally:
+        with _lock:
+            _listings.remove(changes)
+    for filename, present in changes.items():
+        if present:
+            filenames.add(filename)
+        else:
+            filenames.discard(filename)
+    return sorted(filenames)
+
+
+def _mark(filename: str, present: bool):
+    with _lock:
+        for changes in _listings:
+            changes[filename] = present
+
+
+# Record a file which has just been stored
+def mark_file_present(filename: str):
+    _mark(filename, True)
+
+
+# Record a file which has just been removed from storage
+def mark_file_absent(filename: str):
+    _mark(filename, False)
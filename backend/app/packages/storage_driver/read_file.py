@@ -0,0 +1,23 @@
+"""
+storage_driver/read_file.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Read the whole of a file in the storage directory
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from app.packages.storage_driver.get_file_path import get_file_paths
+
+
+def read_file(filename: str, storage_directory: str = None):
+    for filepath in get_file_paths(filename, storage_directory):
+        try:
+            with open(filepath, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError(filename)
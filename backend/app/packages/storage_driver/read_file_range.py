@@ -0,0 +1,77 @@
+"""
+storage_driver/read_file_range.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Read a byte range of a file in the storage directory in chunks, from async code
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from app.get_configuration import get_config
+from app.packages.storage_driver.get_file_path import get_file_paths
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+
+# Number of bytes read from storage at a time when "download_chunk_size" is not configured
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# Number of bytes past each chunk which the kernel is asked to read ahead when
+# "download_readahead" is not configured
+DEFAULT_DOWNLOAD_READAHEAD = 4 * 1024 * 1024
+
+
+def _open_for_reading(filename: str, storage_directory: str, start: int):
+    for path in get_file_paths(filename, storage_directory):
+        try:
+            file = open(path, "rb", buffering=0)
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        raise FileNotFoundError(filename)
+    file.seek(start)
+    # Reads are sequential, which lets the kernel read further ahead on its own
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(file.fileno(), start, 0, os.POSIX_FADV_SEQUENTIAL)
+    return file
+
+
+def _read_chunk(file, length: int, readahead: int):
+    # Ask for the bytes beyond this chunk now, so that they are cached by the
+    # time they are read
+    if readahead and hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(
+            file.fileno(), file.tell() + length, readahead, os.POSIX_FADV_WILLNEED
+        )
+    return file.read(length)
+
+
+async def read_file_range(
+    filename: str, start: int, end: int, storage_directory: str = None
+):
+    """
+    Yield the bytes of a file from start to end, both inclusive, in chunks of
+    the configured size. The file is read from the storage directory unless
+    another storage root is given.
+    """
+    config = get_config()
+    chunk_size = config.get("download_chunk_size", DEFAULT_DOWNLOAD_CHUNK_SIZE)
+    readahead = config.get("download_readahead", DEFAULT_DOWNLOAD_READAHEAD)
+    file = await run_in_storage_executor(
+        _open_for_reading, filename, storage_directory, start
+    )
+    try:
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await run_in_storage_executor(
+                _read_chunk, file, min(chunk_size, remaining), readahead
+            )
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_in_storage_executor(file.close)
@@ -0,0 +1,100 @@
+"""
+storage_driver/rebalance_storage_roots.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Move files onto the storage roots they are placed on, after roots are added to or
+removed from "storage_roots", while Atto-Host keeps serving them
+
+    STORAGE_PATH=... CONFIG_PATH=... python -m app.packages.storage_driver.rebalance_storage_roots [removed roots...]
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from app.get_configuration import get_config
+from app.packages.storage_driver.get_file_path import (
+    is_storage_sharded,
+    get_relative_path,
+)
+from app.packages.storage_driver.get_storage_roots import (
+    get_storage_roots,
+    rank_storage_roots,
+)
+from app.packages.storage_driver.list_storage_directory import (
+    list_storage_directory,
+    list_shards,
+    list_shard,
+)
+from app.packages.storage_driver.locate_file import locate_file
+from app.packages.storage_driver.move_file import move_file
+
+
+def _list_root(storage_directory: str):
+    filenames = list_storage_directory(storage_directory)
+    if is_storage_sharded():
+        for shard in list_shards(storage_directory):
+            filenames.extend(list_shard(shard, storage_directory))
+    return filenames
+
+
+# Move the files of one root which are placed on another, returning how many moved
+def _rebalance_root(storage_directory: str, storage_roots: list):
+    moved = 0
+    for filename in _list_root(storage_directory):
+        target_directory = rank_storage_roots(filename, storage_roots)[0][0]
+        if target_directory == storage_directory:
+            continue
+        located = locate_file(filename, storage_directory)
+        if located is None:
+            # Removed since the root was listed
+            continue
+        try:
+            move_file(
+                os.path.join(storage_directory, located[0]),
+                os.path.normpath(
+                    os.path.join(target_directory, get_relative_path(filename))
+                ),
+            )
+        except FileNotFoundError:
+            # Removed while it was being moved
+            continue
+        moved += 1
+    return moved
+
+
+def rebalance_storage_roots(removed_roots: list = None):
+    """
+    Move each file which is not on the root it is placed on onto that root, and
+    every file off the removed roots, returning the number of files moved.
+
+    Rendezvous placement only changes for the files won by an added root or held
+    on a removed one, so only those are moved. Files are found on any root until
+    they are moved, so the roots can be rebalanced while Atto-Host is running.
+    Each root is scanned and drained on a thread of its own.
+
+    The shards of erasure coded files are found on any root and must each stay on
+    a root of their own, so they are never moved.
+    """
+    if get_config().get("storage_backend") == "erasure_coded":
+        raise ValueError("The roots of the 'erasure_coded' backend are not rebalanced")
+    storage_roots = get_storage_roots()
+    source_directories = [path for path, _ in storage_roots] + list(removed_roots or [])
+    with ThreadPoolExecutor(max_workers=len(source_directories)) as executor:
+        return sum(
+            executor.map(_rebalance_root, source_directories, repeat(storage_roots))
+        )
+
+
+def main():
+    moved = rebalance_storage_roots(sys.argv[1:])
+    print(f"Moved {moved} files onto their storage roots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+storage_driver/reed_solomon.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Compute the parity shards of equal length data shards, and recover the data shards
+from any of the shards which number as many, by Reed-Solomon coding over GF(256)
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import functools
+
+# Data and parity shards may number at most the elements of the field between them
+MAX_SHARDS = 256
+
+# GF(256) is built on the polynomial x^8 + x^4 + x^3 + x^2 + 1, whose powers of x
+# run through every non-zero element
+_EXP = [0] * 510
+_LOG = [0] * 256
+_element = 1
+for _power in range(255):
+    _EXP[_power] = _EXP[_power + 255] = _element
+    _LOG[_element] = _power
+    _element <<= 1
+    if _element & 0x100:
+        _element ^= 0x11D
+
+
+def _multiply(a: int, b: int):
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def _inverse(a: int):
+    return _EXP[255 - _LOG[a]]
+
+
+# The product of every byte with a coefficient, for bytes.translate()
+@functools.lru_cache(maxsize=MAX_SHARDS)
+def _multiplication_table(coefficient: int):
+    return bytes(_multiply(coefficient, byte) for byte in range(256))
+
+
+# Row of the coding matrix which gives a shard from the data shards. The data
+# shards are given by rows of the identity, so they are stored as they are, and the
+# parity shards by rows of a Cauchy matrix, every square submatrix of which is
+# invertible, so that any data_count rows of the whole matrix are too.
+def _coding_row(index: int, data_count: int):
+    if index < data_count:
+        return [int(column == index) for column in range(data_count)]
+    return [_inverse(index ^ column) for column in range(data_count)]
+
+
+# The sum of the shards, each multiplied by its coefficient. Each product is found
+# by table lookup and the sum, being an XOR, is taken of the shards as integers.
+def _combine(coefficients: list, shards: list, length: int):
+    total = 0
+    for coefficient, shard in zip(coefficients, shards):
+        if coefficient == 1:
+            total ^= int.from_bytes(shard, "little")
+        elif coefficient:
+            product = shard.translate(_multiplication_table(coefficient))
+            total ^= int.from_bytes(product, "little")
+    return total.to_bytes(length, "little")
+
+
+# Invert a square matrix over GF(256) by Gauss-Jordan elimination
+def _invert(matrix: list):
+    size = len(matrix)
+    rows = [
+        list(row) + [int(column == index) for column in range(size)]
+        for index, row in enumerate(matrix)
+    ]
+    for column in range(size):
+        pivot = next(row for row in range(column, size) if rows[row][column])
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        scale = _inverse(rows[column][column])
+        rows[column] = [_multiply(scale, value) for value in rows[column]]
+        for row in range(size):
+            factor = rows[row][column]
+            if row != column and factor:
+                rows[row] = [
+                    value ^ _multiply(factor, pivot_value)
+                    for value, pivot_value in zip(rows[row], rows[column])
+                ]
+    return [row[size:] for row in rows]
+
+
+def encode_parity(data_shards: list, parity_count: int):
+    """
+    Return the parity shards of a list of data shards, which are all of one length
+    """
+    data_count = len(data_shards)
+    if data_count + parity_count > MAX_SHARDS:
+        raise ValueError(f"At most {MAX_SHARDS} shards can be coded together")
+    length = len(data_shards[0]) if data_shards else 0
+    return [
+        _combine(_coding_row(index, data_count), data_shards, length)
+        for index in range(data_count, data_count + parity_count)
+    ]
+
+
+def reconstruct_data(shards: dict, data_count: int):
+    """
+    Return the data shards, given a dict of any of the shards by their index, where
+    the data shards come first and are followed by the parity shards.
+
+    Data shards which are given are returned as they are. The others are
+    recovered from data_count of the given shards, preferring data shards, and
+    ValueError is raised if fewer are given.
+    """
+    if all(index in shards for index in range(data_count)):
+        return [shards[index] for index in range(data_count)]
+    indexes = sorted(shards)[:data_count]
+    if len(indexes) < data_count:
+        raise ValueError(
+            f"{len(shards)} shards were given, but {data_count} are needed"
+        )
+    length = len(shards[indexes[0]])
+    decoding = _invert([_coding_row(index, data_count) for index in indexes])
+    given = [shards[index] for index in indexes]
+    return [
+        (shards[index] if index in shards else _combine(decoding[index], given, length))
+        for index in range(data_count)
+    ]
@@ -0,0 +1,22 @@
+"""
+storage_driver/s3_settings.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Defaults and limits of the "s3_" config keys, kept apart from the S3 storage backend
+so that the configuration can be checked against them
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+# Defaults of the optional "s3_" config keys
+DEFAULT_S3_REGION = "us-east-1"
+DEFAULT_S3_MAX_CONNECTIONS = 32
+DEFAULT_S3_MULTIPART_THRESHOLD = 64 * 1024 * 1024
+DEFAULT_S3_PART_SIZE = 16 * 1024 * 1024
+DEFAULT_S3_UPLOAD_CONCURRENCY = 4
+
+# Smallest part which S3 accepts in a multipart upload, other than the last
+MIN_S3_PART_SIZE = 5 * 1024 * 1024
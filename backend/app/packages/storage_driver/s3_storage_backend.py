@@ -0,0 +1,338 @@
+"""
+storage_driver/s3_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Hold file binaries in a bucket of an S3-compatible object store, such as MinIO
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+import logging
+import hashlib
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
+from xml.etree import ElementTree
+import httpx
+
+from app.get_configuration import get_config
+from app.packages.storage_driver.storage_backend import StorageBackend, StoredFileStat
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+from app.packages.storage_driver.read_file_range import DEFAULT_DOWNLOAD_CHUNK_SIZE
+from app.packages.storage_driver.s3_settings import (
+    DEFAULT_S3_REGION,
+    DEFAULT_S3_MAX_CONNECTIONS,
+    DEFAULT_S3_MULTIPART_THRESHOLD,
+    DEFAULT_S3_PART_SIZE,
+    DEFAULT_S3_UPLOAD_CONCURRENCY,
+)
+from app.packages.storage_driver.sign_s3_request import (
+    sign_s3_request,
+    UNSIGNED_PAYLOAD,
+)
+
+# Seconds to wait on the object store for any one operation of a request
+S3_TIMEOUT = 60
+
+# Number of bytes of a staged file read and sent at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+logger = logging.getLogger(__name__)
+
+
+class S3StorageError(Exception):
+    """Exception raised when the object store refuses a request"""
+
+    def __init__(self, operation: str, response: httpx.Response):
+        self.status_code = response.status_code
+        self.message = f"S3 {operation} failed with HTTP {response.status_code}"
+        super().__init__(self.message)
+
+
+def get_s3_credentials():
+    access_key_id = os.environ.get("AWS_ACCESS_KEY_ID")
+    secret_access_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    if access_key_id is None or secret_access_key is None:
+        raise EnvironmentError(
+            "The environment variables 'AWS_ACCESS_KEY_ID' and 'AWS_SECRET_ACCESS_KEY' must be set"
+        )
+    return access_key_id, secret_access_key
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Holds each file as an object named by "s3_prefix" and its filename, in the
+    bucket "s3_bucket" at "s3_endpoint_url", which is addressed by path so that
+    any S3-compatible store can be used.
+
+    Requests share one pool of up to "s3_max_connections" kept-alive connections.
+    Files larger than "s3_multipart_threshold" are uploaded as a multipart upload
+    of "s3_part_size" parts, "s3_upload_concurrency" at a time, and every upload
+    streams the staged file rather than loading it into memory. Downloads stream
+    ranged GETs in chunks of "download_chunk_size".
+    """
+
+    config_keys = [
+        "s3_endpoint_url",
+        "s3_bucket",
+        "s3_prefix",
+        "s3_region",
+        "s3_multipart_threshold",
+        "s3_part_size",
+        "s3_upload_concurrency",
+        "s3_max_connections",
+        "download_chunk_size",
+    ]
+    environment_keys = ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"]
+
+    def __init__(self, config: dict = None, transport: httpx.AsyncBaseTransport = None):
+        config = config if config is not None else get_config()
+        self.endpoint_url = config["s3_endpoint_url"].rstrip("/")
+        self.bucket = config["s3_bucket"]
+        self.prefix = config.get("s3_prefix", "")
+        self.region = config.get("s3_region", DEFAULT_S3_REGION)
+        self.multipart_threshold = config.get(
+            "s3_multipart_threshold", DEFAULT_S3_MULTIPART_THRESHOLD
+        )
+        self.part_size = config.get("s3_part_size", DEFAULT_S3_PART_SIZE)
+        self.upload_concurrency = config.get(
+            "s3_upload_concurrency", DEFAULT_S3_UPLOAD_CONCURRENCY
+        )
+        self.chunk_size = config.get("download_chunk_size", DEFAULT_DOWNLOAD_CHUNK_SIZE)
+        self._credentials = get_s3_credentials()
+        max_connections = config.get("s3_max_connections", DEFAULT_S3_MAX_CONNECTIONS)
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=S3_TIMEOUT,
+            transport=transport,
+        )
+
+    def _url(self, filename: str = None, params: dict = None):
+        url = f"{self.endpoint_url}/{quote(self.bucket, safe='~')}"
+        if filename is not None:
+            url += "/" + quote(self.prefix + filename, safe="/~")
+        if params:
+            url += "?" + "&".join(
+                f"{quote(name, safe='~')}={quote(value, safe='~')}"
+                for name, value in params.items()
+            )
+        return url
+
+    def _build_request(
+        self,
+        method: str,
+        filename: str = None,
+        params: dict = None,
+        headers: dict = None,
+        content=None,
+    ):
+        # Bodies held in memory are signed, and streamed bodies are not
+        if content is None or isinstance(content, bytes):
+            payload_hash = hashlib.sha256(content or b"").hexdigest()
+        else:
+            payload_hash = UNSIGNED_PAYLOAD
+        url = self._url(filename, params)
+        headers = sign_s3_request(
+            method, url, headers or {}, payload_hash, self._credentials, self.region
+        )
+        return self._client.build_request(method, url, headers=headers, content=content)
+
+    async def _request(self, method: str, filename: str = None, **kwargs):
+        return await self._client.send(self._build_request(method, filename, **kwargs))
+
+    # Yield length bytes of a staged file from offset, reading on a storage thread
+    async def _read_staged_file(self, path: str, offset: int, length: int):
+        file = await run_in_storage_executor(open, path, "rb")
+        try:
+            await run_in_storage_executor(file.seek, offset)
+            while length > 0:
+                chunk = await run_in_storage_executor(
+                    file.read, min(UPLOAD_CHUNK_SIZE, length)
+                )
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+        finally:
+            await run_in_storage_executor(file.close)
+
+    async def _head(self, filename: str):
+        response = await self._request("HEAD", filename)
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise S3StorageError("HEAD", response)
+        return response
+
+    async def is_present(self, filename: str):
+        return await self._head(filename) is not None
+
+    async def stat(self, filename: str):
+        response = await self._head(filename)
+        if response is None:
+            return None
+        last_modified = response.headers.get("Last-Modified")
+        return StoredFileStat(
+            st_size=int(response.headers["Content-Length"]),
+            st_mtime=(
+                parsedate_to_datetime(last_modified).timestamp()
+                if last_modified is not None
+                else 0
+            ),
+        )
+
+    async def read(self, filename: str):
+        response = await self._request("GET", filename)
+        if response.status_code == 404:
+            raise FileNotFoundError(filename)
+        if response.status_code != 200:
+            raise S3StorageError("GET", response)
+        return response.content
+
+    async def read_range(self, filename: str, start: int, end: int):
+        request = self._build_request(
+            "GET", filename, headers={"Range": f"bytes={start}-{end}"}
+        )
+        response = await self._client.send(request, stream=True)
+        try:
+            if response.status_code == 404:
+                raise FileNotFoundError(filename)
+            if response.status_code not in [200, 206]:
+                raise S3StorageError("GET", response)
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    # List every object under the prefix, a page of up to 1000 at a time
+    async def list(self):
+        filenames = []
+        params = {"list-type": "2", "prefix": self.prefix}
+        while True:
+            response = await self._request("GET", params=params)
+            if response.status_code != 200:
+                raise S3StorageError("ListObjectsV2", response)
+            result = ElementTree.fromstring(response.content)
+            filenames.extend(
+                key.text[len(self.prefix) :]
+                for key in result.iter(f"{S3_NAMESPACE}Key")
+            )
+            if result.findtext(f"{S3_NAMESPACE}IsTruncated") != "true":
+                return filenames
+            params = {
+                **params,
+                "continuation-token": result.findtext(
+                    f"{S3_NAMESPACE}NextContinuationToken"
+                ),
+            }
+
+    async def _put(self, staged_path: str, filename: str, size: int):
+        response = await self._request(
+            "PUT",
+            filename,
+            headers={"Content-Length": str(size)},
+            content=self._read_staged_file(staged_path, 0, size),
+        )
+        if response.status_code != 200:
+            raise S3StorageError("PUT", response)
+
+    async def _upload_part(
+        self,
+        staged_path: str,
+        filename: str,
+        upload_id: str,
+        part_number: int,
+        semaphore: asyncio.Semaphore,
+        size: int,
+    ):
+        offset = (part_number - 1) * self.part_size
+        length = min(self.part_size, size - offset)
+        async with semaphore:
+            response = await self._request(
+                "PUT",
+                filename,
+                params={"partNumber": str(part_number), "uploadId": upload_id},
+                headers={"Content-Length": str(length)},
+                content=self._read_staged_file(staged_path, offset, length),
+            )
+        if response.status_code != 200:
+            raise S3StorageError("UploadPart", response)
+        return response.headers["ETag"]
+
+    async def _put_multipart(self, staged_path: str, filename: str, size: int):
+        """
+        Upload a file as parts sent concurrently, completing the upload once every
+        part is stored, or aborting it so that no parts are left behind
+        """
+        response = await self._request("POST", filename, params={"uploads": ""})
+        if response.status_code != 200:
+            raise S3StorageError("CreateMultipartUpload", response)
+        upload_id = ElementTree.fromstring(response.content).findtext(
+            f"{S3_NAMESPACE}UploadId"
+        )
+
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+        part_count = max(1, -(-size // self.part_size))
+        tasks = [
+            asyncio.ensure_future(
+                self._upload_part(
+                    staged_path, filename, upload_id, number, semaphore, size
+                )
+            )
+            for number in range(1, part_count + 1)
+        ]
+        try:
+            etags = await asyncio.gather(*tasks)
+            parts = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in enumerate(etags, start=1)
+            )
+            response = await self._request(
+                "POST",
+                filename,
+                params={"uploadId": upload_id},
+                content=f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode(),
+            )
+            # The store may report a failure to complete in the body of an HTTP 200
+            if (
+                response.status_code != 200
+                or ElementTree.fromstring(response.content).tag == "Error"
+            ):
+                raise S3StorageError("CompleteMultipartUpload", response)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await self._request("DELETE", filename, params={"uploadId": upload_id})
+            except Exception as e:
+                logger.error(f"Failed to abort the multipart upload of {filename}: {e}")
+            raise
+
+    async def _store(self, staged_path: str, filename: str):
+        size = (await run_in_storage_executor(os.stat, staged_path)).st_size
+        if size > self.multipart_threshold:
+            await self._put_multipart(staged_path, filename, size)
+        else:
+            await self._put(staged_path, filename, size)
+        await run_in_storage_executor(os.remove, staged_path)
+
+    # DELETE succeeds whether or not the object exists, so check that it does first
+    async def _delete(self, filename: str):
+        if not await self.is_present(filename):
+            raise FileNotFoundError(filename)
+        response = await self._request("DELETE", filename)
+        if response.status_code not in [200, 204]:
+            raise S3StorageError("DELETE", response)
+
+    async def close(self):
+        await self._client.aclose()
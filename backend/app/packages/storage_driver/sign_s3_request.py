@@ -0,0 +1,96 @@
+"""
+storage_driver/sign_s3_request.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Sign a request to an S3-compatible object store with AWS Signature Version 4
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import hmac
+import hashlib
+from datetime import datetime, timezone
+from urllib.parse import quote, parse_qsl
+import httpx
+
+# Payload hash of a request whose body is streamed without being hashed first
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def _hmac(key: bytes, message: str):
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def sign_s3_request(
+    method: str,
+    url: str,
+    headers: dict,
+    payload_hash: str,
+    credentials: tuple,
+    region: str,
+    now: datetime = None,
+):
+    """
+    Return the headers of a request with its x-amz-date, x-amz-content-sha256 and
+    Authorization headers added. Every given header is signed along with the host.
+
+    credentials is the access key ID and the secret access key. The payload hash is
+    the hex SHA-256 of the body, or UNSIGNED_PAYLOAD for a body which is streamed.
+    """
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    parsed_url = httpx.URL(url)
+    headers = {
+        **headers,
+        "Host": parsed_url.netloc.decode(),
+        "x-amz-content-sha256": payload_hash,
+        "x-amz-date": amz_date,
+    }
+
+    canonical_headers = sorted(
+        (name.lower(), " ".join(str(value).split())) for name, value in headers.items()
+    )
+    signed_headers = ";".join(name for name, _ in canonical_headers)
+    canonical_query = "&".join(
+        f"{quote(name, safe='~')}={quote(value, safe='~')}"
+        for name, value in sorted(
+            parse_qsl(parsed_url.query.decode(), keep_blank_values=True)
+        )
+    )
+    canonical_request = "\n".join(
+        [
+            method,
+            quote(parsed_url.path, safe="/~"),
+            canonical_query,
+            "".join(f"{name}:{value}\n" for name, value in canonical_headers),
+            signed_headers,
+            payload_hash,
+        ]
+    )
+
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+    access_key_id, secret_access_key = credentials
+    signing_key = _hmac(("AWS4" + secret_access_key).encode(), date)
+    for part in [region, "s3", "aws4_request"]:
+        signing_key = _hmac(signing_key, part)
+    signature = hmac.new(
+        signing_key, string_to_sign.encode(), hashlib.sha256
+    ).hexdigest()
+
+    headers["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key_id}/{scope},"
+        f"SignedHeaders={signed_headers},Signature={signature}"
+    )
+    return headers
@@ -0,0 +1,111 @@
+"""
+storage_driver/storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+The interface through which file binaries are held, read and removed, whichever
+backend holds them
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+from collections import namedtuple
+
+from app.packages.caching.file_body_cache import invalidate_file_body
+from app.packages.storage_driver.get_storage_directory import (
+    get_storage_directory,
+    PARTIAL_DIRECTORY,
+)
+from app.packages.storage_driver.presence_index import (
+    mark_file_present,
+    mark_file_absent,
+)
+
+# The size and modification time of a file held by a backend without os.stat()
+StoredFileStat = namedtuple("StoredFileStat", ["st_size", "st_mtime"])
+
+
+class StorageBackend:
+    """
+    Holds file binaries by filename. Every method is a coroutine, so that backends
+    may block on a storage thread or await the network as suits them.
+
+    Files are written by staging them on local disk, through StorageWriter, and are
+    then handed to store(). Storing and deleting through this class keeps the file
+    body cache and any listing of storage in progress in step with the backend.
+    """
+
+    # Whether files are held on the local filesystem, where downloads may be sent
+    # with sendfile() or offloaded to a reverse proxy
+    local = False
+
+    # The config keys and environment variables which the backend is created from,
+    # so that it is only created afresh when one of them changes
+    config_keys = []
+    environment_keys = []
+
+    # The partial directory in which a file is staged, chosen by the first component
+    # of its staged name, so that the files staged for one upload are kept together
+    def get_partial_directory(self, filename: str):
+        return os.path.join(get_storage_directory(), PARTIAL_DIRECTORY)
+
+    # Every partial directory in which files may be staged
+    def list_partial_directories(self):
+        return [os.path.join(get_storage_directory(), PARTIAL_DIRECTORY)]
+
+    async def is_present(self, filename: str) -> bool:
+        raise NotImplementedError
+
+    # Map each filename to whether it is present
+    async def are_present(self, filenames: list) -> dict:
+        present = await asyncio.gather(*map(self.is_present, filenames))
+        return dict(zip(filenames, present))
+
+    # Return the stat result of a file, or None if there is no such file
+    async def stat(self, filename: str):
+        raise NotImplementedError
+
+    # Return the storage root holding a file, which is None where files are not held
+    # on the local filesystem, the path of the file relative to it and its stat result,
+    # or None if there is no such file
+    async def locate(self, filename: str):
+        stat_result = await self.stat(filename)
+        if stat_result is None:
+            return None
+        return None, filename, stat_result
+
+    async def read(self, filename: str) -> bytes:
+        raise NotImplementedError
+
+    # Yield the bytes of a file from start to end, both inclusive, in chunks
+    def read_range(self, filename: str, start: int, end: int):
+        raise NotImplementedError
+
+    async def list(self) -> list:
+        raise NotImplementedError
+
+    async def _store(self, staged_path: str, filename: str):
+        raise NotImplementedError
+
+    async def _delete(self, filename: str):
+        raise NotImplementedError
+
+    # Release whatever the backend holds open, such as connections
+    async def close(self):
+        pass
+
+    # Move a fully written file from its staged path into storage
+    async def store(self, staged_path: str, filename: str):
+        await self._store(staged_path, filename)
+        invalidate_file_body(filename)
+        mark_file_present(filename)
+
+    # Remove a file, raising FileNotFoundError if there is no such file
+    async def delete(self, filename: str):
+        await self._delete(filename)
+        invalidate_file_body(filename)
+        mark_file_absent(filename)
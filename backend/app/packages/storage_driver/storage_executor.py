@@ -0,0 +1,48 @@
+"""
+storage_driver/storage_executor.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Run blocking storage operations on a bounded, dedicated thread pool so that they
+do not stall the event loop
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app.get_configuration import get_config
+
+# Number of storage threads used when "storage_threads" is not configured
+DEFAULT_STORAGE_THREADS = 8
+
+_executor = None
+
+
+def get_storage_executor():
+    global _executor
+    if _executor is None:
+        max_workers = get_config().get("storage_threads", DEFAULT_STORAGE_THREADS)
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+    return _executor
+
+
+async def run_in_storage_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_storage_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+# Wait for in-flight storage operations and release the threads
+def shutdown_storage_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,159 @@
+"""
+storage_driver/storage_writer.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Write a file into the storage directory from async code
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import fcntl
+import hashlib
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+
+
+# Get the path of a staged file, in the partial directory in which the backend stages
+# it, or in a subdirectory of that where the filename has one, creating the directory
+# if needed
+def get_partial_path(filename: str):
+    partial_directory = get_storage_backend().get_partial_directory(filename)
+    partial_path = os.path.join(partial_directory, filename)
+    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+    return partial_path
+
+
+class StorageWriter:
+    """
+    Writes a file into storage, performing every operation on a storage thread.
+
+    The file is staged in the partial directory, hashed with SHA-256 as it is
+    written, and only handed to the storage backend by commit().
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0
+        self._file = None
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def _lock(self):
+        # Open the staged file without changing it, and lock it before anything is
+        # written, so that a second writer of the same file fails with
+        # BlockingIOError rather than writing over the first
+        descriptor = os.open(
+            get_partial_path(self.filename), os.O_RDWR | os.O_CREAT, 0o666
+        )
+        self._file = open(descriptor, "r+b")
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._close()
+            raise
+
+    def _seek(self, offset: int):
+        # Resume the staged file, dropping anything written past the offset
+        if os.fstat(self._file.fileno()).st_size < offset:
+            self._close()
+            raise ValueError(f"Staged file {self.filename} is shorter than {offset}B")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self.size = offset
+
+    def _open(self, offset: int = None):
+        self._lock()
+        self._seek(offset or 0)
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._hash.update(data)
+
+    def _read_head(self, length: int):
+        with open(get_partial_path(self.filename), "rb") as file:
+            return file.read(length)
+
+    def _rehash(self):
+        self._hash = hashlib.sha256()
+        self.size = 0
+        with open(get_partial_path(self.filename), "rb") as file:
+            while chunk := file.read(1024 * 1024):
+                self._hash.update(chunk)
+                self.size += len(chunk)
+
+    def _save(self, data: bytes):
+        self._open()
+        self._write(data)
+        self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rename(self, filename: str):
+        self._close()
+        os.replace(get_partial_path(self.filename), get_partial_path(filename))
+        self.filename = filename
+
+    def _discard(self):
+        self._close()
+        path = get_partial_path(self.filename)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Open the staged file for writing, resuming it at offset if one is given
+    async def open(self, offset: int = None):
+        await run_in_storage_executor(self._open, offset)
+        return self
+
+    # Open and lock the staged file, leaving its contents as they are until seek()
+    async def lock(self):
+        await run_in_storage_executor(self._lock)
+        return self
+
+    # Truncate the locked staged file at offset and continue writing from there
+    async def seek(self, offset: int):
+        await run_in_storage_executor(self._seek, offset)
+
+    async def write(self, data: bytes):
+        await run_in_storage_executor(self._write, data)
+        self.size += len(data)
+
+    # Open, write and close a file held wholly in memory, in one storage operation
+    async def save(self, data: bytes):
+        await run_in_storage_executor(self._save, data)
+        self.size = len(data)
+
+    async def close(self):
+        await run_in_storage_executor(self._close)
+
+    async def read_head(self, length: int):
+        return await run_in_storage_executor(self._read_head, length)
+
+    # Hash the whole of the staged file, for files which were written in pieces
+    async def rehash(self):
+        await run_in_storage_executor(self._rehash)
+
+    # Move the finished file into storage, under its own name by default
+    async def commit(self, filename: str = None):
+        await run_in_storage_executor(self._close)
+        await get_storage_backend().store(
+            get_partial_path(self.filename), filename or self.filename
+        )
+
+    # Close the finished file and move it to another name in the partial directory,
+    # replacing any file there
+    async def rename(self, filename: str):
+        await run_in_storage_executor(self._rename, filename)
+
+    # Close the file and remove whatever had been written of it
+    async def discard(self):
+        await run_in_storage_executor(self._discard)
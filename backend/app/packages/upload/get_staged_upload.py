@@ -0,0 +1,32 @@
+"""
+upload/get_staged_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the writer for the staged binary of a resumable upload, and remove whatever
+has been staged for one
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from app.packages.storage_driver.list_storage_directory import remove_staged_path
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+from app.packages.storage_driver.storage_writer import StorageWriter, get_partial_path
+
+
+# Everything staged for a resumable upload, whether it is sent in chunks or in parts,
+# is held in a directory named after the upload
+def get_staged_upload(upload_id: str):
+    return StorageWriter(os.path.join(upload_id, "upload"))
+
+
+def _discard_staged_upload(upload_id: str):
+    remove_staged_path(get_partial_path(upload_id))
+
+
+# Remove the directory of an upload along with everything staged in it
+async def discard_staged_upload(upload_id: str):
+    await run_in_storage_executor(_discard_staged_upload, upload_id)
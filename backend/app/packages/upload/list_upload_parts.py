@@ -0,0 +1,47 @@
+"""
+upload/list_upload_parts.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+List the parts of a resumable upload which have been received, for uploads whose
+parts are sent in parallel
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from app.database import generate_unique_id
+from app.packages.storage_driver.list_storage_directory import list_partial_directory
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+from app.packages.storage_driver.storage_writer import StorageWriter, get_partial_path
+
+# Largest part number accepted, which bounds the number of parts of an upload
+MAX_UPLOAD_PARTS = 10000
+
+
+# The parts of an upload are staged in its own directory, alongside its staged
+# binary, so that listing them reads only that directory
+def get_upload_part_filename(upload_id: str, part_number: int):
+    return os.path.join(upload_id, f"part{part_number:05d}")
+
+
+# Writer for one attempt at sending a part, staged under a name of its own which is
+# not listed as a part until the attempt is renamed to the part's name
+def get_upload_part_attempt(upload_id: str, part_number: int):
+    filename = get_upload_part_filename(upload_id, part_number)
+    return StorageWriter(f"{filename}.{generate_unique_id()}")
+
+
+def _list_upload_parts(upload_id: str):
+    parts = {}
+    for filename, stat in list_partial_directory(get_partial_path(upload_id)).items():
+        if filename.startswith("part") and filename[4:].isdigit():
+            parts[int(filename[4:])] = stat.st_size
+    return dict(sorted(parts.items()))
+
+
+# Map the number of each part of an upload which has been received to its size
+async def list_upload_parts(upload_id: str):
+    return await run_in_storage_executor(_list_upload_parts, upload_id)
@@ -0,0 +1,53 @@
+"""
+upload/store_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Commit staged uploads to storage and create their file metadata
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import File as FileModel
+from app.packages.blobs.acquire_blob import acquire_blob
+
+
+async def store_upload(db: AsyncSession, upload: dict, config: dict):
+    """
+    Return the new file object, which has been added to the session but not
+    committed. Content-addressed storage keeps identical uploads as one blob.
+    """
+    writer = upload["writer"]
+    new_file = FileModel(
+        id=upload["id"],
+        mimetype=upload["content_type"],
+        original_filename=upload["original_filename"],
+        size=upload["size"],
+        sha256=writer.sha256,
+    )
+    if config.get("storage_mode", "flat") == "content_addressed":
+        blob = await acquire_blob(db, writer)
+        new_file.filename = blob.filename
+        new_file.blob = blob
+    else:
+        await writer.commit(upload["filename"])
+        new_file.filename = upload["filename"]
+    db.add(new_file)
+    return new_file
+
+
+async def store_uploads(db: AsyncSession, uploads: list, config: dict):
+    """
+    Store many uploads, returning their new file objects in the same order.
+    Flat storage commits the binaries concurrently, whereas content-addressed
+    storage stores them one at a time so that identical uploads share a blob.
+    """
+    if config.get("storage_mode", "flat") == "content_addressed":
+        return [await store_upload(db, upload, config) for upload in uploads]
+    return list(
+        await asyncio.gather(*(store_upload(db, upload, config) for upload in uploads))
+    )
@@ -0,0 +1,150 @@
+"""
+upload/stream_batch_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Stream every file of a multipart request into the storage directory, validating
+each one on its own so that a rejected file does not fail the rest of the batch
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+
+from app.database import generate_unique_id
+from app.packages.storage_driver.storage_writer import StorageWriter
+from app.packages.upload.stream_multipart import (
+    stream_multipart,
+    PART_BEGIN,
+    PART_DATA,
+    PART_END,
+)
+from app.packages.upload.validate_upload import (
+    MIME_SNIFF_LENGTH,
+    get_file_extension,
+    validate_mimetype,
+    validate_extension,
+    filesize_limit_exception,
+)
+
+# Names of the multipart fields which hold the files of a batch
+BATCH_FIELD_NAMES = ("files", "file")
+
+# Largest number of files accepted in one batch
+MAX_BATCH_FILES = 10000
+
+
+def missing_files_exception() -> RequestValidationError:
+    return RequestValidationError(
+        [
+            {
+                "type": "missing",
+                "loc": ("body", "files"),
+                "msg": "Field required",
+                "input": None,
+            }
+        ]
+    )
+
+
+# Mark a file of the batch as rejected and remove whatever was written of it
+async def reject_batch_item(item: dict, exception: HTTPException):
+    item["error"] = exception
+    if item["writer"] is not None:
+        await item["writer"].discard()
+        item["writer"] = None
+
+
+async def stream_batch_upload(request: Request, config: dict):
+    """
+    Write the file parts of a multipart request into storage.
+
+    Returns a list with an item for each file part, in the order sent. Accepted
+    items are described as by stream_upload(); rejected items instead hold the
+    HTTPException which rejected them under "error". Nothing is left in storage
+    if the request as a whole fails.
+    """
+    items = []
+    item = None
+    head = bytearray()
+
+    try:
+        async for event, value in stream_multipart(request):
+            if event == PART_BEGIN:
+                item = None
+                if value["name"] not in BATCH_FIELD_NAMES or value["filename"] is None:
+                    continue
+                if len(items) == MAX_BATCH_FILES:
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Batch exceeds the maximum of {MAX_BATCH_FILES} files",
+                    )
+                file_id = generate_unique_id()
+                item = {
+                    "id": file_id,
+                    "filename": None,
+                    "original_filename": value["filename"],
+                    "content_type": value["content_type"],
+                    "size": 0,
+                    "writer": None,
+                }
+                items.append(item)
+                head = bytearray()
+                # The extension is known up front, so a disallowed file is
+                # skipped without writing any of it
+                try:
+                    extension = get_file_extension(value["filename"])
+                    validate_extension(extension, config)
+                    item["filename"] = file_id + "." + extension
+                except HTTPException as e:
+                    await reject_batch_item(item, e)
+            elif item is None or "error" in item:
+                continue
+            elif event == PART_DATA:
+                try:
+                    item["size"] += len(value)
+                    if item["size"] > config["filesize_limit"]:
+                        raise filesize_limit_exception(config)
+                    if item["writer"] is not None:
+                        await item["writer"].write(value)
+                    else:
+                        # Hold the first bytes back until there are enough to sniff
+                        head += value
+                        if len(head) >= MIME_SNIFF_LENGTH:
+                            await validate_mimetype(head, config)
+                            item["writer"] = await StorageWriter(
+                                item["filename"]
+                            ).open()
+                            await item["writer"].write(bytes(head))
+                except HTTPException as e:
+                    await reject_batch_item(item, e)
+            elif event == PART_END:
+                try:
+                    if item["writer"] is not None:
+                        await item["writer"].close()
+                    else:
+                        # Small files never leave the head, and are written whole
+                        await validate_mimetype(head, config)
+                        item["writer"] = StorageWriter(item["filename"])
+                        await item["writer"].save(bytes(head))
+                except HTTPException as e:
+                    await reject_batch_item(item, e)
+                item = None
+        # The body ended part way through a file
+        if item is not None and "error" not in item:
+            await reject_batch_item(
+                item, HTTPException(status_code=400, detail="Incomplete file part")
+            )
+        if not items:
+            raise missing_files_exception()
+    except BaseException:
+        # Remove whatever had been written of the batch
+        for written_item in items:
+            if written_item["writer"] is not None:
+                await written_item["writer"].discard()
+        raise
+
+    return items
@@ -0,0 +1,107 @@
+"""
+upload/stream_multipart.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Incrementally parse a multipart/form-data request body as it arrives
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import multipart
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+from fastapi import HTTPException, Request
+
+# Events yielded by stream_multipart()
+PART_BEGIN = "part_begin"
+PART_DATA = "part_data"
+PART_END = "part_end"
+
+
+async def stream_multipart(request: Request):
+    """
+    Yield (event, value) tuples for a multipart body without spooling it.
+
+    PART_BEGIN carries a dict of the part's name, filename and content type,
+    PART_DATA carries a chunk of the part's body and PART_END carries None.
+    Bodies which are not multipart yield no events.
+    """
+    content_type, params = parse_options_header(request.headers.get("Content-Type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        return
+
+    events = []
+    part = {}
+
+    def on_part_begin():
+        part.clear()
+        part["headers"] = {}
+        part["header_field"] = b""
+        part["header_value"] = b""
+
+    def on_header_field(data, start, end):
+        part["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["header_value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header_field"].lower()] = part["header_value"]
+        part["header_field"] = b""
+        part["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(
+            part["headers"].get(b"content-disposition", b"")
+        )
+        filename = options.get(b"filename")
+        events.append(
+            (
+                PART_BEGIN,
+                {
+                    "name": options.get(b"name", b"").decode("utf-8", "replace"),
+                    "filename": (
+                        filename.decode("utf-8", "replace")
+                        if filename is not None
+                        else None
+                    ),
+                    "content_type": part["headers"]
+                    .get(b"content-type", b"application/octet-stream")
+                    .decode("latin-1"),
+                },
+            )
+        )
+
+    def on_part_data(data, start, end):
+        events.append((PART_DATA, data[start:end]))
+
+    def on_part_end():
+        events.append((PART_END, None))
+
+    parser = multipart.MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    async for chunk in request.stream():
+        try:
+            parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        # Hand the parsed events to the caller before reading the next chunk so
+        # that no more than one chunk of the body is ever held in memory
+        for event in events:
+            yield event
+        events.clear()
+    parser.finalize()
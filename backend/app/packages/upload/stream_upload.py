@@ -0,0 +1,126 @@
+"""
+upload/stream_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Stream an uploaded file straight into the storage directory, validating it and
+enforcing the filesize limit while its bytes arrive
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+
+from app.database import generate_unique_id
+from app.packages.storage_driver.storage_writer import StorageWriter
+from app.packages.upload.stream_multipart import (
+    stream_multipart,
+    PART_BEGIN,
+    PART_DATA,
+    PART_END,
+)
+from app.packages.upload.validate_upload import (
+    MIME_SNIFF_LENGTH,
+    get_file_extension,
+    validate_mimetype,
+    validate_extension,
+    filesize_limit_exception,
+)
+
+# Allowance for the boundaries and part headers which wrap the file in the body
+MULTIPART_OVERHEAD_ALLOWANCE = 64 * 1024
+
+
+def missing_file_exception() -> RequestValidationError:
+    return RequestValidationError(
+        [
+            {
+                "type": "missing",
+                "loc": ("body", "file"),
+                "msg": "Field required",
+                "input": None,
+            }
+        ]
+    )
+
+
+async def stream_upload(request: Request, config: dict):
+    """
+    Write the "file" part of a multipart request into storage.
+
+    Returns a dict describing the file, whose "writer" holds the staged binary
+    until it is committed by store_upload(). Nothing is left in storage if the
+    upload is rejected or the client disconnects part way through.
+    """
+    # Reject uploads which are certainly too large before reading any of the body
+    content_length = request.headers.get("Content-Length", "")
+    if (
+        content_length.isdigit()
+        and int(content_length)
+        > config["filesize_limit"] + MULTIPART_OVERHEAD_ALLOWANCE
+    ):
+        raise filesize_limit_exception(config)
+
+    upload = None
+    in_file_part = False
+    writer = None
+    head = bytearray()
+
+    # Validate the leading bytes of the file and open its destination in storage
+    async def open_storage_file():
+        await validate_mimetype(head, config)
+        validate_extension(upload["extension"], config)
+        storage_file = await StorageWriter(upload["filename"]).open()
+        await storage_file.write(bytes(head))
+        return storage_file
+
+    try:
+        async for event, value in stream_multipart(request):
+            if event == PART_BEGIN:
+                in_file_part = (
+                    upload is None
+                    and value["name"] == "file"
+                    and value["filename"] is not None
+                )
+                if in_file_part:
+                    file_id = generate_unique_id()
+                    extension = get_file_extension(value["filename"])
+                    upload = {
+                        "id": file_id,
+                        "filename": file_id + "." + extension,
+                        "original_filename": value["filename"],
+                        "content_type": value["content_type"],
+                        "extension": extension,
+                        "size": 0,
+                    }
+            elif event == PART_DATA and in_file_part:
+                upload["size"] += len(value)
+                if upload["size"] > config["filesize_limit"]:
+                    raise filesize_limit_exception(config)
+                if writer is not None:
+                    await writer.write(value)
+                else:
+                    # Hold the first bytes back until there are enough to sniff
+                    head += value
+                    if len(head) >= MIME_SNIFF_LENGTH:
+                        writer = await open_storage_file()
+            elif event == PART_END and in_file_part:
+                if writer is None:
+                    writer = await open_storage_file()
+                await writer.close()
+                in_file_part = False
+        # The body ended without a complete file part
+        if upload is None or in_file_part:
+            raise missing_file_exception()
+    except BaseException:
+        # Remove whatever had been written of a rejected or abandoned upload
+        if writer is not None:
+            await writer.discard()
+        raise
+
+    del upload["extension"]
+    upload["writer"] = writer
+    return upload
@@ -0,0 +1,60 @@
+"""
+upload/validate_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Validate an upload's extension, mimetype and size against the configuration
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from fastapi import HTTPException
+from app.packages.mime.detect_mimetype import detect_mimetype_async
+
+# Number of leading bytes handed to libmagic when determining the mimetype
+MIME_SNIFF_LENGTH = 2048
+
+
+# Get the extension of a filename, rejecting filenames without one
+def get_file_extension(filename: str):
+    split_filename = filename.split(".")
+    if len(split_filename) == 1:
+        raise HTTPException(status_code=422, detail=f"File type not allowed")
+    return split_filename[-1]
+
+
+# Filter out disallowed mimetypes via Magic
+async def validate_mimetype(content: bytes, config: dict):
+    file_type = await detect_mimetype_async(content[:MIME_SNIFF_LENGTH])
+    if file_type not in config["allowed_mimetypes"]:
+        raise HTTPException(
+            status_code=422, detail=f"File type {file_type} not allowed"
+        )
+    return file_type
+
+
+# Filter out disallowed file extensions
+def validate_extension(file_extension: str, config: dict):
+    if file_extension not in config["allowed_extensions"]:
+        raise HTTPException(
+            status_code=422, detail=f"File type .{file_extension} not allowed"
+        )
+
+
+# Filter out files which exceed the size limit
+def validate_filesize(size: int, config: dict):
+    if size > config["filesize_limit"]:
+        raise HTTPException(
+            status_code=422,
+            detail=f"File size is {size}B, which exceeds the maximum allowed size of {config['filesize_limit']}B",
+        )
+
+
+# Raised when the size of a streamed upload is not yet known, but is too large
+def filesize_limit_exception(config: dict) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"File size exceeds the maximum allowed size of {config['filesize_limit']}B",
+    )
@@ -0,0 +1,80 @@
+"""
+routers/admin.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Router for administrative reports and maintenance of the file catalogue
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.models import File as FileModel
+from app.models.models import User
+from app.packages.cleanup.reconcile_file_availability import (
+    reconcile_file_availability,
+)
+from app.packages.cleanup.remove_missing_files import remove_missing_files
+from app.packages.tokens.get_current_user import get_current_user
+
+router = APIRouter()
+
+
+# Get the current user, ensuring that they are an admin
+async def get_admin_user(user: User = Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return user
+
+
+@router.get("/missing-files", status_code=200)
+async def list_missing_files(
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_admin_user)
+):
+    """
+    List the files whose binaries were missing from storage when last reconciled
+    """
+    files = await db.execute(
+        select(FileModel)
+        .where(FileModel.is_file_available.is_(False))
+        .order_by(FileModel.upload_datetime, FileModel.id)
+    )
+    return [
+        {
+            "id": file.id,
+            "owner_username": file.owner_username,
+            "original_filename": file.original_filename,
+            "filename": file.filename,
+            "size": file.size,
+            "upload_datetime": file.upload_datetime,
+        }
+        for file in files.scalars().all()
+    ]
+
+
+@router.post("/reconcile", status_code=200)
+async def reconcile_files(
+    purge: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_admin_user),
+):
+    """
+    Reconcile the availability of every file with storage now, and optionally remove
+    the files which were missing before it too
+    """
+    reconciled_at = datetime.now()
+    reconciled = await reconcile_file_availability(db)
+    if purge:
+        try:
+            purged = await remove_missing_files(db, reconciled_at)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        reconciled["purged"] = [file["id"] for file in purged]
+    return reconciled
@@ -10,47 +10,122 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import os
-import shutil
-
-import magic
+import functools
+from datetime import datetime
 
 from fastapi import (
     APIRouter,
     Request,
     Response,
     Depends,
-    File,
-    UploadFile,
     HTTPException,
+    Query,
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from starlette.requests import ClientDisconnect
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.limiter import limiter
 
-from app.database import get_db, generate_unique_id
+from app.database import get_db
 from app.models.models import File as FileModel
-from app.models.models import User
+from app.models.models import User, Blob
 
 from app.get_configuration import get_config
 
-from app.packages.storage_driver.is_file_present import is_file_present
-from app.packages.storage_driver.get_storage_directory import get_storage_directory
-from app.packages.storage_driver.delete_file import delete_file
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.responses.parse_range import parse_range, if_range_matches
+from app.packages.responses.range_response import range_response, body_range_reader
+from app.packages.responses.storage_file_response import StorageFileResponse
+from app.packages.responses.offload_response import offload_response
+from app.packages.caching.file_id_filter import (
+    add_file_id,
+    remove_file_id,
+    empty_file_id_filter,
+)
+from app.packages.caching.file_metadata_cache import (
+    get_file_metadata,
+    cache_file_metadata,
+    invalidate_file_metadata,
+    clear_file_metadata_cache,
+)
+from app.packages.caching.file_body_cache import (
+    is_file_cacheable,
+    get_cached_file_body,
+    cache_file_body,
+    clear_file_body_cache,
+)
+from app.packages.responses.content_disposition import content_disposition
+from app.packages.pagination.export_files import export_files
+from app.packages.pagination.file_listing import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    file_listing_query,
+    next_page_cursor,
+)
+from app.packages.responses.conditional import (
+    content_etag,
+    http_date,
+    is_not_modified,
+    not_modified_response,
+)
 from app.packages.tokens.get_current_user import get_current_user
+from app.packages.upload.stream_upload import stream_upload
+from app.packages.upload.stream_batch_upload import stream_batch_upload
+from app.packages.upload.store_upload import store_upload, store_uploads
+from app.packages.blobs.release_file_binary import (
+    release_file_binary,
+    remove_released_binary,
+)
+from app.packages.metrics.metrics import timed
 
 router = APIRouter()
 
 
 @router.get("/", status_code=200)
-async def list_files(db: AsyncSession = Depends(get_db)):
-    files = await db.execute(select(FileModel))
-    files = files.scalars().all()
-
-    return [
+async def list_files(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    sort: str = "upload_datetime",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    owner: str = None,
+    mimetype: str = None,
+    min_size: int = Query(None, ge=0),
+    max_size: int = Query(None, ge=0),
+    uploaded_after: datetime = None,
+    uploaded_before: datetime = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List a page of files, filtered and sorted as requested. When more files follow,
+    the cursor of the next page is given in the X-Next-Cursor and Link headers.
+    """
+    query = file_listing_query(
+        limit,
+        sort=sort,
+        order=order,
+        cursor=cursor,
+        owner=owner,
+        mimetype=mimetype,
+        min_size=min_size,
+        max_size=max_size,
+        uploaded_after=uploaded_after,
+        uploaded_before=uploaded_before,
+    )
+    rows = await db.execute(query)
+    rows = rows.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = next_page_cursor(rows, sort, order)
+    files = [file for file, _ in rows]
+
+    file_list = [
         {
             "id": file.id,
             "original_filename": file.original_filename,
@@ -58,76 +133,60 @@ async def list_files(db: AsyncSession = Depends(get_db)):
             "mimetype": file.mimetype,
             "size": file.size,
             "upload_datetime": file.upload_datetime,
-            "is_file_available": is_file_present(file.filename),
+            "is_file_available": file.is_file_available,
         }
         for file in files
     ]
-
-
-@router.post("/", status_code=201)
+    for file in files:
+        cache_file_metadata(file)
+    # Removing a file changes no upload_datetime, so the listing is only validated
+    # by an ETag of its content
+    etag = content_etag(file_list)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    if next_cursor is not None:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return file_list
+
+
+@router.post(
+    "/",
+    status_code=201,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
+)
 async def upload_file(
-    file: UploadFile = File(...),
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    # Ensure a file is included in the request
-    if file is None:
-        raise HTTPException(
-            status_code=400, detail="No file was received with the request"
-        )
-    # Ensure the file is of an allowed type
+    # The body is parsed here rather than by FastAPI so that the file can be
+    # validated and written to storage while it is still arriving
     config = get_config()
-
-    # Do not allow filenames with no extension
-    split_filename = file.filename.split(".")
-    if len(split_filename) == 1:
-        raise HTTPException(status_code=422, detail=f"File type not allowed")
-    else:
-        file_extension = split_filename[-1]
-
-    # Filter out disallowed mimetypes via Magic
-    mime = magic.Magic(mime=True)
-    content = await file.read(2048)
-    await file.seek(0)
-    file_type = mime.from_buffer(content)
-    if file_type not in config["allowed_mimetypes"]:
-        raise HTTPException(
-            status_code=422, detail=f"File type {file_type} not allowed"
-        )
-
-    # Filter out disallowed file extensions
-    if file_extension not in config["allowed_extensions"]:
-        raise HTTPException(
-            status_code=422, detail=f"File type .{file_extension} not allowed"
-        )
-
-    # Filter out files which exceed the size limit
-    if file.size > config["filesize_limit"]:
-        raise HTTPException(
-            status_code=422,
-            detail=f"File size is {file.size}B, which exceeds the maximum allowed size of {config['filesize_limit']}B",
-        )
-
     try:
-        file_id = generate_unique_id()
-        extension = file.filename.split(".")[-1]
-        storage_filename = file_id + "." + extension
-        storage_path = os.path.normpath(
-            os.path.join(get_storage_directory(), storage_filename)
-        )
-        # Save the file to the storage directory
-        with open(storage_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        with timed("upload.receive"):
+            upload = await stream_upload(request, config)
+        with timed("upload.store"):
+            new_file = await store_upload(db, upload, config)
+    except (HTTPException, RequestValidationError, ClientDisconnect):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    # Save file information to the database
-    new_file = FileModel(
-        id=file_id,
-        mimetype=file.content_type,
-        filename=storage_filename,
-        original_filename=file.filename,
-        size=file.size,
-    )
 
     # Save the file to the user's files
     stmt = (
@@ -136,8 +195,11 @@ async def upload_file(
     result = await db.execute(stmt)
     user = result.scalars().first()
     user.files.append(new_file)
-    await db.commit()
+    with timed("upload.commit"):
+        await db.commit()
     await db.refresh(new_file)
+    add_file_id(new_file.id)
+    cache_file_metadata(new_file)
 
     return {
         "id": new_file.id,
@@ -145,46 +207,160 @@ async def upload_file(
         "filename": new_file.filename,
         "original_filename": new_file.original_filename,
         "size": new_file.size,
+        "sha256": new_file.sha256,
     }
 
 
+@router.post(
+    "/batch",
+    status_code=200,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "files": {
+                                "type": "array",
+                                "items": {"type": "string", "format": "binary"},
+                            }
+                        },
+                        "required": ["files"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_files(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Upload many files in one request, storing every accepted file in a single
+    transaction and reporting the outcome of each file in the order sent
+    """
+    config = get_config()
+    try:
+        with timed("batch_upload.receive"):
+            items = await stream_batch_upload(request, config)
+        uploads = [item for item in items if "error" not in item]
+        with timed("batch_upload.store"):
+            new_files = await store_uploads(db, uploads, config)
+        for new_file in new_files:
+            new_file.owner_username = user.username
+        with timed("batch_upload.commit"):
+            await db.commit()
+        for new_file in new_files:
+            add_file_id(new_file.id)
+            invalidate_file_metadata(new_file.id)
+    except (HTTPException, RequestValidationError, ClientDisconnect):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    new_files = iter(new_files)
+    results = []
+    for item in items:
+        if "error" in item:
+            results.append(
+                {
+                    "original_filename": item["original_filename"],
+                    "status_code": item["error"].status_code,
+                    "detail": item["error"].detail,
+                }
+            )
+            continue
+        new_file = next(new_files)
+        results.append(
+            {
+                "original_filename": new_file.original_filename,
+                "status_code": 201,
+                "id": new_file.id,
+                "mimetype": new_file.mimetype,
+                "filename": new_file.filename,
+                "size": new_file.size,
+                "sha256": new_file.sha256,
+            }
+        )
+    return results
+
+
 @router.delete("/", status_code=204)
 async def remove_all_files(
     db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
+    # Empty the filter before the files are removed, so that the files uploaded
+    # meanwhile are added to it afresh
+    empty_file_id_filter()
     try:
         # Validate that the file object has been deleted
         await db.execute(delete(FileModel))
+        await db.execute(delete(Blob))
         await db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Remove the files in the storage directory
-    for filename in os.listdir(get_storage_directory()):
-        filepath = os.path.join(get_storage_directory(), filename)
+    # Remove the files in storage
+    clear_file_metadata_cache()
+    clear_file_body_cache()
+    storage = get_storage_backend()
+    for filename in await storage.list():
         # TODO: Could run into an issue here where one of the files fails to delete.
         # This would result in the files becoming orphaned. Think of a better solution later
-        if filename != ".gitignore":
-            os.remove(filepath)
+        await storage.delete(filename)
+
+
+@router.get("/export", status_code=200)
+async def export_file_catalogue(
+    since: datetime = None,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Stream every file, or those uploaded at or after since, as newline delimited JSON
+    """
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return StreamingResponse(
+        export_files(db.bind, since),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
 
 
 @router.get("/{file_id}", status_code=200)
-async def view_file(file_id: str, db: AsyncSession = Depends(get_db)):
-    file = await db.get(FileModel, file_id)
+async def view_file(
+    request: Request,
+    response: Response,
+    file_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    file = await get_file_metadata(db, file_id)
     if file is None:
         raise HTTPException(status_code=404, detail="File not found")
     file_response = {
-        "id": file.id,
-        "original_filename": file.original_filename,
-        "filename": file.filename,
-        "mimetype": file.mimetype,
-        "size": file.size,
-        "upload_datetime": file.upload_datetime,
-        "is_file_available": is_file_present(file.filename),
+        "id": file["id"],
+        "original_filename": file["original_filename"],
+        "filename": file["filename"],
+        "mimetype": file["mimetype"],
+        "size": file["size"],
+        "sha256": file["sha256"],
+        "upload_datetime": file["upload_datetime"],
+        "is_file_available": file["is_file_available"],
     }
+    # Only the ETag validates the file object, since its availability changes after
+    # it is uploaded, so If-Modified-Since alone never answers 304
+    etag = content_etag(file_response)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
     return file_response
 
 
@@ -210,12 +386,12 @@ async def remove_file(
             status_code=403,
             detail="The current user is not authorized to perform this action",
         )
-    try:
-        delete_file(file.filename)
-    except FileNotFoundError:
-        pass
+    await release_file_binary(db, file)
     await db.delete(file)
     await db.commit()
+    await remove_released_binary(db, file)
+    remove_file_id(file.id)
+    invalidate_file_metadata(file.id)
     return Response(status_code=204)
 
 
@@ -229,15 +405,74 @@ async def download_file(
     """
     Download a file binary by its ID
     """
-    file = await db.get(FileModel, file_id)
+    file = await get_file_metadata(db, file_id)
     if file is None:
         raise HTTPException(status_code=404, detail="File not found")
-    if not is_file_present(file.filename):
-        raise HTTPException(
-            status_code=404,
-            detail="The requested file metadata exists, but the file binary was not found in storage",
+    # Small, frequently downloaded files are served from memory, without touching
+    # storage, unless downloads are offloaded to the reverse proxy
+    config = get_config()
+    offloaded = config.get("download_offload", "none") != "none"
+    storage = get_storage_backend()
+    body = None if offloaded else get_cached_file_body(file["filename"])
+    if body is None:
+        located = await storage.locate(file["filename"])
+        if located is None:
+            raise HTTPException(
+                status_code=404,
+                detail="The requested file metadata exists, but the file binary was not found in storage",
+            )
+        storage_directory, storage_path, stat_result = located
+        size = stat_result.st_size
+    else:
+        size = len(body)
+    # Files stored before checksums were recorded keep the default mtime-based ETag.
+    # The binary of a file never changes once uploaded, so it was last modified then.
+    etag = f'"{file["sha256"]}"' if file["sha256"] is not None else None
+    last_modified = http_date(file["upload_datetime"])
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    headers = {
+        "Content-Disposition": content_disposition(file["original_filename"]),
+        "Last-Modified": last_modified,
+    }
+    if etag is not None:
+        headers["ETag"] = etag
+    if offloaded:
+        # Let the reverse proxy send the file
+        return offload_response(
+            config, storage_path, storage_directory, file["mimetype"], headers
+        )
+
+    if body is None and is_file_cacheable(size, config):
+        body = await storage.read(file["filename"])
+        cache_file_body(file["filename"], body, config)
+
+    # Serve only the requested ranges, unless the file changed since the client saw it
+    if if_range_matches(request.headers.get("If-Range"), etag, last_modified):
+        ranges = parse_range(request.headers.get("Range"), size)
+        if ranges is not None:
+            if body is not None:
+                read_range = body_range_reader(body)
+            else:
+                read_range = functools.partial(storage.read_range, file["filename"])
+            return range_response(ranges, size, read_range, file["mimetype"], headers)
+
+    headers["Accept-Ranges"] = "bytes"
+    if body is not None:
+        return Response(content=body, media_type=file["mimetype"], headers=headers)
+    if not storage.local:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            storage.read_range(file["filename"], 0, size - 1),
+            media_type=file["mimetype"],
+            headers=headers,
         )
-    return FileResponse(
-        path=os.path.join(get_storage_directory(), file.filename),
-        filename=file.original_filename,
+    return StorageFileResponse(
+        file["filename"],
+        storage_directory,
+        storage_path=storage_path,
+        media_type=file["mimetype"],
+        headers=headers,
+        stat_result=stat_result,
     )
@@ -0,0 +1,29 @@
+"""
+routers/metrics.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Router for reporting the counters and stage timings collected by the application
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.models.models import User
+from app.packages.metrics.metrics import get_metrics
+from app.packages.tokens.get_current_user import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/", status_code=200)
+async def view_metrics(user: User = Depends(get_current_user)):
+    """
+    Get the counters and stage timings collected since the application started
+    """
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return get_metrics()
@@ -0,0 +1,348 @@
+"""
+routers/uploads.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Router for resumable uploads, which are sent in chunks and can be continued after
+a dropped connection, or sent as numbered parts over several connections at once
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from fastapi import APIRouter, Request, Response, Depends, Header, HTTPException, Path
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
+
+from app.database import get_db, generate_unique_id
+from app.models.models import Upload, User
+from app.schema.upload import UploadSchema
+
+from app.get_configuration import get_config
+
+from app.packages.storage_driver.concatenate_staged_files import (
+    concatenate_staged_files,
+)
+from app.packages.storage_driver.storage_executor import run_in_storage_executor
+from app.packages.caching.file_id_filter import add_file_id
+from app.packages.caching.file_metadata_cache import cache_file_metadata
+from app.packages.tokens.get_current_user import get_current_user
+from app.packages.upload.get_staged_upload import (
+    get_staged_upload,
+    discard_staged_upload,
+)
+from app.packages.upload.list_upload_parts import (
+    MAX_UPLOAD_PARTS,
+    get_upload_part_attempt,
+    get_upload_part_filename,
+    list_upload_parts,
+)
+from app.packages.upload.store_upload import store_upload
+from app.packages.upload.validate_upload import (
+    MIME_SNIFF_LENGTH,
+    get_file_extension,
+    validate_mimetype,
+    validate_extension,
+    validate_filesize,
+)
+
+router = APIRouter()
+
+
+# Get an upload, ensuring that it belongs to the current user
+async def get_owned_upload(upload_id: str, db: AsyncSession, user: User):
+    upload = await db.get(Upload, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.owner_username != user.username and not user.is_admin:
+        raise HTTPException(
+            status_code=403,
+            detail="The current user is not authorized to perform this action",
+        )
+    return upload
+
+
+def upload_response(upload: Upload, parts: dict = None):
+    response = {
+        "id": upload.id,
+        "original_filename": upload.original_filename,
+        "size": upload.size,
+        "offset": upload.offset,
+    }
+    if parts is not None:
+        response["parts"] = [
+            {"part_number": part_number, "size": size}
+            for part_number, size in parts.items()
+        ]
+    return response
+
+
+@router.post("/", status_code=201)
+async def create_upload(
+    upload_input: UploadSchema,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Start a resumable upload of a file of known size
+    """
+    # Reject uploads which could never be finalized before any bytes are sent
+    config = get_config()
+    validate_extension(get_file_extension(upload_input.filename), config)
+    validate_filesize(upload_input.size, config)
+
+    upload = Upload(
+        id=generate_unique_id(),
+        owner_username=user.username,
+        original_filename=upload_input.filename,
+        content_type=upload_input.content_type,
+        size=upload_input.size,
+        offset=0,
+    )
+    await get_staged_upload(upload.id).save(b"")
+    db.add(upload)
+    await db.commit()
+
+    response.headers["Location"] = f"/uploads/{upload.id}"
+    response.headers["Upload-Offset"] = "0"
+    return upload_response(upload)
+
+
+@router.get("/{upload_id}", status_code=200)
+async def view_upload(
+    upload_id: str,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Get the number of bytes of an upload, and the parts of it, which have been received
+    """
+    upload = await get_owned_upload(upload_id, db, user)
+    response.headers["Upload-Offset"] = str(upload.offset)
+    response.headers["Upload-Length"] = str(upload.size)
+    response.headers["Cache-Control"] = "no-store"
+    return upload_response(upload, await list_upload_parts(upload.id))
+
+
+@router.head("/{upload_id}", status_code=200)
+async def query_upload_offset(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Get the number of bytes of an upload which have been received, as headers only
+    """
+    upload = await get_owned_upload(upload_id, db, user)
+    return Response(
+        status_code=200,
+        headers={
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.size),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def append_upload_chunk(
+    request: Request,
+    upload_id: str,
+    upload_offset: int = Header(...),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Append the request body to an upload at the given offset
+    """
+    upload = await get_owned_upload(upload_id, db, user)
+    if request.headers.get("Content-Type") != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=415,
+            detail="Content-Type must be application/offset+octet-stream",
+        )
+    if upload.offset == 0 and await list_upload_parts(upload.id):
+        raise HTTPException(
+            status_code=409, detail="Upload is already being sent in parts"
+        )
+
+    # Hold the staged file for the whole request, refusing a concurrent request
+    writer = get_staged_upload(upload.id)
+    try:
+        await writer.lock()
+    except BlockingIOError:
+        raise HTTPException(
+            status_code=409, detail="Upload is already being written by another request"
+        )
+    try:
+        # A request which held the staged file before this one may have moved the
+        # offset on, so check it only now that the file is held
+        await db.refresh(upload)
+        if upload_offset != upload.offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset {upload_offset} does not match the current offset of {upload.offset}",
+            )
+        await writer.seek(upload.offset)
+        try:
+            async for chunk in request.stream():
+                if writer.size + len(chunk) > upload.size:
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Chunk exceeds the upload length of {upload.size}B",
+                    )
+                await writer.write(chunk)
+        except ClientDisconnect:
+            # Keep whatever arrived so that the client can resume from there
+            pass
+        finally:
+            # Record the offset before the staged file is released, so that the next
+            # request to hold it sees the new offset
+            upload.offset = writer.size
+            await db.commit()
+    finally:
+        await writer.close()
+
+    return Response(status_code=204, headers={"Upload-Offset": str(upload.offset)})
+
+
+@router.put("/{upload_id}/parts/{part_number}", status_code=204)
+async def upload_part(
+    request: Request,
+    upload_id: str,
+    part_number: int = Path(ge=1, le=MAX_UPLOAD_PARTS),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Store the request body as a numbered part of an upload, replacing any earlier
+    copy of the part. Parts may be sent concurrently and in any order, and are
+    joined in order of their numbers when the upload is finalized.
+    """
+    upload = await get_owned_upload(upload_id, db, user)
+    if upload.offset > 0:
+        raise HTTPException(
+            status_code=409,
+            detail="Upload is already being sent in sequential chunks",
+        )
+
+    # Bound the parts by the upload length. Parts sent at the same time each count
+    # only those which had been received before them, so they may together run
+    # slightly over, which finalizing the upload will still refuse.
+    parts = await list_upload_parts(upload.id)
+    received = sum(size for number, size in parts.items() if number != part_number)
+    # Each attempt is written under a name of its own and replaces the part only once
+    # it has wholly arrived, so that a retried part racing its original never mixes
+    # with it
+    writer = await get_upload_part_attempt(upload.id, part_number).open()
+    try:
+        async for chunk in request.stream():
+            if received + writer.size + len(chunk) > upload.size:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Parts exceed the upload length of {upload.size}B",
+                )
+            await writer.write(chunk)
+        await writer.rename(get_upload_part_filename(upload.id, part_number))
+    except BaseException:
+        await writer.discard()
+        raise
+
+    # Keep the upload from being removed as abandoned while its parts arrive
+    upload.updated_datetime = func.now()
+    await db.commit()
+    return Response(status_code=204, headers={"ETag": f'"{writer.sha256}"'})
+
+
+@router.post("/{upload_id}/finalize", status_code=201)
+async def finalize_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Validate a fully received upload and store it as a file
+    """
+    upload = await get_owned_upload(upload_id, db, user)
+    writer = get_staged_upload(upload.id)
+    parts = await list_upload_parts(upload.id)
+    received = sum(parts.values()) if parts else upload.offset
+    if received != upload.size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload is incomplete: {received}B of {upload.size}B received",
+        )
+    if parts:
+        # Join the parts into the staged file within the kernel, in part order
+        await run_in_storage_executor(
+            concatenate_staged_files,
+            [get_upload_part_filename(upload.id, number) for number in parts],
+            writer.filename,
+        )
+        upload.offset = upload.size
+
+    # Run the same checks as a single request upload, dropping uploads which fail
+    config = get_config()
+    try:
+        extension = get_file_extension(upload.original_filename)
+        await validate_mimetype(await writer.read_head(MIME_SNIFF_LENGTH), config)
+        validate_extension(extension, config)
+        validate_filesize(upload.size, config)
+    except HTTPException:
+        await discard_staged_upload(upload.id)
+        await db.delete(upload)
+        await db.commit()
+        raise
+
+    # The upload was written over several requests, so hash it as a whole
+    file_id = generate_unique_id()
+    await writer.rehash()
+    new_file = await store_upload(
+        db,
+        {
+            "id": file_id,
+            "filename": file_id + "." + extension,
+            "original_filename": upload.original_filename,
+            "content_type": upload.content_type,
+            "size": upload.size,
+            "writer": writer,
+        },
+        config,
+    )
+    new_file.owner = user
+    await db.delete(upload)
+    await db.commit()
+    await db.refresh(new_file)
+    add_file_id(new_file.id)
+    cache_file_metadata(new_file)
+    # Remove the directory of the upload, along with any part attempts left in it
+    await discard_staged_upload(upload.id)
+
+    return {
+        "id": new_file.id,
+        "mimetype": new_file.mimetype,
+        "filename": new_file.filename,
+        "original_filename": new_file.original_filename,
+        "size": new_file.size,
+        "sha256": new_file.sha256,
+    }
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def abort_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Abandon an upload, removing whatever had been received of it
+    """
+    upload = await get_owned_upload(upload_id, db, user)
+    await discard_staged_upload(upload.id)
+    await db.delete(upload)
+    await db.commit()
+    return Response(status_code=204)
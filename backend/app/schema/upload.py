@@ -0,0 +1,19 @@
+"""
+schema/upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Schema representing the creation of a resumable upload
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from pydantic import BaseModel, Field
+
+
+class UploadSchema(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    content_type: str = "application/octet-stream"
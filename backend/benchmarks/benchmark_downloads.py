@@ -0,0 +1,132 @@
+"""
+benchmarks/benchmark_downloads.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Compare the CPU cost of sending a large file with sendfile() against streaming it
+through Python with read_file_range() at several chunk sizes
+
+    python -m benchmarks.benchmark_downloads [size in MiB] [chunk sizes in KiB...]
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+
+from app.get_configuration import get_config
+from app.packages.storage_driver.read_file_range import read_file_range
+from app.packages.storage_driver.storage_executor import shutdown_storage_executor
+
+
+# Read everything sent to a socket, reporting the CPU time spent doing so
+def start_drain(sock: socket.socket):
+    result = {}
+
+    def drain():
+        while sock.recv(1024 * 1024):
+            pass
+        result["cpu_seconds"] = time.thread_time()
+
+    thread = threading.Thread(target=drain)
+    thread.start()
+    return thread, result
+
+
+def measure(send_file):
+    sender, receiver = socket.socketpair()
+    thread, drained = start_drain(receiver)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    send_file(sender)
+    sender.close()
+    thread.join()
+    wall_seconds = time.perf_counter() - wall_start
+    # Leave out the receiving side, which a real client would pay for
+    cpu_seconds = time.process_time() - cpu_start - drained["cpu_seconds"]
+    receiver.close()
+    return cpu_seconds, wall_seconds
+
+
+def send_with_sendfile(path: str, size: int):
+    def send_file(sock):
+        with open(path, "rb") as file:
+            offset = 0
+            while offset < size:
+                offset += os.sendfile(
+                    sock.fileno(), file.fileno(), offset, size - offset
+                )
+
+    return send_file
+
+
+def send_with_stream(filename: str, size: int):
+    def send_file(sock):
+        async def stream():
+            async for chunk in read_file_range(filename, 0, size - 1):
+                sock.sendall(chunk)
+
+        asyncio.run(stream())
+
+    return send_file
+
+
+def main():
+    size = int(sys.argv[1] if len(sys.argv) > 1 else 1024) * 1024 * 1024
+    chunk_sizes = [int(kib) * 1024 for kib in sys.argv[2:]] or [
+        64 * 1024,
+        256 * 1024,
+        1024 * 1024,
+    ]
+    gibibytes = size / (1024 * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as storage_directory:
+        os.environ["STORAGE_PATH"] = storage_directory
+        filename = "benchmark.bin"
+        path = os.path.join(storage_directory, filename)
+        with open(path, "wb") as file:
+            for _ in range(size // (1024 * 1024)):
+                file.write(os.urandom(1024 * 1024))
+
+        results = [("sendfile", measure(send_with_sendfile(path, size)))]
+        config = dict(get_config())
+        for chunk_size in chunk_sizes:
+            # Give each chunk size its own config file, as configs are cached by path
+            config_path = os.path.join(storage_directory, f"config_{chunk_size}.json")
+            with open(config_path, "w") as config_file:
+                json.dump(
+                    {
+                        **config,
+                        "allowed_mimetypes": list(config["allowed_mimetypes"]),
+                        "allowed_extensions": list(config["allowed_extensions"]),
+                        "download_chunk_size": chunk_size,
+                    },
+                    config_file,
+                )
+            os.environ["CONFIG_PATH"] = config_path
+            results.append(
+                (
+                    f"stream {chunk_size // 1024} KiB",
+                    measure(send_with_stream(filename, size)),
+                )
+            )
+        shutdown_storage_executor()
+
+    print(f"{'mode':<20}{'CPU s/GiB':>12}{'MiB/s':>12}")
+    for mode, (cpu_seconds, wall_seconds) in results:
+        print(
+            f"{mode:<20}{cpu_seconds / gibibytes:>12.3f}"
+            f"{size / (1024 * 1024) / wall_seconds:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -21,20 +21,38 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, selectinload
 from app.database import engine, Base, create_tables, drop_tables, get_db
 from app.app import app
+from app.limiter import limiter
 from app.models.models import File as FileModel
 from app.models.models import User
 from app.routers.users import pwd_context
 from app.packages.tokens.generate_jwt import generate_jwt
+from app.packages.caching.file_body_cache import clear_file_body_cache
+from app.packages.caching.file_metadata_cache import clear_file_metadata_cache
+from app.packages.caching.file_id_filter import clear_file_id_filter
+from app.packages.storage_driver.get_storage_backend import reset_storage_backends
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test/test.db"
 TEST_STORAGE = os.path.join(os.path.dirname(__file__), "test_storage")
 TEST_CONTENT = os.path.join(os.path.dirname(__file__), "test_content")
 TEST_DOWNLOADS = os.path.join(os.path.dirname(__file__), "test_downloads")
 CONFIGS = os.path.join(os.path.dirname(__file__), "configs")
+# SHA-256 of test_content/test_file1.jpeg
+TEST_FILE_SHA256 = "618691eec45df3dd92d08468092fd514a16eeed8e2c62db6704d8e95388f4e41"
 
 test_secret_key = secrets.token_hex(32)
 
 
+# Fixture for starting each test with empty in-memory caches, since the files
+# behind them are replaced between tests
+@pytest.fixture(scope="function", autouse=True)
+def clear_caches():
+    clear_file_body_cache()
+    clear_file_metadata_cache()
+    clear_file_id_filter()
+    reset_storage_backends()
+    yield
+
+
 # Fixture for creating test db engine
 @pytest_asyncio.fixture(scope="function")
 async def test_db_engine():
@@ -66,6 +84,8 @@ async def client(monkeypatch, test_db_session):
     from fastapi.testclient import TestClient
 
     monkeypatch.setenv("TEST_ENV", "true")
+    # Start each test with no requests counted against the rate limits
+    limiter.reset()
     client = TestClient(app)
     yield client
 
@@ -139,6 +159,7 @@ async def seed_file_object(test_db_session, seed_user):
         filename="abcdefgh.jpeg",
         original_filename="test_file1.jpeg",
         size=430061,
+        sha256=TEST_FILE_SHA256,
     )
     # Get the user
     stmt = (
@@ -180,7 +201,9 @@ async def clear_storage_directory():
     yield
     for filename in os.listdir(TEST_STORAGE):
         filepath = os.path.join(TEST_STORAGE, filename)
-        if filename != ".gitignore":
+        if os.path.isdir(filepath):
+            shutil.rmtree(filepath)
+        elif filename != ".gitignore":
             os.remove(filepath)
     print("Storage directory cleared")
 
@@ -0,0 +1,112 @@
+"""
+tests/test_admin.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for the admin router in routers/admin.py
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+from sqlalchemy import select
+from app.models.models import File as FileModel
+from test.conftest import TEST_STORAGE, CONFIGS
+
+
+@pytest.mark.asyncio
+async def test_list_missing_files_000_nominal(
+    monkeypatch,
+    client,
+    seed_admin_jwt,
+    seed_file_object,
+    clear_storage_directory,
+):
+    """
+    Test 000 - Nominal
+    Conditions: A file's binary is missing from storage, and files are reconciled before and after listing
+    Result: HTTP 200 - The file is only listed once it has been reconciled
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_admin_jwt}"}
+    response = client.get("admin/missing-files", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = client.post("admin/reconcile", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"missing": ["abcdefgh"], "restored": []}
+
+    response = client.get("admin/missing-files", headers=headers)
+    assert [file["id"] for file in response.json()] == ["abcdefgh"]
+
+
+@pytest.mark.asyncio
+async def test_list_missing_files_001_anomalous_not_admin(client, seed_jwt):
+    """
+    Test 001 - Anomalous
+    Conditions: A user who is not an admin requests the missing files
+    Result: HTTP 403 - "Admin privileges required"
+    """
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.get("admin/missing-files", headers=headers)
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Admin privileges required"}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_files_000_nominal_purge(
+    monkeypatch,
+    client,
+    test_db_session,
+    seed_admin_jwt,
+    seed_file_object,
+    clear_storage_directory,
+):
+    """
+    Test 000 - Nominal
+    Conditions: A file's binary is missing from storage, and files are reconciled twice with purging
+    Result: HTTP 200 - The file is reported missing, then purged from the database
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_purge_missing_files.json")
+    )
+    headers = {"Authorization": f"Bearer {seed_admin_jwt}"}
+    response = client.post("admin/reconcile?purge=true", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"missing": ["abcdefgh"], "restored": [], "purged": []}
+    response = client.post("admin/reconcile?purge=true", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"missing": [], "restored": [], "purged": ["abcdefgh"]}
+    files = await test_db_session.execute(select(FileModel))
+    assert files.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_reconcile_files_001_anomalous_over_purge_limit(
+    monkeypatch,
+    client,
+    test_db_session,
+    seed_admin_jwt,
+    seed_file_object,
+    clear_storage_directory,
+):
+    """
+    Test 001 - Anomalous
+    Conditions: The binary of the only file is missing, over "purge_missing_limit" of 0.1
+    Result: HTTP 409 - The purge is refused, and the file is kept in the database
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_admin_jwt}"}
+    client.post("admin/reconcile?purge=true", headers=headers)
+    response = client.post("admin/reconcile?purge=true", headers=headers)
+    assert response.status_code == 409
+    assert response.json() == {
+        "detail": "1 of 1 files are missing, more than 'purge_missing_limit' allows to be removed"
+    }
+    files = await test_db_session.execute(select(FileModel))
+    assert len(files.scalars().all()) == 1
@@ -0,0 +1,159 @@
+"""
+tests/test_get_config.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the loading and reloading of the configuration in get_configuration.py
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import json
+import pytest
+
+from app import get_configuration
+from app.get_configuration import get_config
+from test.conftest import CONFIGS
+
+with open(os.path.join(CONFIGS, "config_low_filesize_limit.json"), "r") as file:
+    BASE_CONFIG = json.load(file)
+
+
+def write_config(path, config):
+    with open(path, "w") as file:
+        json.dump(config, file)
+    # Give each version of the file its own modification time
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_get_config_000_nominal_cached(monkeypatch, tmp_path):
+    """
+    Test 000 - Nominal
+    Conditions: The config is fetched twice
+    Result: The same read-only config is returned, with its allow-lists as frozensets
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(config_path, BASE_CONFIG)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+
+    config = get_config()
+    assert get_config() is config
+    assert isinstance(config["allowed_mimetypes"], frozenset)
+    assert isinstance(config["allowed_extensions"], frozenset)
+    with pytest.raises(TypeError):
+        config["filesize_limit"] = 1
+
+
+def test_get_config_001_nominal_reloaded_on_change(monkeypatch, tmp_path):
+    """
+    Test 001 - Nominal
+    Conditions: The config file changes after the check interval has passed
+    Result: The new config is returned
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(config_path, BASE_CONFIG)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+    monkeypatch.setattr(get_configuration, "CONFIG_CHECK_INTERVAL", 0)
+
+    assert get_config()["filesize_limit"] == BASE_CONFIG["filesize_limit"]
+    write_config(config_path, {**BASE_CONFIG, "filesize_limit": 5000})
+    assert get_config()["filesize_limit"] == 5000
+
+
+def test_get_config_002_nominal_not_rechecked_within_interval(monkeypatch, tmp_path):
+    """
+    Test 002 - Nominal
+    Conditions: The config file changes before the check interval has passed
+    Result: The previous config is returned without checking the file
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(config_path, BASE_CONFIG)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+    monkeypatch.setattr(get_configuration, "CONFIG_CHECK_INTERVAL", 3600)
+
+    config = get_config()
+    write_config(config_path, {**BASE_CONFIG, "filesize_limit": 5000})
+    assert get_config() is config
+
+
+def test_get_config_003_anomalous_invalid_change_keeps_previous(monkeypatch, tmp_path):
+    """
+    Test 003 - Anomalous
+    Conditions: The config file is changed to an invalid config
+    Result: The previous config is returned
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(config_path, BASE_CONFIG)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+    monkeypatch.setattr(get_configuration, "CONFIG_CHECK_INTERVAL", 0)
+
+    config = get_config()
+    write_config(config_path, {**BASE_CONFIG, "filesize_limit": -1})
+    assert get_config() is config
+
+
+def test_get_config_004_anomalous_invalid_config(monkeypatch, tmp_path):
+    """
+    Test 004 - Anomalous
+    Conditions: The config file is invalid when first loaded
+    Result: ValueError("'filesize_limit'' must be an integer greater than 0.")
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(config_path, {**BASE_CONFIG, "filesize_limit": -1})
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+
+    with pytest.raises(ValueError) as e:
+        get_config()
+    assert str(e.value) == "'filesize_limit'' must be an integer greater than 0."
+
+
+def test_get_config_005_anomalous_s3_without_bucket(monkeypatch, tmp_path):
+    """
+    Test 005 - Anomalous
+    Conditions: "storage_backend" is "s3" but "s3_bucket" is not set
+    Result: ValueError("'s3_bucket' must be set for the 's3' storage backend.")
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(
+        config_path,
+        {
+            **BASE_CONFIG,
+            "storage_backend": "s3",
+            "s3_endpoint_url": "http://minio:9000",
+        },
+    )
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+
+    with pytest.raises(ValueError) as e:
+        get_config()
+    assert str(e.value) == "'s3_bucket' must be set for the 's3' storage backend."
+
+
+def test_get_config_006_anomalous_erasure_coded_too_few_roots(monkeypatch, tmp_path):
+    """
+    Test 006 - Anomalous
+    Conditions: "storage_backend" is "erasure_coded" with fewer roots than shards
+    Result: ValueError("'storage_roots' must have at least 3 roots for the 'erasure_coded' storage backend.")
+    """
+    config_path = os.path.join(tmp_path, "config.json")
+    write_config(
+        config_path,
+        {
+            **BASE_CONFIG,
+            "storage_backend": "erasure_coded",
+            "storage_roots": [{"path": "/mnt/disk1"}, {"path": "/mnt/disk2"}],
+            "erasure_coding": {"data_shards": 2, "parity_shards": 1},
+        },
+    )
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+
+    with pytest.raises(ValueError) as e:
+        get_config()
+    assert (
+        str(e.value)
+        == "'storage_roots' must have at least 3 roots for the 'erasure_coded' storage backend."
+    )
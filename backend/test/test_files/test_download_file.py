@@ -10,10 +10,22 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import pytest
+import os
 import re
+import random
+import hashlib
+import pytest
+import pytest_asyncio
 from app.models.models import File as FileModel
-from test.conftest import TEST_CONTENT, TEST_STORAGE, TEST_DOWNLOADS
+from app.packages.storage_driver.get_file_path import get_shard_directory
+from app.packages.storage_driver.migrate_storage_layout import migrate_storage_layout
+from test.conftest import (
+    TEST_CONTENT,
+    TEST_STORAGE,
+    TEST_DOWNLOADS,
+    TEST_FILE_SHA256,
+    CONFIGS,
+)
 
 
 @pytest.mark.asyncio
@@ -35,6 +47,8 @@ async def test_download_file_000_nominal_public_file(
     assert response.status_code == 200
     print(response.content)
     assert len(response.content) == 430061
+    # Validate that the file's checksum is served as its ETag
+    assert response.headers["ETag"] == f'"{TEST_FILE_SHA256}"'
 
     # Validate that the filename is "test_file1.jpeg"
     content_disposition = response.headers.get("Content-Disposition")
@@ -98,3 +112,296 @@ async def test_download_file_003_anomalous_exceeded_rate_limit(client):
     response = client.get("files/abcdefgh/download")
     response = client.get("files/abcdefgh/download")
     assert response.status_code == 429
+
+
+# Size of the large file served by the range tests, which spans many read chunks
+LARGE_FILE_SIZE = 8 * 1024 * 1024
+
+
+@pytest_asyncio.fixture(scope="function")
+async def seed_large_file(test_db_session, seed_user):
+    content = random.Random(0).randbytes(LARGE_FILE_SIZE)
+    with open(os.path.join(TEST_STORAGE, "largefile.mp4"), "wb") as file:
+        file.write(content)
+    test_db_session.add(
+        FileModel(
+            id="largefile",
+            owner_username=seed_user.username,
+            mimetype="video/mp4",
+            filename="largefile.mp4",
+            original_filename="video.mp4",
+            size=LARGE_FILE_SIZE,
+            sha256=hashlib.sha256(content).hexdigest(),
+        )
+    )
+    await test_db_session.commit()
+    yield content
+
+
+@pytest.mark.asyncio
+async def test_download_file_005_nominal_single_range(
+    monkeypatch, client, seed_large_file, clear_storage_directory
+):
+    """
+    Test 005 - Nominal
+    Conditions: A single range is requested from the middle of a large file
+    Result: HTTP 206 - The range is returned with its Content-Range
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get(
+        "files/largefile/download", headers={"Range": "bytes=1000000-5000000"}
+    )
+    assert response.status_code == 206
+    assert (
+        response.headers["Content-Range"] == f"bytes 1000000-5000000/{LARGE_FILE_SIZE}"
+    )
+    assert response.headers["Content-Length"] == "4000001"
+    assert response.headers["Content-Type"] == "video/mp4"
+    assert response.content == seed_large_file[1000000:5000001]
+
+
+@pytest.mark.asyncio
+async def test_download_file_006_nominal_suffix_and_open_ranges(
+    monkeypatch, client, seed_large_file, clear_storage_directory
+):
+    """
+    Test 006 - Nominal
+    Conditions: The last bytes of the file, and the file from an offset, are requested
+    Result: HTTP 206 - Each range is resolved against the size of the file
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get("files/largefile/download", headers={"Range": "bytes=-500"})
+    assert response.status_code == 206
+    assert response.content == seed_large_file[-500:]
+
+    response = client.get(
+        "files/largefile/download",
+        headers={"Range": f"bytes={LARGE_FILE_SIZE - 100}-"},
+    )
+    assert response.status_code == 206
+    assert response.content == seed_large_file[-100:]
+
+
+@pytest.mark.asyncio
+async def test_download_file_007_nominal_multiple_ranges(
+    monkeypatch, client, seed_large_file, clear_storage_directory
+):
+    """
+    Test 007 - Nominal
+    Conditions: Several ranges are requested, two of which overlap
+    Result: HTTP 206 - multipart/byteranges with the overlapping ranges merged
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get(
+        "files/largefile/download",
+        headers={"Range": "bytes=0-99,7000000-7000199,50-149"},
+    )
+    assert response.status_code == 206
+    content_type = response.headers["Content-Type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    assert int(response.headers["Content-Length"]) == len(response.content)
+
+    parts = response.content.split(b"--" + boundary)
+    assert parts[-1] == b"--\r\n"
+    parts = [part for part in parts[1:-1]]
+    assert len(parts) == 2
+    for part, (start, end) in zip(parts, [(0, 149), (7000000, 7000199)]):
+        headers, body = part.split(b"\r\n\r\n", 1)
+        assert (
+            f"Content-Range: bytes {start}-{end}/{LARGE_FILE_SIZE}".encode() in headers
+        )
+        assert body.removesuffix(b"\r\n") == seed_large_file[start : end + 1]
+
+
+@pytest.mark.asyncio
+async def test_download_file_008_anomalous_range_not_satisfiable(
+    monkeypatch, client, seed_large_file, clear_storage_directory
+):
+    """
+    Test 008 - Anomalous
+    Conditions: The requested range starts past the end of the file
+    Result: HTTP 416 - "Requested range not satisfiable"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get(
+        "files/largefile/download",
+        headers={"Range": f"bytes={LARGE_FILE_SIZE}-"},
+    )
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{LARGE_FILE_SIZE}"
+    assert response.json()["detail"] == "Requested range not satisfiable"
+
+
+@pytest.mark.asyncio
+async def test_download_file_009_nominal_if_range(
+    monkeypatch, client, seed_large_file, clear_storage_directory
+):
+    """
+    Test 009 - Nominal
+    Conditions: A range is requested with an If-Range of the file's ETag, then of another ETag
+    Result: HTTP 206 for the matching ETag, and HTTP 200 with the whole file otherwise
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    etag = f'"{hashlib.sha256(seed_large_file).hexdigest()}"'
+    response = client.get(
+        "files/largefile/download",
+        headers={"Range": "bytes=0-9", "If-Range": etag},
+    )
+    assert response.status_code == 206
+    assert response.content == seed_large_file[:10]
+
+    response = client.get(
+        "files/largefile/download",
+        headers={"Range": "bytes=0-9", "If-Range": '"stale"'},
+    )
+    assert response.status_code == 200
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert len(response.content) == LARGE_FILE_SIZE
+
+
+@pytest.mark.asyncio
+async def test_download_file_010_nominal_not_modified(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 010 - Nominal
+    Conditions: The file is requested again with its ETag
+    Result: HTTP 304 - No body is returned
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get(
+        "files/abcdefgh/download", headers={"If-None-Match": f'"{TEST_FILE_SHA256}"'}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == f'"{TEST_FILE_SHA256}"'
+    assert "Last-Modified" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_download_file_011_nominal_x_accel_redirect(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 011 - Nominal
+    Conditions: Downloads are offloaded to nginx with X-Accel-Redirect
+    Result: HTTP 200 - No body, and X-Accel-Redirect points at the file's internal location
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_x_accel_redirect.json")
+    )
+    response = client.get("files/abcdefgh/download", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["X-Accel-Redirect"] == "/internal/storage/abcdefgh.jpeg"
+    assert response.headers["Content-Type"] == "image/jpeg"
+    assert (
+        response.headers["Content-Disposition"]
+        == 'attachment; filename="test_file1.jpeg"'
+    )
+    assert response.headers["ETag"] == f'"{TEST_FILE_SHA256}"'
+
+
+@pytest.mark.asyncio
+async def test_download_file_012_nominal_x_sendfile(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 012 - Nominal
+    Conditions: Downloads are offloaded with X-Sendfile
+    Result: HTTP 200 - No body, and X-Sendfile holds the path of the file in storage
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv("CONFIG_PATH", os.path.join(CONFIGS, "config_x_sendfile.json"))
+    response = client.get("files/abcdefgh/download")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["X-Sendfile"] == os.path.join(TEST_STORAGE, "abcdefgh.jpeg")
+
+
+@pytest.mark.asyncio
+async def test_download_file_013_nominal_served_from_memory(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 013 - Nominal
+    Conditions: A small file is downloaded twice, with its binary removed in between
+    Result: HTTP 200 - The second download is served from memory without reading storage
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get("files/abcdefgh/download")
+    assert response.status_code == 200
+    content = response.content
+
+    os.remove(os.path.join(TEST_STORAGE, "abcdefgh.jpeg"))
+    response = client.get("files/abcdefgh/download", headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.content == content[:100]
+    response = client.get("files/abcdefgh/download")
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["ETag"] == f'"{TEST_FILE_SHA256}"'
+
+
+@pytest.mark.asyncio
+async def test_download_file_014_nominal_memory_storage(
+    monkeypatch, client, seed_user, seed_jwt, clear_storage_directory
+):
+    """
+    Test 014 - Nominal
+    Conditions: A file is uploaded and downloaded with the "memory" storage backend
+    Result: HTTP 200 and 206 - The file and a range of it are streamed from memory
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_memory_storage.json")
+    )
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        content = file.read()
+    response = client.post(
+        "files/",
+        headers={"Authorization": f"Bearer {seed_jwt}"},
+        files={"file": ("test_file1.jpeg", content, "image/jpeg")},
+    )
+    assert response.status_code == 201
+    file_id = response.json()["id"]
+    assert not os.path.exists(os.path.join(TEST_STORAGE, response.json()["filename"]))
+
+    response = client.get(f"files/{file_id}/download")
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["Content-Length"] == str(len(content))
+    response = client.get(
+        f"files/{file_id}/download", headers={"Range": "bytes=100-199"}
+    )
+    assert response.status_code == 206
+    assert response.content == content[100:200]
+
+
+@pytest.mark.asyncio
+async def test_download_file_015_nominal_sharded_layout_migrated_online(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 015 - Nominal
+    Conditions: A file is downloaded with the sharded layout before and after migration
+    Result: HTTP 200 - X-Accel-Redirect names the flat path, then the sharded path
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_sharded_storage.json")
+    )
+    response = client.get("files/abcdefgh/download")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/internal/storage/abcdefgh.jpeg"
+
+    migrate_storage_layout()
+    response = client.get("files/abcdefgh/download")
+    assert response.status_code == 200
+    shard_directory = get_shard_directory("abcdefgh.jpeg")
+    assert (
+        response.headers["X-Accel-Redirect"]
+        == f"/internal/storage/{shard_directory}/abcdefgh.jpeg"
+    )
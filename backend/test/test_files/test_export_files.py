@@ -0,0 +1,119 @@
+"""
+tests/test_export_files.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for the files router in routers/files.py
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from app.models.models import File as FileModel
+from app.packages.pagination import export_files
+
+
+@pytest_asyncio.fixture(scope="function")
+async def seed_file_objects(test_db_session, seed_admin_user):
+    for day, file_id in enumerate(["file0003", "file0001", "file0002"], start=1):
+        test_db_session.add(
+            FileModel(
+                id=file_id,
+                owner_username=seed_admin_user.username,
+                mimetype="text/plain",
+                filename=file_id + ".txt",
+                original_filename=file_id + ".txt",
+                size=day * 10,
+                upload_datetime=datetime(2024, 1, day),
+            )
+        )
+    await test_db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_export_files_000_nominal(
+    monkeypatch, client, seed_admin_jwt, seed_file_objects
+):
+    """
+    Test 000 - Nominal
+    Conditions: Three file objects are exported, in batches of two
+    Result: HTTP 200 - One JSON line for each file, in order of upload
+    """
+    monkeypatch.setattr(export_files, "EXPORT_BATCH_SIZE", 2)
+    headers = {"Authorization": f"Bearer {seed_admin_jwt}"}
+    response = client.get("files/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ["file0003", "file0001", "file0002"]
+    assert lines[0]["size"] == 10
+    assert lines[0]["upload_datetime"] == "2024-01-01T00:00:00"
+
+
+@pytest.mark.asyncio
+async def test_export_files_001_nominal_since(
+    client, seed_admin_jwt, seed_file_objects
+):
+    """
+    Test 001 - Nominal
+    Conditions: The file objects uploaded since the second file are exported
+    Result: HTTP 200 - Only the second and third files are exported
+    """
+    headers = {"Authorization": f"Bearer {seed_admin_jwt}"}
+    response = client.get("files/export?since=2024-01-02T00:00:00", headers=headers)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ["file0001", "file0002"]
+
+
+@pytest.mark.asyncio
+async def test_export_files_002_anomalous_insufficient_privileges(client, seed_jwt):
+    """
+    Test 002 - Anomalous
+    Conditions: The export is requested by a user who is not an admin
+    Result: HTTP 403 - Admin privileges required
+    """
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.get("files/export", headers=headers)
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Admin privileges required"}
+
+
+@pytest.mark.asyncio
+async def test_export_files_003_nominal_written_during_export(
+    monkeypatch, test_db_engine, test_db_session, seed_file_objects
+):
+    """
+    Test 003 - Nominal
+    Conditions: A file object is stored while an export in batches of two is between batches
+    Result: The file object is stored without waiting, and the export continues to include it
+    """
+    monkeypatch.setattr(export_files, "EXPORT_BATCH_SIZE", 2)
+    export = export_files.export_files(test_db_engine)
+    content = await export.__anext__()
+
+    test_db_session.add(
+        FileModel(
+            id="file0004",
+            mimetype="text/plain",
+            filename="file0004.txt",
+            original_filename="file0004.txt",
+            size=40,
+            upload_datetime=datetime(2024, 1, 4),
+        )
+    )
+    await asyncio.wait_for(test_db_session.commit(), timeout=1)
+    content += b"".join([batch async for batch in export])
+    lines = [json.loads(line) for line in content.decode().splitlines()]
+    assert [line["id"] for line in lines] == [
+        "file0003",
+        "file0001",
+        "file0002",
+        "file0004",
+    ]
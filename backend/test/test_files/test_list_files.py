@@ -13,11 +13,15 @@ the MIT License. See the LICENSE file for more details.
 import os
 import shutil
 import pytest
+from datetime import datetime
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.database import engine, Base, create_tables, drop_tables
 from app.models.models import File as FileModel
+from app.packages.cleanup.reconcile_file_availability import (
+    reconcile_file_availability,
+)
 from test.conftest import TEST_CONTENT, TEST_STORAGE
 
 
@@ -89,8 +93,9 @@ async def test_list_files_002_anomalous_file_in_db_and_not_in_storage(
     test_db_session.add(file_object)
     await test_db_session.commit()
 
-    # Make the request the the test client
+    # Make the request the the test client, once the missing file is reconciled
     monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await reconcile_file_availability(test_db_session)
     response = client.get("files/")
 
     # Validate that the metadata is present in the database
@@ -128,3 +133,153 @@ async def test_list_files_003_anomalous_file_not_in_db_and_in_storage(
     response = client.get("files/")
     assert response.status_code == 200
     assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_list_files_004_nominal_not_modified(
+    monkeypatch,
+    client,
+    test_db_session,
+    seed_file_object,
+    seed_file_binary,
+    clear_storage_directory,
+):
+    """
+    Test 004 - Nominal
+    Conditions: The listing is requested again with its ETag, then again after a file is removed
+    Result: HTTP 304 while the listing is unchanged, then HTTP 200 with a new ETag
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get("files/")
+    etag = response.headers["ETag"]
+
+    response = client.get("files/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    os.remove(os.path.join(TEST_STORAGE, "abcdefgh.jpeg"))
+    await reconcile_file_availability(test_db_session)
+    response = client.get("files/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+# Seed file objects without binaries, as (id, owner, mimetype, size, upload datetime)
+async def seed_file_objects(test_db_session, files):
+    for file_id, owner, mimetype, size, upload_datetime in files:
+        test_db_session.add(
+            FileModel(
+                id=file_id,
+                owner_username=owner,
+                mimetype=mimetype,
+                filename=file_id + ".bin",
+                original_filename=file_id + ".bin",
+                size=size,
+                upload_datetime=upload_datetime,
+            )
+        )
+    await test_db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_list_files_005_nominal_paginated(monkeypatch, client, test_db_session):
+    """
+    Test 005 - Nominal
+    Conditions: Five files uploaded within the same second are listed two at a time
+    Result: HTTP 200 - Every file is listed once, in order, until no next cursor is given
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    file_ids = ["file0005", "file0001", "file0004", "file0002", "file0003"]
+    await seed_file_objects(
+        test_db_session,
+        [(file_id, "test-user", "text/plain", 10, None) for file_id in file_ids],
+    )
+
+    listed = []
+    url = "files/?limit=2"
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        listed += [file["id"] for file in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            assert "Link" not in response.headers
+            url = None
+        else:
+            assert f"cursor={cursor}" in response.headers["Link"]
+            assert response.headers["Link"].endswith('>; rel="next"')
+            url = f"files/?limit=2&cursor={cursor}"
+    assert listed == sorted(file_ids)
+
+
+@pytest.mark.asyncio
+async def test_list_files_006_nominal_filtered_and_sorted(
+    monkeypatch, client, test_db_session
+):
+    """
+    Test 006 - Nominal
+    Conditions: Files are listed by owner, mimetype, size range and date range, and by descending size
+    Result: HTTP 200 - Only the matching files are listed, in the requested order
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await seed_file_objects(
+        test_db_session,
+        [
+            ("file0001", "test-user", "image/png", 100, datetime(2024, 1, 1)),
+            ("file0002", "test-user", "image/jpeg", 300, datetime(2024, 1, 2)),
+            ("file0003", "test-user2", "image/png", 200, datetime(2024, 1, 3)),
+            ("file0004", "test-user", "text/plain", 400, datetime(2024, 1, 4)),
+        ],
+    )
+
+    def listed(query):
+        response = client.get("files/?" + query)
+        assert response.status_code == 200
+        return [file["id"] for file in response.json()]
+
+    assert listed("owner=test-user2") == ["file0003"]
+    assert listed("mimetype=image/*") == ["file0001", "file0002", "file0003"]
+    assert listed("mimetype=image/png") == ["file0001", "file0003"]
+    assert listed("min_size=200&max_size=300") == ["file0002", "file0003"]
+    assert listed(
+        "uploaded_after=2024-01-02T00:00:00&uploaded_before=2024-01-04T00:00:00"
+    ) == ["file0002", "file0003"]
+    assert listed("sort=size&order=desc") == [
+        "file0004",
+        "file0002",
+        "file0003",
+        "file0001",
+    ]
+
+    response = client.get("files/?sort=size&order=desc&limit=3")
+    cursor = response.headers["X-Next-Cursor"]
+    assert listed(f"sort=size&order=desc&limit=3&cursor={cursor}") == ["file0001"]
+
+
+@pytest.mark.asyncio
+async def test_list_files_007_anomalous_invalid_cursor(
+    monkeypatch, client, test_db_session
+):
+    """
+    Test 007 - Anomalous
+    Conditions: The listing is requested with a malformed cursor, and with a cursor issued for another sort
+    Result: HTTP 422 - Invalid cursor
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await seed_file_objects(
+        test_db_session,
+        [
+            ("file0001", "test-user", "text/plain", 10, None),
+            ("file0002", "test-user", "text/plain", 20, None),
+        ],
+    )
+    response = client.get("files/?cursor=not-a-cursor")
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid cursor"}
+
+    cursor = client.get("files/?sort=size&limit=1").headers["X-Next-Cursor"]
+    response = client.get(f"files/?cursor={cursor}")
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid cursor"}
@@ -10,14 +10,17 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
+import os
+import shutil
 import pytest
 
 from sqlalchemy import select
 
 from app.models.models import File as FileModel
+from app.models.models import Blob
 from app.packages.storage_driver.is_file_present import is_file_present
 
-from test.conftest import TEST_STORAGE
+from test.conftest import TEST_CONTENT, TEST_STORAGE
 
 
 @pytest.mark.asyncio
@@ -164,3 +167,55 @@ async def test_remove_file_004_anomalous_file_insufficient_priveledges(
 
     # Validate that the file itself has NOT been deleted
     assert is_file_present("abcdefgh.jpeg")
+
+
+@pytest.mark.asyncio
+async def test_remove_file_005_nominal_shared_blob(
+    monkeypatch,
+    client,
+    test_db_session,
+    seed_user,
+    seed_jwt,
+    clear_storage_directory,
+):
+    """
+    Test 005 - Nominal
+    Conditions: Two file objects share a blob, and both are removed in turn
+    Result: HTTP 204 - The blob is only removed with its last reference
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    # Seed a blob referenced by two file objects
+    shutil.copy(
+        os.path.join(TEST_CONTENT, "test_file1.jpeg"),
+        os.path.join(TEST_STORAGE, "blobhash"),
+    )
+    blob = Blob(sha256="blobhash", filename="blobhash", size=430061, reference_count=2)
+    test_db_session.add(blob)
+    for file_id in ["abcdefgh", "ijklmnop"]:
+        test_db_session.add(
+            FileModel(
+                id=file_id,
+                owner=seed_user,
+                mimetype="image/jpeg",
+                filename="blobhash",
+                original_filename="test_file1.jpeg",
+                size=430061,
+                blob=blob,
+            )
+        )
+    await test_db_session.commit()
+
+    # Removing the first reference keeps the blob
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.delete("files/abcdefgh", headers=headers)
+    assert response.status_code == 204
+    await test_db_session.refresh(blob)
+    assert blob.reference_count == 1
+    assert is_file_present("blobhash")
+
+    # Removing the last reference removes the blob
+    response = client.delete("files/ijklmnop", headers=headers)
+    assert response.status_code == 204
+    blobs = await test_db_session.execute(select(Blob))
+    assert blobs.scalars().all() == []
+    assert not is_file_present("blobhash")
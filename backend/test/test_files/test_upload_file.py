@@ -17,8 +17,8 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.packages.storage_driver.is_file_present import is_file_present
-from test.conftest import TEST_CONTENT, TEST_STORAGE, CONFIGS
-from app.models.models import File, User
+from test.conftest import TEST_CONTENT, TEST_STORAGE, CONFIGS, TEST_FILE_SHA256
+from app.models.models import File, User, Blob
 
 
 @pytest.mark.asyncio
@@ -42,6 +42,7 @@ async def test_upload_file_000_nominal(
 
     assert response.status_code == 201
     assert response.json()["original_filename"] == "test_file1.jpeg"
+    assert response.json()["sha256"] == TEST_FILE_SHA256
 
     # Make sure the file metadata is present within the database
     query = select(File).where(File.original_filename == "test_file1.jpeg")
@@ -56,6 +57,8 @@ async def test_upload_file_000_nominal(
     assert file.size == 430061
     # Validate that the file binary was saved to stroage
     assert is_file_present(file.filename)
+    # Validate that the checksum was computed while the file was written
+    assert file.sha256 == TEST_FILE_SHA256
 
     # Eaglerly load the user's files
     stmt = (
@@ -136,7 +139,7 @@ async def test_upload_file_004_anomalous_oversized_file(
     """
     Test 004 - Anomalous
     Conditions: File size is over the allowed size
-    Result: HTTP 422 - "File size is 430061B, which exceeds the maximum allowed size of 100B"
+    Result: HTTP 422 - "File size exceeds the maximum allowed size of 1000B"
     """
     monkeypatch.setenv(
         "CONFIG_PATH", os.path.join(CONFIGS, "config_low_filesize_limit.json")
@@ -153,5 +156,133 @@ async def test_upload_file_004_anomalous_oversized_file(
     print(response.json()["detail"])
     assert (
         response.json()["detail"]
-        == "File size is 430061B, which exceeds the maximum allowed size of 1000B"
+        == "File size exceeds the maximum allowed size of 1000B"
     )
+    # Validate that nothing was written to storage
+    assert os.listdir(TEST_STORAGE) == [".gitignore"]
+
+
+@pytest.mark.asyncio
+async def test_upload_file_005_anomalous_oversized_file_without_content_length(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 005 - Anomalous
+    Conditions: File size is over the allowed size, and the body is sent chunked
+    Result: HTTP 422 - "File size exceeds the maximum allowed size of 1000B"
+    """
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_low_filesize_limit.json")
+    )
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    boundary = "atto-host-test-boundary"
+
+    # Send the body as a generator so that no Content-Length header is included
+    def body():
+        yield (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="test_file1.jpeg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n"
+        ).encode()
+        with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+            while chunk := file.read(512):
+                yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    headers = {
+        "Authorization": f"Bearer {seed_jwt}",
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+    }
+    response = client.post("files/", headers=headers, content=body())
+    assert response.status_code == 422
+    assert (
+        response.json()["detail"]
+        == "File size exceeds the maximum allowed size of 1000B"
+    )
+    # Validate that the partially written file was removed from storage
+    assert os.listdir(TEST_STORAGE) == [".gitignore"]
+
+
+@pytest.mark.asyncio
+async def test_upload_file_006_nominal_content_addressed_duplicate_upload(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 006 - Nominal
+    Conditions: The same file is uploaded twice in content-addressed storage mode
+    Result: Both file objects share one blob, which is stored once
+    """
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_content_addressed.json")
+    )
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    for _ in range(2):
+        with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+            response = client.post(
+                "files/",
+                headers=headers,
+                files={"file": ("test_file1.jpeg", file, "image/jpeg")},
+            )
+        assert response.status_code == 201
+
+    # Validate that both file objects point at the same blob
+    result = await test_db_session.execute(select(File))
+    file_objects = result.scalars().all()
+    assert len(file_objects) == 2
+    assert file_objects[0].id != file_objects[1].id
+    assert file_objects[0].blob_sha256 == file_objects[1].blob_sha256
+    assert file_objects[0].filename == file_objects[1].filename
+
+    # Validate that the blob is referenced twice and stored once
+    result = await test_db_session.execute(select(Blob))
+    blobs = result.scalars().all()
+    assert len(blobs) == 1
+    assert blobs[0].reference_count == 2
+    assert blobs[0].size == 430061
+    stored_files = [
+        filename
+        for filename in os.listdir(TEST_STORAGE)
+        if os.path.isfile(os.path.join(TEST_STORAGE, filename))
+        and filename != ".gitignore"
+    ]
+    assert stored_files == [blobs[0].filename]
+
+
+@pytest.mark.asyncio
+async def test_upload_file_007_nominal_content_addressed_released_blob(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 007 - Nominal
+    Conditions: The content's blob has no references left and its binary has been removed
+    Result: HTTP 201 - The blob is referenced once and the upload is stored as its binary
+    """
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_content_addressed.json")
+    )
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    test_db_session.add(
+        Blob(
+            sha256=TEST_FILE_SHA256,
+            filename=TEST_FILE_SHA256,
+            size=430061,
+            reference_count=0,
+        )
+    )
+    await test_db_session.commit()
+
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        response = client.post(
+            "files/",
+            headers=headers,
+            files={"file": ("test_file1.jpeg", file, "image/jpeg")},
+        )
+    assert response.status_code == 201
+    result = await test_db_session.execute(
+        select(Blob).execution_options(populate_existing=True)
+    )
+    blobs = result.scalars().all()
+    assert [blob.reference_count for blob in blobs] == [1]
+    assert is_file_present(TEST_FILE_SHA256)
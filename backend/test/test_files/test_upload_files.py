@@ -0,0 +1,142 @@
+"""
+tests/test_upload_files.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for uploading a batch of files in POST files/batch
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+from sqlalchemy import select
+
+from app.packages.storage_driver.is_file_present import is_file_present
+from test.conftest import TEST_CONTENT, TEST_STORAGE, CONFIGS
+from app.models.models import File, Blob
+
+
+@pytest.mark.asyncio
+async def test_upload_files_000_nominal(
+    monkeypatch, client, test_db_session, seed_user, seed_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: A batch of text files and an image included in request
+    Result: HTTP 200 - A file object for each file, in the order sent
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        image = file.read()
+    files = [
+        ("files", (f"note{number}.txt", f"Note {number}\n".encode(), "text/plain"))
+        for number in range(20)
+    ]
+    files.append(("files", ("test_file1.jpeg", image, "image/jpeg")))
+    response = client.post("files/batch", headers=headers, files=files)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["original_filename"] for result in results] == [
+        *(f"note{number}.txt" for number in range(20)),
+        "test_file1.jpeg",
+    ]
+    assert all(result["status_code"] == 201 for result in results)
+    assert results[-1]["size"] == 430061
+
+    file_objects = await test_db_session.execute(select(File))
+    file_objects = file_objects.scalars().all()
+    assert len(file_objects) == 21
+    for file_object in file_objects:
+        assert file_object.owner_username == seed_user.username
+        assert is_file_present(file_object.filename)
+    with open(os.path.join(TEST_STORAGE, results[0]["filename"]), "rb") as file:
+        assert file.read() == b"Note 0\n"
+
+
+@pytest.mark.asyncio
+async def test_upload_files_001_nominal_rejected_file_in_batch(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: One file of the batch has a disallowed extension
+    Result: HTTP 200 - The file is rejected with "File type .bat not allowed", and
+    the rest of the batch is stored
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    files = [
+        ("files", ("note1.txt", b"First note\n", "text/plain")),
+        ("files", ("test_script.bat", b"echo hello\n", "text/plain")),
+        ("files", ("note2.txt", b"Second note\n", "text/plain")),
+    ]
+    response = client.post("files/batch", headers=headers, files=files)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status_code"] for result in results] == [201, 422, 201]
+    assert results[1] == {
+        "original_filename": "test_script.bat",
+        "status_code": 422,
+        "detail": "File type .bat not allowed",
+    }
+    file_objects = await test_db_session.execute(select(File))
+    assert len(file_objects.scalars().all()) == 2
+    assert sorted(os.listdir(TEST_STORAGE)) == sorted(
+        [".gitignore", ".partial", results[0]["filename"], results[2]["filename"]]
+    )
+    assert os.listdir(os.path.join(TEST_STORAGE, ".partial")) == []
+
+
+@pytest.mark.asyncio
+async def test_upload_files_002_nominal_content_addressed_duplicates(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 002 - Nominal
+    Conditions: The same file appears twice in a batch in content-addressed storage mode
+    Result: HTTP 200 - Both file objects share one blob, which is stored once
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_content_addressed.json")
+    )
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        image = file.read()
+    files = [
+        ("files", ("first.jpeg", image, "image/jpeg")),
+        ("files", ("second.jpeg", image, "image/jpeg")),
+    ]
+    response = client.post("files/batch", headers=headers, files=files)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status_code"] for result in results] == [201, 201]
+    assert results[0]["filename"] == results[1]["filename"]
+    blobs = await test_db_session.execute(select(Blob))
+    blobs = blobs.scalars().all()
+    assert len(blobs) == 1
+    assert blobs[0].reference_count == 2
+
+
+@pytest.mark.asyncio
+async def test_upload_files_003_anomalous_no_files_included(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 003 - Anomalous
+    Conditions: No files included in request
+    Result: HTTP 422 - Field "files" required
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.post("files/batch", headers=headers, data={"note": "empty"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "files"]
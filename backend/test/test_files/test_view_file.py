@@ -11,7 +11,16 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import pytest
-from test.conftest import TEST_STORAGE
+from app.packages.caching.file_id_filter import (
+    rebuild_file_id_filter,
+    empty_file_id_filter,
+    might_contain_file_id,
+)
+from app.packages.cleanup.reconcile_file_availability import (
+    reconcile_file_availability,
+)
+from app.packages.metrics.metrics import get_metrics, reset_metrics
+from test.conftest import TEST_STORAGE, TEST_FILE_SHA256
 
 
 @pytest.mark.asyncio
@@ -35,6 +44,7 @@ async def test_view_file_000_nominal(
     assert file_object["filename"] == "abcdefgh.jpeg"
     assert file_object["original_filename"] == "test_file1.jpeg"
     assert file_object["size"] == 430061
+    assert file_object["sha256"] == TEST_FILE_SHA256
 
     # Validate that the file is preset in the storage directory
     assert file_object["is_file_available"] == True
@@ -60,15 +70,16 @@ async def test_view_file_001_anomalous_nonexistent_file(
 
 @pytest.mark.asyncio
 async def test_view_file_002_anomalous_file_missing_in_storage(
-    monkeypatch, client, seed_file_object, clear_storage_directory
+    monkeypatch, client, test_db_session, seed_file_object, clear_storage_directory
 ):
     """
     Test 002 - Nominal
     Conditions: File object present in database but file itself not in storage
     Result: HTTP 200 - [{"fileAvailable": false}]
     """
-    # Make the request the the test client
+    # Make the request the the test client, once the missing file is reconciled
     monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await reconcile_file_availability(test_db_session)
     response = client.get("files/abcdefgh")
 
     # Validate the metadata
@@ -79,6 +90,118 @@ async def test_view_file_002_anomalous_file_missing_in_storage(
     assert file_object["filename"] == "abcdefgh.jpeg"
     assert file_object["original_filename"] == "test_file1.jpeg"
     assert file_object["size"] == 430061
+    assert file_object["sha256"] == TEST_FILE_SHA256
 
     # Validate that the file is preset in the storage directory
     assert file_object["is_file_available"] == False
+
+
+@pytest.mark.asyncio
+async def test_view_file_003_nominal_not_modified(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 003 - Nominal
+    Conditions: The file object is requested again with its ETag, and with only a later date
+    Result: HTTP 304 - No body is returned, for the ETag only
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get("files/abcdefgh")
+    etag = response.headers["ETag"]
+    assert "Last-Modified" not in response.headers
+
+    response = client.get("files/abcdefgh", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    response = client.get(
+        "files/abcdefgh",
+        headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_view_file_004_nominal_modified(
+    monkeypatch, client, seed_file_object, seed_file_binary, clear_storage_directory
+):
+    """
+    Test 004 - Nominal
+    Conditions: The file object is requested with a stale ETag, and with an earlier date
+    Result: HTTP 200 - <{file_object}>
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    response = client.get("files/abcdefgh", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == 200
+    assert response.json()["id"] == "abcdefgh"
+    response = client.get(
+        "files/abcdefgh",
+        headers={"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_view_file_005_anomalous_removed_after_view(
+    monkeypatch,
+    client,
+    seed_jwt,
+    seed_file_object,
+    seed_file_binary,
+    clear_storage_directory,
+):
+    """
+    Test 005 - Anomalous
+    Conditions: A file object is viewed, which caches its metadata, and is then removed
+    Result: HTTP 404 - File not found
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    assert client.get("files/abcdefgh").status_code == 200
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    assert client.delete("files/abcdefgh", headers=headers).status_code == 204
+
+    response = client.get("files/abcdefgh")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "File not found"}
+
+
+@pytest.mark.asyncio
+async def test_view_file_006_anomalous_refused_by_filter(
+    monkeypatch, client, test_db_session
+):
+    """
+    Test 006 - Anomalous
+    Conditions: The file ID filter has been built, and unknown file objects are requested thrice
+    Result: HTTP 404 - File not found, after looking up recent uploads once and never the file
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await rebuild_file_id_filter(test_db_session)
+    reset_metrics()
+    for file_id in ["abcdefgh", "bcdefghi", "abcdefgh"]:
+        response = client.get(f"files/{file_id}")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "File not found"}
+    counters = get_metrics()["counters"]
+    assert counters["file_filter.rejections"] == 3
+    assert counters["file_filter.refreshes"] == 1
+    assert "metadata_cache.misses" not in counters
+
+
+@pytest.mark.asyncio
+async def test_view_file_007_nominal_uploaded_by_another_process(
+    monkeypatch, client, test_db_session, seed_file_object
+):
+    """
+    Test 007 - Nominal
+    Conditions: The file ID filter does not hold a file object uploaded by another process
+    Result: HTTP 200 - <{file_object}>, once the filter has looked up the recent uploads
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await rebuild_file_id_filter(test_db_session)
+    empty_file_id_filter()
+    assert not might_contain_file_id("abcdefgh")
+    reset_metrics()
+    response = client.get("files/abcdefgh")
+    assert response.status_code == 200
+    assert response.json()["id"] == "abcdefgh"
+    assert get_metrics()["counters"]["file_filter.refreshes"] == 1
+    assert might_contain_file_id("abcdefgh")
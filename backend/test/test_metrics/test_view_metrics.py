@@ -0,0 +1,57 @@
+"""
+tests/test_view_metrics.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for GET metrics/
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+
+from app.packages.metrics.metrics import reset_metrics
+from test.conftest import TEST_CONTENT, TEST_STORAGE
+
+
+@pytest.mark.asyncio
+async def test_view_metrics_000_nominal(
+    monkeypatch, client, seed_jwt, seed_admin_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: A file is uploaded, then an admin requests the metrics
+    Result: HTTP 200 - The detected mimetype and the upload stage timings are reported
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    reset_metrics()
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        client.post(
+            "files/",
+            headers={"Authorization": f"Bearer {seed_jwt}"},
+            files={"file": ("test_file1.jpeg", file, "image/jpeg")},
+        )
+
+    response = client.get(
+        "metrics/", headers={"Authorization": f"Bearer {seed_admin_jwt}"}
+    )
+    assert response.status_code == 200
+    metrics = response.json()
+    assert metrics["counters"]["mime.detected"] == {"image/jpeg": 1}
+    for stage in ["mime.detect", "upload.receive", "upload.store", "upload.commit"]:
+        assert metrics["timings"][stage]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_view_metrics_001_anomalous_not_admin(client, seed_jwt):
+    """
+    Test 001 - Anomalous
+    Conditions: A user who is not an admin requests the metrics
+    Result: HTTP 403 - "Admin privileges required"
+    """
+    response = client.get("metrics/", headers={"Authorization": f"Bearer {seed_jwt}"})
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin privileges required"
@@ -0,0 +1,128 @@
+"""
+test_release_file_binary.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the counting of references to blobs in packages/blobs
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import hashlib
+import pytest
+from sqlalchemy import select
+from app.models.models import File as FileModel
+from app.models.models import Blob
+from app.packages.blobs.acquire_blob import acquire_blob
+from app.packages.blobs.release_file_binary import (
+    release_file_binary,
+    remove_released_binary,
+)
+from app.packages.storage_driver.is_file_present import is_file_present
+from app.packages.storage_driver.storage_writer import StorageWriter
+from test.conftest import TEST_STORAGE
+
+CONTENT = b"shared content"
+CONTENT_SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+async def stage(filename: str):
+    writer = await StorageWriter(filename).open()
+    await writer.write(CONTENT)
+    await writer.close()
+    return writer
+
+
+@pytest.mark.asyncio
+async def test_acquire_blob_000_nominal_same_content_counted_once_each(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: The same content is acquired twice in one transaction
+    Result: One blob is created with two references, and its binary is stored once
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    for filename in ["first.txt", "second.txt"]:
+        await acquire_blob(test_db_session, await stage(filename))
+    await test_db_session.commit()
+
+    result = await test_db_session.execute(select(Blob))
+    blobs = result.scalars().all()
+    assert [(blob.sha256, blob.reference_count) for blob in blobs] == [
+        (CONTENT_SHA256, 2)
+    ]
+    assert is_file_present(CONTENT_SHA256)
+    assert not is_file_present("second.txt")
+
+
+@pytest.mark.asyncio
+async def test_release_file_binary_000_nominal_reacquired_before_removal(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: The last reference to a blob is released, and the content is uploaded
+    again before the released binary is removed
+    Result: The blob keeps the new reference and its binary is not removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    blob = await acquire_blob(test_db_session, await stage("first.txt"))
+    file = FileModel(
+        id="abcdefgh",
+        mimetype="text/plain",
+        filename=blob.filename,
+        original_filename="first.txt",
+        size=len(CONTENT),
+        blob=blob,
+    )
+    test_db_session.add(file)
+    await test_db_session.commit()
+
+    await release_file_binary(test_db_session, file)
+    await test_db_session.delete(file)
+    await test_db_session.commit()
+    await acquire_blob(test_db_session, await stage("second.txt"))
+    await test_db_session.commit()
+
+    assert not await remove_released_binary(test_db_session, file)
+    result = await test_db_session.execute(
+        select(Blob).execution_options(populate_existing=True)
+    )
+    assert [blob.reference_count for blob in result.scalars().all()] == [1]
+    assert is_file_present(CONTENT_SHA256)
+
+
+@pytest.mark.asyncio
+async def test_release_file_binary_001_nominal_last_reference_removed(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: The last reference to a blob is released and its deletion committed
+    Result: The blob and its binary are removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    blob = await acquire_blob(test_db_session, await stage("first.txt"))
+    file = FileModel(
+        id="abcdefgh",
+        mimetype="text/plain",
+        filename=blob.filename,
+        original_filename="first.txt",
+        size=len(CONTENT),
+        blob=blob,
+    )
+    test_db_session.add(file)
+    await test_db_session.commit()
+
+    await release_file_binary(test_db_session, file)
+    await test_db_session.delete(file)
+    await test_db_session.commit()
+    assert is_file_present(CONTENT_SHA256)
+    assert await remove_released_binary(test_db_session, file)
+
+    result = await test_db_session.execute(select(Blob))
+    assert result.scalars().all() == []
+    assert not is_file_present(CONTENT_SHA256)
@@ -0,0 +1,68 @@
+"""
+test_file_body_cache.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for the file body cache in packages/caching
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import pytest
+from app.packages.caching.file_body_cache import (
+    get_cached_file_body,
+    cache_file_body,
+)
+from app.packages.metrics.metrics import get_metrics, reset_metrics
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from test.conftest import TEST_STORAGE
+
+CONFIG = {"file_cache_size": 1000, "file_cache_max_file_size": 400}
+
+
+def test_file_body_cache_000_nominal_least_recently_used_evicted():
+    """
+    Test 000 - Nominal
+    Conditions: Three 400B bodies are cached in a 1000B cache, after the first is used again
+    Result: The second body, which was least recently used, is evicted
+    """
+    reset_metrics()
+    cache_file_body("first", b"1" * 400, CONFIG)
+    cache_file_body("second", b"2" * 400, CONFIG)
+    assert get_cached_file_body("first") == b"1" * 400
+    cache_file_body("third", b"3" * 400, CONFIG)
+
+    assert get_cached_file_body("second") is None
+    assert get_cached_file_body("first") == b"1" * 400
+    assert get_cached_file_body("third") == b"3" * 400
+    counters = get_metrics()["counters"]
+    assert counters["file_cache.hits"] == 3
+    assert counters["file_cache.misses"] == 1
+    assert counters["file_cache.evictions"] == 1
+
+
+def test_file_body_cache_001_nominal_large_file_not_cached():
+    """
+    Test 001 - Nominal
+    Conditions: A body larger than the largest cached file size is cached
+    Result: The body is not held
+    """
+    cache_file_body("large", b"0" * 401, CONFIG)
+    assert get_cached_file_body("large") is None
+
+
+@pytest.mark.asyncio
+async def test_file_body_cache_002_nominal_invalidated_on_delete(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 002 - Nominal
+    Conditions: The binary of a cached file is deleted from storage
+    Result: The cached body is dropped
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    cache_file_body("Dockerfile", b"FROM python", CONFIG)
+    await get_storage_backend().delete("Dockerfile")
+    assert get_cached_file_body("Dockerfile") is None
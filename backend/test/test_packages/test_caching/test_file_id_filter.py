@@ -0,0 +1,109 @@
+"""
+test_file_id_filter.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for the file ID filter in packages/caching
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import pytest
+from app.database import generate_unique_id
+from app.packages.caching import file_id_filter
+from app.packages.caching.file_id_filter import (
+    rebuild_file_id_filter,
+    might_contain_file_id,
+    add_file_id,
+    remove_file_id,
+    empty_file_id_filter,
+    add_uploaded_file_ids,
+)
+
+
+def test_file_id_filter_000_nominal_not_built():
+    """
+    Test 000 - Nominal
+    Conditions: The filter has not yet been built
+    Result: Every ID is let through
+    """
+    assert might_contain_file_id(generate_unique_id())
+
+
+@pytest.mark.asyncio
+async def test_file_id_filter_001_nominal_built_from_table(
+    test_db_session, seed_file_object
+):
+    """
+    Test 001 - Nominal
+    Conditions: The filter is built from a table holding one file, and 1000 random IDs are checked
+    Result: The file's ID is let through, and nearly all of the random IDs are refused
+    """
+    assert await rebuild_file_id_filter(test_db_session) == 1
+    assert might_contain_file_id("abcdefgh")
+    passed = [
+        file_id
+        for file_id in (generate_unique_id() for _ in range(1000))
+        if might_contain_file_id(file_id)
+    ]
+    assert len(passed) < 50
+
+
+@pytest.mark.asyncio
+async def test_file_id_filter_002_nominal_added_and_removed(test_db_session):
+    """
+    Test 002 - Nominal
+    Conditions: An ID is added to a built filter, and is then removed
+    Result: The ID is let through only while it is present
+    """
+    await rebuild_file_id_filter(test_db_session)
+    assert not might_contain_file_id("newfile0")
+    add_file_id("newfile0")
+    assert might_contain_file_id("newfile0")
+    remove_file_id("newfile0")
+    assert not might_contain_file_id("newfile0")
+
+
+@pytest.mark.asyncio
+async def test_file_id_filter_003_nominal_changes_during_rebuild(
+    monkeypatch, test_db_session, seed_file_object
+):
+    """
+    Test 003 - Nominal
+    Conditions: A file is stored and another removed while the filter is being rebuilt
+    Result: The rebuilt filter lets the stored file through and refuses the removed one
+    """
+    build = file_id_filter._build
+
+    def build_during_changes(file_ids):
+        add_file_id("newfile0")
+        remove_file_id("abcdefgh")
+        return build(file_ids)
+
+    monkeypatch.setattr(file_id_filter, "_build", build_during_changes)
+    await rebuild_file_id_filter(test_db_session)
+    assert might_contain_file_id("newfile0")
+    assert not might_contain_file_id("abcdefgh")
+
+
+@pytest.mark.asyncio
+async def test_file_id_filter_004_nominal_uploads_looked_up_by_interval(
+    test_db_session, seed_file_object
+):
+    """
+    Test 004 - Nominal
+    Conditions: Recent uploads are looked up twice within the interval, then with none
+    Result: Only the first and last are looked up, adding the upload to the filter once
+    """
+    assert not await add_uploaded_file_ids(test_db_session, 0)
+    await rebuild_file_id_filter(test_db_session)
+    empty_file_id_filter()
+
+    assert await add_uploaded_file_ids(test_db_session, 3600)
+    assert might_contain_file_id("abcdefgh")
+    assert not await add_uploaded_file_ids(test_db_session, 3600)
+    assert await add_uploaded_file_ids(test_db_session, 0)
+    remove_file_id("abcdefgh")
+    assert not might_contain_file_id("abcdefgh")
@@ -0,0 +1,98 @@
+"""
+test_file_metadata_cache.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for the file metadata cache in packages/caching
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import pytest
+from app.models.models import File as FileModel
+from app.packages.caching import file_metadata_cache
+from app.packages.caching.file_metadata_cache import (
+    get_file_metadata,
+    invalidate_file_metadata,
+)
+from app.packages.metrics.metrics import get_metrics, reset_metrics
+
+
+@pytest.mark.asyncio
+async def test_file_metadata_cache_000_nominal_cached_after_lookup(
+    test_db_session, seed_file_object
+):
+    """
+    Test 000 - Nominal
+    Conditions: The metadata of a file is looked up twice, its record changing in between
+    Result: The second lookup is served from the cache without consulting the database
+    """
+    reset_metrics()
+    metadata = await get_file_metadata(test_db_session, "abcdefgh")
+    assert metadata["filename"] == "abcdefgh.jpeg"
+
+    file = await test_db_session.get(FileModel, "abcdefgh")
+    file.original_filename = "renamed.jpeg"
+    await test_db_session.commit()
+
+    metadata = await get_file_metadata(test_db_session, "abcdefgh")
+    assert metadata["original_filename"] == "test_file1.jpeg"
+    counters = get_metrics()["counters"]
+    assert counters["metadata_cache.misses"] == 1
+    assert counters["metadata_cache.hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_file_metadata_cache_001_nominal_unknown_id_cached(test_db_session):
+    """
+    Test 001 - Nominal
+    Conditions: An ID which belongs to no file is looked up twice
+    Result: None is returned both times, the second from the cache
+    """
+    reset_metrics()
+    assert await get_file_metadata(test_db_session, "unknown0") is None
+    assert await get_file_metadata(test_db_session, "unknown0") is None
+    counters = get_metrics()["counters"]
+    assert counters["metadata_cache.misses"] == 1
+    assert counters["metadata_cache.negative_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_file_metadata_cache_002_nominal_invalidated(
+    test_db_session, seed_file_object
+):
+    """
+    Test 002 - Nominal
+    Conditions: The cached metadata of a file is invalidated after its record changes
+    Result: The next lookup reads the changed record from the database
+    """
+    await get_file_metadata(test_db_session, "abcdefgh")
+    file = await test_db_session.get(FileModel, "abcdefgh")
+    file.original_filename = "renamed.jpeg"
+    await test_db_session.commit()
+
+    invalidate_file_metadata("abcdefgh")
+    metadata = await get_file_metadata(test_db_session, "abcdefgh")
+    assert metadata["original_filename"] == "renamed.jpeg"
+
+
+@pytest.mark.asyncio
+async def test_file_metadata_cache_003_nominal_disabled_by_zero_ttl(
+    monkeypatch, test_db_session, seed_file_object
+):
+    """
+    Test 003 - Nominal
+    Conditions: The metadata cache TTL is configured as 0, and a file is looked up twice
+    Result: Both lookups consult the database
+    """
+    monkeypatch.setattr(
+        file_metadata_cache, "get_config", lambda: {"metadata_cache_ttl": 0}
+    )
+    reset_metrics()
+    await get_file_metadata(test_db_session, "abcdefgh")
+    await get_file_metadata(test_db_session, "abcdefgh")
+    counters = get_metrics()["counters"]
+    assert counters["metadata_cache.misses"] == 2
+    assert "metadata_cache.hits" not in counters
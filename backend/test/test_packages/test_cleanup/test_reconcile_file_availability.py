@@ -0,0 +1,169 @@
+"""
+test_reconcile_file_availability.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality of reconcile_file_availability() and remove_missing_files()
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import shutil
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app.models.models import File as FileModel
+from app.packages.cleanup.reconcile_file_availability import (
+    reconcile_file_availability,
+)
+from app.packages.cleanup.remove_missing_files import remove_missing_files
+from test.conftest import TEST_CONTENT, TEST_STORAGE
+
+
+# Seed file objects for binaries named after their IDs, as (id, is_file_available),
+# those which are not available having been missing for an hour
+async def seed_file_objects(test_db_session, files):
+    for file_id, is_file_available in files:
+        test_db_session.add(
+            FileModel(
+                id=file_id,
+                mimetype="image/jpeg",
+                filename=file_id + ".jpeg",
+                original_filename="test_file1.jpeg",
+                size=430061,
+                is_file_available=is_file_available,
+                missing_since=(
+                    None if is_file_available else datetime.now() - timedelta(hours=1)
+                ),
+            )
+        )
+    await test_db_session.commit()
+
+
+def seed_file_binary(file_id: str):
+    shutil.copy(
+        os.path.join(TEST_CONTENT, "test_file1.jpeg"),
+        os.path.join(TEST_STORAGE, file_id + ".jpeg"),
+    )
+
+
+async def get_availability(test_db_session):
+    files = await test_db_session.execute(
+        select(FileModel.id, FileModel.is_file_available).order_by(FileModel.id)
+    )
+    return dict(files.all())
+
+
+@pytest.mark.asyncio
+async def test_reconcile_file_availability_000_nominal_missing_file(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: Of three files recorded as available, the binary of the middle one is missing
+    Result: Only the middle file is marked missing
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await seed_file_objects(
+        test_db_session, [("file0001", True), ("file0002", True), ("file0003", True)]
+    )
+    seed_file_binary("file0001")
+    seed_file_binary("file0003")
+
+    reconciled = await reconcile_file_availability(test_db_session)
+    assert reconciled == {"missing": ["file0002"], "restored": []}
+    assert await get_availability(test_db_session) == {
+        "file0001": True,
+        "file0002": False,
+        "file0003": True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_reconcile_file_availability_001_nominal_restored_file(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: A file recorded as missing has its binary returned to storage
+    Result: The file is marked available again
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await seed_file_objects(test_db_session, [("file0001", False)])
+    seed_file_binary("file0001")
+
+    reconciled = await reconcile_file_availability(test_db_session)
+    assert reconciled == {"missing": [], "restored": ["file0001"]}
+    assert await get_availability(test_db_session) == {"file0001": True}
+
+
+@pytest.mark.asyncio
+async def test_remove_missing_files_000_nominal(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: One file was recorded as missing before the latest reconcile and ten as available
+    Result: Only the missing file is removed from the database
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    available = [f"file{number:04d}" for number in range(2, 12)]
+    await seed_file_objects(
+        test_db_session,
+        [("file0001", False)] + [(file_id, True) for file_id in available],
+    )
+
+    missing_files_removed = await remove_missing_files(test_db_session, datetime.now())
+    assert [file["id"] for file in missing_files_removed] == ["file0001"]
+    assert await get_availability(test_db_session) == dict.fromkeys(available, True)
+
+
+@pytest.mark.asyncio
+async def test_remove_missing_files_001_nominal_missing_on_two_reconciles(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: Of ten files, the binary of one is missing, and files are reconciled twice
+    Result: The missing file is only removed once the second reconcile finds it missing
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    file_ids = [f"file{number:04d}" for number in range(1, 11)]
+    await seed_file_objects(test_db_session, [(file_id, True) for file_id in file_ids])
+    for file_id in file_ids[1:]:
+        seed_file_binary(file_id)
+
+    reconciled_at = datetime.now()
+    reconciled = await reconcile_file_availability(test_db_session)
+    assert reconciled["missing"] == ["file0001"]
+    assert await remove_missing_files(test_db_session, reconciled_at) == []
+    reconciled_at = datetime.now()
+    await reconcile_file_availability(test_db_session)
+    missing_files_removed = await remove_missing_files(test_db_session, reconciled_at)
+    assert [file["id"] for file in missing_files_removed] == ["file0001"]
+    assert await get_availability(test_db_session) == dict.fromkeys(file_ids[1:], True)
+
+
+@pytest.mark.asyncio
+async def test_remove_missing_files_002_anomalous_over_limit(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: Two of three files are recorded as missing, over "purge_missing_limit"
+    Result: ValueError, and no file is removed from the database
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await seed_file_objects(
+        test_db_session, [("file0001", False), ("file0002", False), ("file0003", True)]
+    )
+
+    with pytest.raises(ValueError) as e:
+        await remove_missing_files(test_db_session, datetime.now())
+    assert str(e.value) == (
+        "2 of 3 files are missing, more than 'purge_missing_limit' allows to be removed"
+    )
+    assert len(await get_availability(test_db_session)) == 3
@@ -0,0 +1,143 @@
+"""
+test_remove_abandoned_uploads.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality of remove_abandoned_uploads()
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import time
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.models.models import Upload
+from app.packages.cleanup.remove_abandoned_uploads import remove_abandoned_uploads
+from test.conftest import TEST_STORAGE
+
+PARTIAL_STORAGE = os.path.join(TEST_STORAGE, ".partial")
+
+
+def seed_staged_file(filename, age=0):
+    filepath = os.path.join(PARTIAL_STORAGE, filename)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, "wb") as file:
+        file.write(b"0123456789")
+    modified_time = time.time() - age
+    os.utime(filepath, (modified_time, modified_time))
+
+
+@pytest.mark.asyncio
+async def test_remove_abandoned_uploads_000_nominal_abandoned_upload(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: An upload has not been continued within the upload expiry
+    Result: Upload and its staged binary are removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    test_db_session.add(
+        Upload(
+            id="abcdefgh",
+            original_filename="test_file1.jpeg",
+            content_type="image/jpeg",
+            size=430061,
+            offset=10,
+            updated_datetime=datetime.now() - timedelta(days=2),
+        )
+    )
+    await test_db_session.commit()
+    seed_staged_file("abcdefgh.upload", age=2 * 86400)
+
+    abandoned_uploads_removed = await remove_abandoned_uploads(test_db_session)
+    assert abandoned_uploads_removed == ["test_file1.jpeg"]
+    uploads = await test_db_session.execute(select(Upload))
+    assert uploads.scalars().all() == []
+    assert os.listdir(PARTIAL_STORAGE) == []
+
+
+@pytest.mark.asyncio
+async def test_remove_abandoned_uploads_001_nominal_active_upload(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: An upload was continued recently, though its staged binary is old
+    Result: Nothing happens
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    test_db_session.add(
+        Upload(
+            id="abcdefgh",
+            original_filename="test_file1.jpeg",
+            content_type="image/jpeg",
+            size=430061,
+            offset=10,
+            updated_datetime=datetime.now(),
+        )
+    )
+    await test_db_session.commit()
+    seed_staged_file("abcdefgh.upload", age=2 * 86400)
+
+    abandoned_uploads_removed = await remove_abandoned_uploads(test_db_session)
+    assert abandoned_uploads_removed == []
+    uploads = await test_db_session.execute(select(Upload))
+    assert len(uploads.scalars().all()) == 1
+    assert os.listdir(PARTIAL_STORAGE) == ["abcdefgh.upload"]
+
+
+@pytest.mark.asyncio
+async def test_remove_abandoned_uploads_002_anomalous_stale_staged_file(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: Staged files without an upload, one stale and one being written
+    Result: Only the stale staged file is removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    seed_staged_file("abcdefgh.jpeg", age=2 * 86400)
+    seed_staged_file("ijklmnop.jpeg")
+
+    abandoned_uploads_removed = await remove_abandoned_uploads(test_db_session)
+    assert abandoned_uploads_removed == []
+    assert os.listdir(PARTIAL_STORAGE) == ["ijklmnop.jpeg"]
+
+
+@pytest.mark.asyncio
+async def test_remove_abandoned_uploads_003_nominal_staged_parts(
+    monkeypatch, test_db_session, clear_storage_directory
+):
+    """
+    Test 003 - Nominal
+    Conditions: The parts of an abandoned upload, of an active upload and of a stale
+    upload without a trace in the database are staged
+    Result: Only the parts of the active upload are kept
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    for upload_id, age in [("abcdefgh", 2), ("ijklmnop", 0)]:
+        test_db_session.add(
+            Upload(
+                id=upload_id,
+                original_filename="test_file1.jpeg",
+                content_type="image/jpeg",
+                size=430061,
+                offset=0,
+                updated_datetime=datetime.now() - timedelta(days=age),
+            )
+        )
+    await test_db_session.commit()
+    for upload_id, age in [("abcdefgh", 0), ("ijklmnop", 0), ("qrstuvwx", 2 * 86400)]:
+        seed_staged_file(os.path.join(upload_id, "part00001"))
+        directory = os.path.join(PARTIAL_STORAGE, upload_id)
+        modified_time = time.time() - age
+        os.utime(directory, (modified_time, modified_time))
+
+    abandoned_uploads_removed = await remove_abandoned_uploads(test_db_session)
+    assert abandoned_uploads_removed == ["test_file1.jpeg"]
+    assert os.listdir(PARTIAL_STORAGE) == ["ijklmnop"]
@@ -10,13 +10,16 @@ All rights reserved. This file is part of the Atto-Host project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
+import os
+import shutil
 import pytest
 from sqlalchemy import select
 from app.models.models import File as FileModel
+from app.models.models import Blob
 from datetime import datetime, timedelta
 from app.packages.storage_driver.is_file_present import is_file_present
 from app.packages.cleanup.remove_expired_files import remove_expired_files
-from test.conftest import TEST_STORAGE
+from test.conftest import TEST_CONTENT, TEST_STORAGE
 
 
 @pytest.mark.asyncio
@@ -114,3 +117,45 @@ async def test_remove_expired_files_002_anomalous_expired_file_in_db_and_not_sto
     files = files.scalars().all()
     assert files == []
     assert not is_file_present("abcdefgh.jpeg")
+
+
+@pytest.mark.asyncio
+async def test_remove_expired_files_003_nominal_shared_blob_partially_expired(
+    monkeypatch,
+    test_db_session,
+    clear_storage_directory,
+):
+    """
+    Test 003 - Nominal
+    Conditions: Two file objects share a blob, and only one of them has expired
+    Result: Expired file metadata is removed, but the blob is kept for the other file
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    shutil.copy(
+        os.path.join(TEST_CONTENT, "test_file1.jpeg"),
+        os.path.join(TEST_STORAGE, "blobhash"),
+    )
+    blob = Blob(sha256="blobhash", filename="blobhash", size=430061, reference_count=2)
+    test_db_session.add(blob)
+    for file_id, upload_datetime in [
+        ("abcdefgh", datetime.now() - timedelta(hours=2)),
+        ("ijklmnop", datetime.now()),
+    ]:
+        test_db_session.add(
+            FileModel(
+                id=file_id,
+                mimetype="image/jpeg",
+                filename="blobhash",
+                original_filename="test_file1.jpeg",
+                size=430061,
+                upload_datetime=upload_datetime,
+                blob=blob,
+            )
+        )
+    await test_db_session.commit()
+    expired_file_removed = await remove_expired_files(test_db_session)
+
+    assert [file["id"] for file in expired_file_removed] == ["abcdefgh"]
+    await test_db_session.refresh(blob)
+    assert blob.reference_count == 1
+    assert is_file_present("blobhash")
@@ -0,0 +1,69 @@
+"""
+test_detect_mimetype.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for mimetype detection in packages/mime
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import threading
+import pytest
+from app.packages.mime.detect_mimetype import (
+    detect_mimetype,
+    detect_mimetype_async,
+    get_magic,
+    get_mime_executor,
+)
+from app.packages.metrics.metrics import get_metrics, reset_metrics
+from test.conftest import TEST_CONTENT
+
+with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+    JPEG_HEAD = file.read(2048)
+
+
+def test_detect_mimetype_000_nominal():
+    """
+    Test 000 - Nominal
+    Conditions: The leading bytes of a JPEG image
+    Result: "image/jpeg"
+    """
+    assert detect_mimetype(JPEG_HEAD) == "image/jpeg"
+
+
+def test_detect_mimetype_001_nominal_handle_reused_within_thread():
+    """
+    Test 001 - Nominal
+    Conditions: The libmagic handle is fetched twice on one thread, and once on another
+    Result: The thread reuses its handle, and the other thread has its own
+    """
+    handle = get_magic()
+    assert get_magic() is handle
+    other_handles = []
+    thread = threading.Thread(target=lambda: other_handles.append(get_magic()))
+    thread.start()
+    thread.join()
+    assert other_handles[0] is not handle
+
+
+@pytest.mark.asyncio
+async def test_detect_mimetype_async_000_nominal():
+    """
+    Test 000 - Nominal
+    Conditions: A JPEG image is detected from async code
+    Result: "image/jpeg", detected on a mime thread and recorded in the metrics
+    """
+    reset_metrics()
+    assert await detect_mimetype_async(JPEG_HEAD) == "image/jpeg"
+    thread_name = (
+        get_mime_executor().submit(lambda: threading.current_thread().name).result()
+    )
+    assert thread_name.startswith("mime")
+    metrics = get_metrics()
+    assert metrics["counters"]["mime.detected"] == {"image/jpeg": 1}
+    assert metrics["timings"]["mime.detect"]["count"] == 1
+    assert metrics["timings"]["mime.queue"]["count"] == 1
@@ -0,0 +1,72 @@
+"""
+test_parse_range.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for Range and If-Range parsing in packages/responses
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import pytest
+from fastapi import HTTPException
+from app.packages.responses.parse_range import (
+    MAX_RANGES,
+    parse_range,
+    if_range_matches,
+)
+
+
+def test_parse_range_000_nominal():
+    """
+    Test 000 - Nominal
+    Conditions: Closed, open, suffix and adjacent ranges of a 1000B file
+    Result: The ranges, sorted, clamped to the file and with adjacent ranges merged
+    """
+    assert parse_range("bytes=900-, 0-9, 10-19, -50, 500-2000", 1000) == [
+        (0, 19),
+        (500, 999),
+    ]
+
+
+def test_parse_range_001_nominal_whole_file_sent():
+    """
+    Test 001 - Nominal
+    Conditions: A missing, malformed, non-byte or overly fragmented Range header
+    Result: None, so that the whole file is sent
+    """
+    assert parse_range(None, 1000) is None
+    assert parse_range("bytes=abc", 1000) is None
+    assert parse_range("bytes=20-10", 1000) is None
+    assert parse_range("items=0-9", 1000) is None
+    ranges = ",".join(f"{n * 10}-{n * 10 + 1}" for n in range(MAX_RANGES + 1))
+    assert parse_range(f"bytes={ranges}", 1000) is None
+
+
+def test_parse_range_002_anomalous_not_satisfiable():
+    """
+    Test 002 - Anomalous
+    Conditions: Every requested range lies past the end of the file
+    Result: HTTPException 416 with a Content-Range of the file size
+    """
+    with pytest.raises(HTTPException) as e:
+        parse_range("bytes=1000-1100,2000-", 1000)
+    assert e.value.status_code == 416
+    assert e.value.headers == {"Content-Range": "bytes */1000"}
+
+
+def test_if_range_matches_000_nominal():
+    """
+    Test 000 - Nominal
+    Conditions: No If-Range, matching and stale strong ETags, a weak ETag and dates
+    Result: Only a missing If-Range, the matching strong ETag and the same date match
+    """
+    date = "Sun, 07 Apr 2024 16:21:38 GMT"
+    assert if_range_matches(None, '"abc"', date)
+    assert if_range_matches('"abc"', '"abc"', date)
+    assert not if_range_matches('"def"', '"abc"', date)
+    assert not if_range_matches('W/"abc"', '"abc"', date)
+    assert if_range_matches(date, '"abc"', date)
+    assert not if_range_matches("Mon, 08 Apr 2024 16:21:38 GMT", '"abc"', date)
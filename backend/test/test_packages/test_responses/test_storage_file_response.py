@@ -0,0 +1,96 @@
+"""
+test_storage_file_response.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for sending whole files in packages/responses
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import json
+import pytest
+from app.packages.responses.storage_file_response import (
+    StorageFileResponse,
+    ZEROCOPY_EXTENSION,
+)
+from test.conftest import CONFIGS, TEST_STORAGE
+
+
+async def send_response(response, extensions=None):
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == ZEROCOPY_EXTENSION:
+            # Stand in for the server, which sends the file before this returns
+            message = {
+                **message,
+                "body": os.pread(
+                    message["file"].fileno(), message["count"], message["offset"]
+                ),
+            }
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "extensions": extensions or {}}
+    await response(scope, receive, send)
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_storage_file_response_000_nominal_chunked(
+    monkeypatch, tmp_path, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: The server has no zero-copy send, and the chunk size is set to 100000B
+    Result: The file is streamed in chunks of 100000B
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    with open(os.path.join(CONFIGS, "config_low_filesize_limit.json"), "r") as file:
+        config = json.load(file)
+    config_path = os.path.join(tmp_path, "config.json")
+    with open(config_path, "w") as file:
+        json.dump({**config, "download_chunk_size": 100000}, file)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+    path = os.path.join(TEST_STORAGE, "test_file1.jpeg")
+
+    response = StorageFileResponse(
+        "test_file1.jpeg", TEST_STORAGE, stat_result=os.stat(path)
+    )
+    messages = await send_response(response)
+    bodies = [message["body"] for message in messages[1:]]
+    assert [len(body) for body in bodies] == [100000] * 4 + [30061, 0]
+    with open(path, "rb") as file:
+        assert b"".join(bodies) == file.read()
+
+
+@pytest.mark.asyncio
+async def test_storage_file_response_001_nominal_zerocopy(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: The server offers the zero-copy send extension
+    Result: The whole file is handed to the server in a single zero-copy send
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    path = os.path.join(TEST_STORAGE, "test_file1.jpeg")
+
+    response = StorageFileResponse(
+        "test_file1.jpeg", TEST_STORAGE, stat_result=os.stat(path)
+    )
+    messages = await send_response(response, {ZEROCOPY_EXTENSION: {}})
+    assert [message["type"] for message in messages] == [
+        "http.response.start",
+        ZEROCOPY_EXTENSION,
+    ]
+    assert messages[1]["offset"] == 0
+    assert messages[1]["count"] == 430061
+    with open(path, "rb") as file:
+        assert messages[1]["body"] == file.read()
@@ -0,0 +1,211 @@
+"""
+test_erasure_coded_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the erasure coding of files across storage roots in packages/storage_driver
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import json
+import itertools
+import pytest
+
+from app.packages.metrics.metrics import get_metrics, reset_metrics
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.erasure_coded_storage_backend import (
+    ErasureCodedStorageBackend,
+    SHARD_HEADER,
+)
+from app.packages.storage_driver.reed_solomon import encode_parity, reconstruct_data
+from app.packages.storage_driver.storage_writer import StorageWriter
+from test.conftest import TEST_STORAGE, CONFIGS
+
+with open(os.path.join(CONFIGS, "config_low_filesize_limit.json"), "r") as file:
+    BASE_CONFIG = json.load(file)
+
+CONTENT = bytes(range(256)) * 2 + b"tail"
+
+
+# Configure the erasure coded backend across six roots under tmp_path, with stripes
+# of 16 bytes of each shard so that small files span several, returning the backend
+def configure_erasure_coding(monkeypatch, tmp_path):
+    storage_roots = []
+    for number in range(6):
+        path = os.path.join(tmp_path, f"root{number}")
+        os.makedirs(path)
+        storage_roots.append({"path": path, "weight": 1})
+    config_path = os.path.join(tmp_path, "config.json")
+    with open(config_path, "w") as file:
+        json.dump(
+            {
+                **BASE_CONFIG,
+                "storage_backend": "erasure_coded",
+                "storage_roots": storage_roots,
+                "erasure_coding": {"data_shards": 4, "parity_shards": 2},
+            },
+            file,
+        )
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+    storage = get_storage_backend()
+    storage.chunk_size = 16
+    return storage
+
+
+async def store(filename: str, content: bytes):
+    writer = await StorageWriter(filename).open()
+    await writer.write(content)
+    await writer.commit()
+
+
+# Paths of the shards of a file on each root holding one, by shard index
+def shard_paths(storage: ErasureCodedStorageBackend, filename: str):
+    paths = {}
+    for root in storage.roots:
+        path = os.path.join(root, filename)
+        if os.path.isfile(path):
+            with open(path, "rb") as file:
+                paths[SHARD_HEADER.unpack(file.read(SHARD_HEADER.size))[2]] = path
+    return paths
+
+
+def test_reed_solomon_000_nominal_any_shards_recover_data():
+    """
+    Test 000 - Nominal
+    Conditions: Four data shards are coded with two parity shards, and any two are lost
+    Result: The data shards are recovered from each set of four remaining shards
+    """
+    data = [
+        bytes((index * 37 + byte) % 256 for byte in range(64)) for index in range(4)
+    ]
+    shards = data + encode_parity(data, 2)
+    for lost in itertools.combinations(range(6), 2):
+        remaining = {
+            index: shard for index, shard in enumerate(shards) if index not in lost
+        }
+        assert reconstruct_data(remaining, 4) == data
+
+
+def test_reed_solomon_001_anomalous_too_few_shards():
+    """
+    Test 001 - Anomalous
+    Conditions: Three of the shards of four data shards are given
+    Result: ValueError("3 shards were given, but 4 are needed")
+    """
+    data = [bytes([index]) * 8 for index in range(4)]
+    shards = data + encode_parity(data, 2)
+    with pytest.raises(ValueError) as e:
+        reconstruct_data({0: shards[0], 4: shards[4], 5: shards[5]}, 4)
+    assert str(e.value) == "3 shards were given, but 4 are needed"
+
+
+@pytest.mark.asyncio
+async def test_erasure_coded_storage_backend_000_nominal_store_and_read(
+    monkeypatch, tmp_path, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: A file of several stripes is stored, read, read in part and deleted
+    Result: Each root holds one shard, of a quarter of the file, and the file reads whole
+    """
+    storage = configure_erasure_coding(monkeypatch, tmp_path)
+    assert isinstance(storage, ErasureCodedStorageBackend)
+    await store("abcdefgh.mp4", CONTENT)
+
+    paths = shard_paths(storage, "abcdefgh.mp4")
+    assert sorted(paths) == list(range(6))
+    for path in paths.values():
+        assert os.path.getsize(path) == SHARD_HEADER.size + 129
+    assert await storage.list() == ["abcdefgh.mp4"]
+    assert await storage.is_present("abcdefgh.mp4")
+    assert (await storage.stat("abcdefgh.mp4")).st_size == len(CONTENT)
+    assert await storage.read("abcdefgh.mp4") == CONTENT
+    chunks = [chunk async for chunk in storage.read_range("abcdefgh.mp4", 60, 199)]
+    assert len(chunks) > 1
+    assert b"".join(chunks) == CONTENT[60:200]
+
+    await storage.delete("abcdefgh.mp4")
+    assert shard_paths(storage, "abcdefgh.mp4") == {}
+    assert not await storage.is_present("abcdefgh.mp4")
+
+
+@pytest.mark.asyncio
+async def test_erasure_coded_storage_backend_001_nominal_degraded_read(
+    monkeypatch, tmp_path, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: One data shard of a file is removed and another is cut short
+    Result: The file is still present and reads whole, recovered from its parity shards
+    """
+    storage = configure_erasure_coding(monkeypatch, tmp_path)
+    await store("abcdefgh.mp4", CONTENT)
+    paths = shard_paths(storage, "abcdefgh.mp4")
+    os.remove(paths[1])
+    with open(paths[2], "r+b") as file:
+        file.truncate(SHARD_HEADER.size + 40)
+    reset_metrics()
+
+    assert await storage.is_present("abcdefgh.mp4")
+    assert await storage.read("abcdefgh.mp4") == CONTENT
+    chunks = [chunk async for chunk in storage.read_range("abcdefgh.mp4", 17, 300)]
+    assert b"".join(chunks) == CONTENT[17:301]
+    assert get_metrics()["counters"]["storage.degraded_reads"] > 0
+
+
+@pytest.mark.asyncio
+async def test_erasure_coded_storage_backend_002_anomalous_too_many_shards_lost(
+    monkeypatch, tmp_path, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: Three of the six shards of a file are removed
+    Result: The file is not present, has no stat result and FileNotFoundError is raised
+    """
+    storage = configure_erasure_coding(monkeypatch, tmp_path)
+    await store("abcdefgh.mp4", CONTENT)
+    for index, path in shard_paths(storage, "abcdefgh.mp4").items():
+        if index in [0, 3, 5]:
+            os.remove(path)
+
+    assert not await storage.is_present("abcdefgh.mp4")
+    assert await storage.list() == []
+    assert await storage.stat("abcdefgh.mp4") is None
+    with pytest.raises(FileNotFoundError):
+        await storage.read("abcdefgh.mp4")
+
+
+@pytest.mark.asyncio
+async def test_erasure_coded_storage_backend_003_nominal_shards_opened_once(
+    monkeypatch, tmp_path, clear_storage_directory
+):
+    """
+    Test 003 - Nominal
+    Conditions: A file of several stripes is read whole, and in part, stopping early
+    Result: Each shard is opened once for each read, and all are closed after it
+    """
+    storage = configure_erasure_coding(monkeypatch, tmp_path)
+    await store("abcdefgh.mp4", CONTENT)
+    opened = []
+    os_open = os.open
+    monkeypatch.setattr(
+        os,
+        "open",
+        lambda path, *args, **kwargs: opened.append(path)
+        or os_open(path, *args, **kwargs),
+    )
+    open_fds = len(os.listdir("/proc/self/fd"))
+
+    assert await storage.read("abcdefgh.mp4") == CONTENT
+    assert sorted(opened) == sorted(shard_paths(storage, "abcdefgh.mp4").values())
+    opened.clear()
+    chunks = storage.read_range("abcdefgh.mp4", 0, len(CONTENT) - 1)
+    assert await chunks.__anext__() == CONTENT[:64]
+    await chunks.aclose()
+    assert len(opened) == 6
+    assert len(os.listdir("/proc/self/fd")) == open_fds
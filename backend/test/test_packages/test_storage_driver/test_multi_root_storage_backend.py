@@ -0,0 +1,275 @@
+"""
+test_multi_root_storage_backend.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the placement of files across several storage roots in packages/storage_driver
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import json
+import errno
+import pytest
+
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.get_storage_roots import rank_storage_roots
+from app.packages.storage_driver.multi_root_storage_backend import (
+    MultiRootStorageBackend,
+)
+from app.packages.storage_driver import rebalance_storage_roots as rebalance_module
+from app.packages.storage_driver import move_file as move_file_module
+from app.packages.storage_driver.rebalance_storage_roots import (
+    rebalance_storage_roots,
+)
+from app.packages.storage_driver.move_file import move_file
+from app.packages.storage_driver.storage_writer import StorageWriter, get_partial_path
+from test.conftest import TEST_STORAGE, CONFIGS
+
+with open(os.path.join(CONFIGS, "config_low_filesize_limit.json"), "r") as file:
+    BASE_CONFIG = json.load(file)
+
+
+# Configure storage roots under tmp_path, named by their weights, returning their paths
+def configure_roots(monkeypatch, tmp_path, weights: dict):
+    storage_roots = []
+    for name, weight in weights.items():
+        path = os.path.join(tmp_path, name)
+        os.makedirs(path, exist_ok=True)
+        storage_roots.append({"path": path, "weight": weight})
+    config_path = os.path.join(tmp_path, f"config_{len(os.listdir(tmp_path))}.json")
+    with open(config_path, "w") as file:
+        json.dump({**BASE_CONFIG, "storage_roots": storage_roots}, file)
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv("CONFIG_PATH", config_path)
+    return {name: root["path"] for name, root in zip(weights, storage_roots)}
+
+
+def write_file(path: str, content: bytes = b"content"):
+    with open(path, "wb") as file:
+        file.write(content)
+
+
+def test_rank_storage_roots_000_nominal_weighted_and_minimal_moves():
+    """
+    Test 000 - Nominal
+    Conditions: Files are placed on roots weighted 1 and 3, then a third root is added
+    Result: Files are placed in proportion to weight, and only files won by the new root move
+    """
+    storage_roots = [("/a", 1), ("/b", 3)]
+    filenames = [f"{number:08x}.jpeg" for number in range(4000)]
+    placed = {name: rank_storage_roots(name, storage_roots)[0][0] for name in filenames}
+    share = sum(root == "/b" for root in placed.values()) / len(filenames)
+    assert 0.72 < share < 0.78
+
+    storage_roots.append(("/c", 4))
+    moved = [
+        name
+        for name in filenames
+        if rank_storage_roots(name, storage_roots)[0][0] != placed[name]
+    ]
+    assert all(rank_storage_roots(name, storage_roots)[0][0] == "/c" for name in moved)
+    assert 0.45 < len(moved) / len(filenames) < 0.55
+
+
+@pytest.mark.asyncio
+async def test_multi_root_storage_backend_000_nominal_placed_by_rank(
+    monkeypatch, tmp_path, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: "storage_roots" holds two roots and several files are written
+    Result: Each file is stored on its first ranked root, and is listed, read and deleted
+    """
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 1, "b": 1})
+    storage = get_storage_backend()
+    assert isinstance(storage, MultiRootStorageBackend)
+    filenames = [f"{number:08x}.jpeg" for number in range(20)]
+    for filename in filenames:
+        writer = await StorageWriter(filename).open()
+        await writer.write(filename.encode())
+        await writer.commit()
+
+    for filename in filenames:
+        placed = rank_storage_roots(filename, storage.storage_roots)[0][0]
+        assert os.path.isfile(os.path.join(placed, filename))
+    assert os.listdir(roots["a"]) and os.listdir(roots["b"])
+    assert sorted(await storage.list()) == filenames
+    assert await storage.read(filenames[0]) == filenames[0].encode()
+    presence = await storage.are_present([filenames[0], "missing.jpeg"])
+    assert presence == {filenames[0]: True, "missing.jpeg": False}
+    await storage.delete(filenames[0])
+    assert not await storage.is_present(filenames[0])
+
+
+@pytest.mark.asyncio
+async def test_multi_root_storage_backend_001_nominal_found_off_its_root(
+    monkeypatch, tmp_path
+):
+    """
+    Test 001 - Nominal
+    Conditions: A file is held on a root other than the one it is placed on
+    Result: The file is found, located on that root and read
+    """
+    configure_roots(monkeypatch, tmp_path, {"a": 1, "b": 1})
+    storage = get_storage_backend()
+    ranked = rank_storage_roots("abcdefgh.jpeg", storage.storage_roots)
+    write_file(os.path.join(ranked[1][0], "abcdefgh.jpeg"), b"0123456789")
+
+    assert await storage.is_present("abcdefgh.jpeg")
+    root, relative_path, stat_result = await storage.locate("abcdefgh.jpeg")
+    assert (root, relative_path, stat_result.st_size) == (
+        ranked[1][0],
+        "abcdefgh.jpeg",
+        10,
+    )
+    chunks = [chunk async for chunk in storage.read_range("abcdefgh.jpeg", 2, 5)]
+    assert b"".join(chunks) == b"2345"
+    assert (await storage.are_present(["abcdefgh.jpeg"]))["abcdefgh.jpeg"]
+
+
+@pytest.mark.asyncio
+async def test_multi_root_storage_backend_002_nominal_staged_on_its_root(
+    monkeypatch, tmp_path
+):
+    """
+    Test 002 - Nominal
+    Conditions: "storage_roots" holds three roots and several files are written
+    Result: Each file is staged on its first ranked root and stored there by a rename,
+    and the files staged for one upload share a root
+    """
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 1, "b": 1, "c": 1})
+    storage = get_storage_backend()
+    for filename in [f"{number:08x}.jpeg" for number in range(12)]:
+        placed = rank_storage_roots(filename, storage.storage_roots)[0][0]
+        writer = await StorageWriter(filename).open()
+        await writer.write(filename.encode())
+        staged_path = get_partial_path(filename)
+        assert staged_path == os.path.join(placed, ".partial", filename)
+        inode = os.stat(staged_path).st_ino
+        await writer.commit()
+        assert os.stat(os.path.join(placed, filename)).st_ino == inode
+
+    upload_directories = {
+        os.path.dirname(get_partial_path(os.path.join("abcdefgh", name)))
+        for name in ["upload", "part00001", "part00002"]
+    }
+    assert len(upload_directories) == 1
+    assert sorted(storage.list_partial_directories()) == sorted(
+        [os.path.join(path, ".partial") for path in roots.values()]
+        + [os.path.join(TEST_STORAGE, ".partial")]
+    )
+
+
+@pytest.mark.asyncio
+async def test_rebalance_storage_roots_000_nominal_root_added_then_drained(
+    monkeypatch, tmp_path
+):
+    """
+    Test 000 - Nominal
+    Conditions: A root is added to a root holding files, then the first root is weighted 0
+    Result: Only the files placed on the new root are moved to it, then every file is
+    """
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 1})
+    filenames = [f"{number:08x}.jpeg" for number in range(50)]
+    for filename in filenames:
+        write_file(os.path.join(roots["a"], filename))
+
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 1, "b": 1})
+    storage_roots = [(roots["a"], 1), (roots["b"], 1)]
+    placed_on_b = [
+        name
+        for name in filenames
+        if rank_storage_roots(name, storage_roots)[0][0] == roots["b"]
+    ]
+    assert rebalance_storage_roots() == len(placed_on_b)
+    assert sorted(os.listdir(roots["b"])) == placed_on_b
+    assert sorted(await get_storage_backend().list()) == filenames
+
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 0, "b": 1})
+    assert rebalance_storage_roots() == len(filenames) - len(placed_on_b)
+    assert os.listdir(roots["a"]) == []
+    assert sorted(os.listdir(roots["b"])) == filenames
+
+
+def test_rebalance_storage_roots_001_nominal_file_deleted_while_moving(
+    monkeypatch, tmp_path
+):
+    """
+    Test 001 - Nominal
+    Conditions: Every file moves to a new root, and one is deleted as it is about to move
+    Result: The deleted file is skipped and every other file is moved
+    """
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 1})
+    filenames = [f"{number:08x}.jpeg" for number in range(10)]
+    for filename in filenames:
+        write_file(os.path.join(roots["a"], filename))
+    roots = configure_roots(monkeypatch, tmp_path, {"a": 0, "b": 1})
+    deleted = os.path.join(roots["a"], filenames[3])
+
+    def move_deleted_file(source_path, target_path):
+        if source_path == deleted:
+            os.remove(source_path)
+        move_file(source_path, target_path)
+
+    monkeypatch.setattr(rebalance_module, "move_file", move_deleted_file)
+    assert rebalance_storage_roots() == len(filenames) - 1
+    assert os.listdir(roots["a"]) == []
+    assert sorted(os.listdir(roots["b"])) == filenames[:3] + filenames[4:]
+
+
+def test_move_file_000_nominal_across_filesystems(monkeypatch, tmp_path):
+    """
+    Test 000 - Nominal
+    Conditions: A file is moved where rename() fails with EXDEV
+    Result: The file is copied into place under its name and the source removed
+    """
+    source_path = os.path.join(tmp_path, "source")
+    target_path = os.path.join(tmp_path, "shard", "target")
+    write_file(source_path, b"moved content")
+    replace = os.replace
+
+    def cross_device_replace(source, target):
+        if source == source_path:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(source, target)
+
+    monkeypatch.setattr(os, "replace", cross_device_replace)
+    os.makedirs(os.path.dirname(target_path))
+    move_file(source_path, target_path)
+    with open(target_path, "rb") as file:
+        assert file.read() == b"moved content"
+    assert not os.path.exists(source_path)
+    assert os.listdir(os.path.dirname(target_path)) == ["target"]
+
+
+def test_move_file_001_anomalous_source_deleted_while_copied(monkeypatch, tmp_path):
+    """
+    Test 001 - Anomalous
+    Conditions: A file moved across filesystems is deleted while it is copied
+    Result: FileNotFoundError, and neither the copy nor the file is left at the target
+    """
+    source_path = os.path.join(tmp_path, "source")
+    target_path = os.path.join(tmp_path, "shard", "target")
+    write_file(source_path, b"moved content")
+    replace = os.replace
+    copy_file_contents = move_file_module.copy_file_contents
+
+    def cross_device_replace(source, target):
+        if source == source_path:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(source, target)
+
+    def copy_deleted_file(source_fd, target_fd, length):
+        copy_file_contents(source_fd, target_fd, length)
+        os.remove(source_path)
+
+    monkeypatch.setattr(os, "replace", cross_device_replace)
+    monkeypatch.setattr(move_file_module, "copy_file_contents", copy_deleted_file)
+    os.makedirs(os.path.dirname(target_path))
+    with pytest.raises(FileNotFoundError):
+        move_file(source_path, target_path)
+    assert os.listdir(os.path.dirname(target_path)) == []
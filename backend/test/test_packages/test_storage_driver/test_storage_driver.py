@@ -11,11 +11,32 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import os
+import json
+import errno
 import shutil
+import threading
 import pytest
 from app.packages.storage_driver.is_file_present import is_file_present
 from app.packages.storage_driver.get_storage_directory import get_storage_directory
-from test.conftest import TEST_CONTENT, TEST_STORAGE
+from app.packages.storage_driver.get_storage_backend import get_storage_backend
+from app.packages.storage_driver.get_file_path import (
+    get_shard_directory,
+    get_relative_path,
+)
+from app.packages.storage_driver.migrate_storage_layout import migrate_storage_layout
+from app.packages.storage_driver.local_storage_backend import LocalStorageBackend
+from app.packages.storage_driver.memory_storage_backend import MemoryStorageBackend
+from app.packages.storage_driver.concatenate_staged_files import (
+    concatenate_staged_files,
+)
+from app.packages.storage_driver.storage_writer import get_partial_path, StorageWriter
+from app.packages.storage_driver.presence_index import list_present_filenames
+from app.packages.storage_driver.storage_executor import (
+    get_storage_executor,
+    run_in_storage_executor,
+    shutdown_storage_executor,
+)
+from test.conftest import TEST_CONTENT, TEST_STORAGE, CONFIGS
 
 
 def test_get_storage_directory_000_nominal_valid_storage_directory(monkeypatch):
@@ -93,3 +114,332 @@ def test_is_file_present_001_file_not_present(monkeypatch):
     """
     monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
     assert not is_file_present("test_file1.jpeg")
+
+
+@pytest.mark.asyncio
+async def test_local_storage_backend_000_nominal_file_present(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: File is present
+    Result: The file is present, with its size and contents
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    storage = get_storage_backend()
+    assert isinstance(storage, LocalStorageBackend)
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        content = file.read()
+    assert await storage.is_present("test_file1.jpeg")
+    assert (await storage.stat("test_file1.jpeg")).st_size == len(content)
+    assert await storage.read("test_file1.jpeg") == content
+    presence = await storage.are_present(["test_file1.jpeg", "missing.txt"])
+    assert presence == {"test_file1.jpeg": True, "missing.txt": False}
+
+
+@pytest.mark.asyncio
+async def test_local_storage_backend_001_nominal_delete_file(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: File is present and deleted
+    Result: File removed from storage
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    await get_storage_backend().delete("test_file1.jpeg")
+    assert not is_file_present("test_file1.jpeg")
+
+
+@pytest.mark.asyncio
+async def test_local_storage_backend_002_anomalous_delete_file_not_present(
+    monkeypatch,
+):
+    """
+    Test 002 - Anomalous
+    Conditions: File is not present and deleted
+    Result: FileNotFoundError
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    with pytest.raises(FileNotFoundError):
+        await get_storage_backend().delete("test_file1.jpeg")
+
+
+@pytest.mark.asyncio
+async def test_local_storage_backend_003_nominal_list(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 003 - Nominal
+    Conditions: Test content seeded to storage
+    Result: Seeded files listed, excluding .gitignore and the partial directory
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    filenames = await get_storage_backend().list()
+    assert "test_file1.jpeg" in filenames
+    assert ".gitignore" not in filenames
+
+
+@pytest.mark.asyncio
+async def test_local_storage_backend_004_nominal_sharded_layout(
+    monkeypatch, clear_storage_directory
+):
+    """
+    Test 004 - Nominal
+    Conditions: "storage_layout" is "sharded" and a file is written, listed and deleted
+    Result: The file is held in its shard directory, and listed and deleted from there
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_sharded_storage.json")
+    )
+    storage = get_storage_backend()
+    writer = await StorageWriter("written.txt").open()
+    await writer.write(b"written")
+    await writer.commit()
+
+    path = os.path.join(TEST_STORAGE, get_shard_directory("written.txt"), "written.txt")
+    assert os.path.isfile(path)
+    assert not os.path.exists(os.path.join(TEST_STORAGE, "written.txt"))
+    assert await storage.list() == ["written.txt"]
+    assert await storage.read("written.txt") == b"written"
+    await storage.delete("written.txt")
+    assert not os.path.exists(path)
+
+
+@pytest.mark.asyncio
+async def test_memory_storage_backend_000_nominal_store_and_read(
+    monkeypatch, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: "storage_backend" is "memory" and a file is written
+    Result: The file is held in memory and its staged copy is removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_memory_storage.json")
+    )
+    storage = get_storage_backend()
+    assert isinstance(storage, MemoryStorageBackend)
+    writer = await StorageWriter("written.txt").open()
+    await writer.write(b"written")
+    await writer.commit()
+
+    assert not os.path.exists(get_partial_path("written.txt"))
+    assert not is_file_present("written.txt")
+    assert await storage.list() == ["written.txt"]
+    assert await storage.read("written.txt") == b"written"
+    assert (await storage.stat("written.txt")).st_size == 7
+    chunks = [chunk async for chunk in storage.read_range("written.txt", 2, 4)]
+    assert b"".join(chunks) == b"itt"
+
+
+@pytest.mark.asyncio
+async def test_memory_storage_backend_001_nominal_delete_file():
+    """
+    Test 001 - Nominal
+    Conditions: A file held in memory is deleted
+    Result: The file is no longer present
+    """
+    storage = MemoryStorageBackend()
+    storage._files["held.txt"] = (b"held", 0)
+    await storage.delete("held.txt")
+    assert not await storage.is_present("held.txt")
+    assert await storage.stat("held.txt") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_storage_backend_002_anomalous_file_not_present():
+    """
+    Test 002 - Anomalous
+    Conditions: A file which is not held is read and deleted
+    Result: FileNotFoundError
+    """
+    storage = MemoryStorageBackend()
+    with pytest.raises(FileNotFoundError):
+        await storage.read("missing.txt")
+    with pytest.raises(FileNotFoundError):
+        await storage.delete("missing.txt")
+
+
+def test_memory_storage_backend_003_nominal_kept_on_config_change(
+    monkeypatch, tmp_path
+):
+    """
+    Test 003 - Nominal
+    Conditions: "storage_threads" is changed while "storage_backend" is "memory"
+    Result: The same backend is used, so the files it holds are kept
+    """
+    with open(os.path.join(CONFIGS, "config_memory_storage.json"), "r") as file:
+        config = json.load(file)
+    backends = []
+    for threads in [2, 4]:
+        config_path = os.path.join(tmp_path, f"config{threads}.json")
+        with open(config_path, "w") as file:
+            json.dump({**config, "storage_threads": threads}, file)
+        monkeypatch.setenv("CONFIG_PATH", config_path)
+        backends.append(get_storage_backend())
+        backends[-1]._files.setdefault("held.txt", (b"held", 0))
+
+    assert backends[1] is backends[0]
+    assert backends[1]._files["held.txt"] == (b"held", 0)
+
+
+@pytest.mark.asyncio
+async def test_storage_executor_000_nominal_runs_on_storage_thread():
+    """
+    Test 000 - Nominal
+    Conditions: A function is run in the storage executor
+    Result: The function runs on a dedicated storage thread
+    """
+    thread_name = await run_in_storage_executor(lambda: threading.current_thread().name)
+    assert thread_name.startswith("storage")
+    assert thread_name != threading.current_thread().name
+
+
+def test_storage_executor_001_nominal_configured_thread_count(monkeypatch):
+    """
+    Test 001 - Nominal
+    Conditions: "storage_threads" is set to 2 in the config
+    Result: The storage executor is limited to 2 threads
+    """
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_storage_threads.json")
+    )
+    shutdown_storage_executor()
+    try:
+        assert get_storage_executor()._max_workers == 2
+    finally:
+        shutdown_storage_executor()
+
+
+def test_concatenate_staged_files_000_nominal(monkeypatch, clear_storage_directory):
+    """
+    Test 000 - Nominal
+    Conditions: Three staged files are concatenated
+    Result: The target holds their contents in order, and the sources are removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        content = file.read()
+    pieces = [content[:100000], content[100000:300000], content[300000:]]
+    for number, piece in enumerate(pieces):
+        with open(get_partial_path(f"piece{number}"), "wb") as file:
+            file.write(piece)
+
+    concatenate_staged_files(["piece0", "piece1", "piece2"], "joined")
+    with open(get_partial_path("joined"), "rb") as file:
+        assert file.read() == content
+    for number in range(3):
+        assert not os.path.exists(get_partial_path(f"piece{number}"))
+
+
+def test_concatenate_staged_files_001_nominal_copy_file_range_unsupported(
+    monkeypatch, clear_storage_directory
+):
+    """
+    Test 001 - Nominal
+    Conditions: copy_file_range() and sendfile() fail with EXDEV
+    Result: The contents are copied in userspace instead
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(os, "sendfile", unsupported, raising=False)
+    for number in range(2):
+        with open(get_partial_path(f"piece{number}"), "wb") as file:
+            file.write(bytes([number]) * 300000)
+
+    concatenate_staged_files(["piece0", "piece1"], "joined")
+    with open(get_partial_path("joined"), "rb") as file:
+        assert file.read() == bytes(300000) + bytes([1]) * 300000
+
+
+@pytest.mark.asyncio
+async def test_presence_index_000_nominal_changed_while_listed(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: A file is written and another deleted while storage is being listed
+    Result: The listing holds the written file and not the deleted one, in sorted order
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    storage = get_storage_backend()
+    list_storage = storage.list
+
+    async def list_during_changes():
+        filenames = await list_storage()
+        writer = await StorageWriter("written.txt").open()
+        await writer.write(b"written")
+        await writer.commit()
+        await storage.delete("Dockerfile")
+        return filenames
+
+    monkeypatch.setattr(storage, "list", list_during_changes)
+    present_filenames = await list_present_filenames(storage)
+    # Every test file but __init__.py is seeded
+    expected = set(os.listdir(TEST_CONTENT)) - {"__init__.py", "Dockerfile"}
+    assert present_filenames == sorted(expected | {"written.txt"})
+
+
+def test_get_file_path_000_nominal_layouts(monkeypatch):
+    """
+    Test 000 - Nominal
+    Conditions: A filename is placed under the flat and the sharded layouts
+    Result: It is held directly in the storage directory, or two shard levels deep
+    """
+    assert get_relative_path("abcdefgh.jpeg") == "abcdefgh.jpeg"
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_sharded_storage.json")
+    )
+    relative_path = get_relative_path("abcdefgh.jpeg")
+    first, second, filename = relative_path.split(os.sep)
+    assert filename == "abcdefgh.jpeg"
+    assert len(first) == len(second) == 2
+    assert relative_path == get_relative_path("abcdefgh.jpeg")
+    # Filenames spread across many shards
+    assert len({get_shard_directory(f"{n}.jpeg") for n in range(1000)}) > 900
+
+
+@pytest.mark.asyncio
+async def test_migrate_storage_layout_000_nominal(
+    monkeypatch, seed_storage_directory, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: A flat storage directory is migrated once "storage_layout" is "sharded"
+    Result: Files are found before and after being moved into their shards
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_sharded_storage.json")
+    )
+    storage = get_storage_backend()
+    filenames = sorted(await storage.list())
+    assert await storage.locate("Dockerfile") is not None
+    assert (await storage.locate("Dockerfile"))[1] == "Dockerfile"
+
+    assert migrate_storage_layout() == len(filenames)
+    assert sorted(await storage.list()) == filenames
+    assert (await storage.locate("Dockerfile"))[1] == get_relative_path("Dockerfile")
+    assert await storage.is_present("Dockerfile")
+    assert not any(
+        os.path.isfile(os.path.join(TEST_STORAGE, filename)) for filename in filenames
+    )
+
+
+def test_migrate_storage_layout_001_anomalous_flat_layout(monkeypatch):
+    """
+    Test 001 - Anomalous
+    Conditions: The storage directory is migrated while "storage_layout" is "flat"
+    Result: ValueError("'storage_layout' must be 'sharded' to migrate storage.")
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    with pytest.raises(ValueError) as e:
+        migrate_storage_layout()
+    assert str(e.value) == "'storage_layout' must be 'sharded' to migrate storage."
@@ -0,0 +1,155 @@
+"""
+tests/test_append_upload_chunk.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for PATCH uploads/<upload_id> and HEAD uploads/<upload_id>
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+
+from app.packages.upload.get_staged_upload import get_staged_upload
+from test.conftest import TEST_CONTENT, TEST_STORAGE
+
+
+def create_upload(client, headers, size=430061):
+    response = client.post(
+        "uploads/", headers=headers, json={"filename": "test_file1.jpeg", "size": size}
+    )
+    return response.json()["id"]
+
+
+def append_chunk(client, headers, upload_id, offset, chunk):
+    return client.patch(
+        f"uploads/{upload_id}",
+        headers={
+            **headers,
+            "Upload-Offset": str(offset),
+            "Content-Type": "application/offset+octet-stream",
+        },
+        content=chunk,
+    )
+
+
+@pytest.mark.asyncio
+async def test_append_upload_chunk_000_nominal(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: Two chunks appended at the correct offsets
+    Result: HTTP 204 - Upload-Offset advances, and HEAD reports it
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        content = file.read()
+    upload_id = create_upload(client, headers)
+
+    response = append_chunk(client, headers, upload_id, 0, content[:100000])
+    assert response.status_code == 204
+    assert response.headers["Upload-Offset"] == "100000"
+    response = append_chunk(client, headers, upload_id, 100000, content[100000:])
+    assert response.status_code == 204
+    assert response.headers["Upload-Offset"] == "430061"
+
+    response = client.head(f"uploads/{upload_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Upload-Offset"] == "430061"
+    assert response.headers["Upload-Length"] == "430061"
+    with open(
+        os.path.join(TEST_STORAGE, ".partial", upload_id, "upload"), "rb"
+    ) as file:
+        assert file.read() == content
+
+
+@pytest.mark.asyncio
+async def test_append_upload_chunk_001_anomalous_offset_mismatch(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 001 - Anomalous
+    Conditions: Chunk sent with an offset other than the current offset
+    Result: HTTP 409 - "Upload-Offset 10 does not match the current offset of 0"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers)
+    response = append_chunk(client, headers, upload_id, 10, b"0123456789")
+    assert response.status_code == 409
+    assert (
+        response.json()["detail"]
+        == "Upload-Offset 10 does not match the current offset of 0"
+    )
+
+
+@pytest.mark.asyncio
+async def test_append_upload_chunk_002_anomalous_chunk_exceeds_length(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: Chunk would take the upload past its declared length
+    Result: HTTP 422 - "Chunk exceeds the upload length of 10B"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers, size=10)
+    response = append_chunk(client, headers, upload_id, 0, b"0123456789A")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Chunk exceeds the upload length of 10B"
+
+
+@pytest.mark.asyncio
+async def test_append_upload_chunk_003_anomalous_not_owner(
+    monkeypatch, client, seed_jwt, seed_jwt2, clear_storage_directory
+):
+    """
+    Test 003 - Anomalous
+    Conditions: The requester is neither the upload owner nor an admin
+    Result: HTTP 403 - "The current user is not authorized to perform this action"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    upload_id = create_upload(client, {"Authorization": f"Bearer {seed_jwt}"})
+    headers = {"Authorization": f"Bearer {seed_jwt2}"}
+    response = append_chunk(client, headers, upload_id, 0, b"0123456789")
+    assert response.status_code == 403
+    assert (
+        response.json()["detail"]
+        == "The current user is not authorized to perform this action"
+    )
+
+
+@pytest.mark.asyncio
+async def test_append_upload_chunk_004_anomalous_concurrent_request(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 004 - Anomalous
+    Conditions: A chunk is sent while another request is writing to the upload
+    Result: HTTP 409 - "Upload is already being written by another request", and the
+    staged file is left as the other request wrote it
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers, size=10)
+    writer = await get_staged_upload(upload_id).lock()
+    await writer.seek(0)
+    await writer.write(b"01234")
+
+    response = append_chunk(client, headers, upload_id, 0, b"ABCDE")
+    assert response.status_code == 409
+    assert (
+        response.json()["detail"]
+        == "Upload is already being written by another request"
+    )
+    await writer.close()
+    with open(
+        os.path.join(TEST_STORAGE, ".partial", upload_id, "upload"), "rb"
+    ) as file:
+        assert file.read() == b"01234"
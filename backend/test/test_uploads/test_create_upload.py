@@ -0,0 +1,98 @@
+"""
+tests/test_create_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for POST uploads/
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+from sqlalchemy import select
+
+from app.models.models import Upload
+from test.conftest import TEST_STORAGE, CONFIGS
+
+
+@pytest.mark.asyncio
+async def test_create_upload_000_nominal(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: Allowed filename and size provided
+    Result: HTTP 201 - Upload object returned with an offset of 0
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.post(
+        "uploads/",
+        headers=headers,
+        json={"filename": "test_file1.jpeg", "size": 430061},
+    )
+    assert response.status_code == 201
+    upload = response.json()
+    assert upload["original_filename"] == "test_file1.jpeg"
+    assert upload["size"] == 430061
+    assert upload["offset"] == 0
+    assert response.headers["Location"] == f"/uploads/{upload['id']}"
+    assert response.headers["Upload-Offset"] == "0"
+
+    # Validate that the upload was recorded and its binary staged
+    uploads = await test_db_session.execute(select(Upload))
+    uploads = uploads.scalars().all()
+    assert len(uploads) == 1
+    assert uploads[0].owner_username == "test-user"
+    assert os.path.isfile(
+        os.path.join(TEST_STORAGE, ".partial", upload["id"], "upload")
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_upload_001_anomalous_disallowed_extension(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 001 - Anomalous
+    Conditions: Filename has a disallowed extension
+    Result: HTTP 422 - "File type .bat not allowed"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.post(
+        "uploads/", headers=headers, json={"filename": "test_script.bat", "size": 10}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == "File type .bat not allowed"
+    uploads = await test_db_session.execute(select(Upload))
+    assert uploads.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_create_upload_002_anomalous_oversized_file(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: Declared size is over the allowed size
+    Result: HTTP 422 - "File size is 430061B, which exceeds the maximum allowed size of 1000B"
+    """
+    monkeypatch.setenv(
+        "CONFIG_PATH", os.path.join(CONFIGS, "config_low_filesize_limit.json")
+    )
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    response = client.post(
+        "uploads/",
+        headers=headers,
+        json={"filename": "test_file1.jpeg", "size": 430061},
+    )
+    assert response.status_code == 422
+    assert (
+        response.json()["detail"]
+        == "File size is 430061B, which exceeds the maximum allowed size of 1000B"
+    )
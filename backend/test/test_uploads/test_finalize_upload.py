@@ -0,0 +1,125 @@
+"""
+tests/test_finalize_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for POST uploads/<upload_id>/finalize and DELETE uploads/<upload_id>
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+from sqlalchemy import select
+
+from app.models.models import File, Upload
+from app.packages.storage_driver.is_file_present import is_file_present
+from test.conftest import TEST_CONTENT, TEST_STORAGE, TEST_FILE_SHA256
+from test.test_uploads.test_append_upload_chunk import create_upload, append_chunk
+
+
+@pytest.mark.asyncio
+async def test_finalize_upload_000_nominal(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: Upload fully received in chunks
+    Result: HTTP 201 - File object returned, binary stored and upload removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        content = file.read()
+    upload_id = create_upload(client, headers)
+    for offset in range(0, len(content), 200000):
+        append_chunk(
+            client, headers, upload_id, offset, content[offset : offset + 200000]
+        )
+
+    response = client.post(f"uploads/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 201
+    file_object = response.json()
+    assert file_object["original_filename"] == "test_file1.jpeg"
+    assert file_object["size"] == 430061
+    assert file_object["sha256"] == TEST_FILE_SHA256
+
+    # Validate that the file was stored and attributed to its owner
+    files = await test_db_session.execute(select(File))
+    files = files.scalars().all()
+    assert len(files) == 1
+    assert files[0].owner_username == "test-user"
+    assert is_file_present(file_object["filename"])
+    with open(os.path.join(TEST_STORAGE, file_object["filename"]), "rb") as file:
+        assert file.read() == content
+
+    # Validate that the upload was removed
+    uploads = await test_db_session.execute(select(Upload))
+    assert uploads.scalars().all() == []
+    assert os.listdir(os.path.join(TEST_STORAGE, ".partial")) == []
+
+
+@pytest.mark.asyncio
+async def test_finalize_upload_001_anomalous_incomplete_upload(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 001 - Anomalous
+    Conditions: Only part of the upload has been received
+    Result: HTTP 409 - "Upload is incomplete: 10B of 430061B received"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers)
+    append_chunk(client, headers, upload_id, 0, b"0123456789")
+    response = client.post(f"uploads/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Upload is incomplete: 10B of 430061B received"
+
+
+@pytest.mark.asyncio
+async def test_finalize_upload_002_anomalous_disallowed_mimetype(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: The received content is of a disallowed type
+    Result: HTTP 422 - "File type <mimetype> not allowed" - Upload removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "7z.exe"), "rb") as file:
+        content = file.read()
+    upload_id = create_upload(client, headers, size=len(content))
+    append_chunk(client, headers, upload_id, 0, content)
+    response = client.post(f"uploads/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("File type application/")
+
+    # Validate that the rejected upload was dropped
+    uploads = await test_db_session.execute(select(Upload))
+    assert uploads.scalars().all() == []
+    files = await test_db_session.execute(select(File))
+    assert files.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_abort_upload_000_nominal(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: Upload in progress is aborted by its owner
+    Result: HTTP 204 - Upload and its staged binary removed
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers)
+    append_chunk(client, headers, upload_id, 0, b"0123456789")
+    response = client.delete(f"uploads/{upload_id}", headers=headers)
+    assert response.status_code == 204
+    uploads = await test_db_session.execute(select(Upload))
+    assert uploads.scalars().all() == []
+    assert os.listdir(os.path.join(TEST_STORAGE, ".partial")) == []
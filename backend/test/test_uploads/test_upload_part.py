@@ -0,0 +1,200 @@
+"""
+tests/test_upload_part.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Test the functionality for PUT uploads/<upload_id>/parts/<part_number>
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the Atto-Host project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import pytest
+from sqlalchemy import select
+
+from app.models.models import Upload
+from app.packages.upload.list_upload_parts import (
+    get_upload_part_attempt,
+    get_upload_part_filename,
+)
+from test.conftest import TEST_CONTENT, TEST_STORAGE, TEST_FILE_SHA256
+from test.test_uploads.test_append_upload_chunk import create_upload, append_chunk
+
+
+def upload_part(client, headers, upload_id, part_number, part):
+    return client.put(
+        f"uploads/{upload_id}/parts/{part_number}", headers=headers, content=part
+    )
+
+
+@pytest.mark.asyncio
+async def test_upload_part_000_nominal(
+    monkeypatch, client, test_db_session, seed_jwt, clear_storage_directory
+):
+    """
+    Test 000 - Nominal
+    Conditions: Three parts sent out of order, then the upload is finalized
+    Result: HTTP 201 - The parts are joined in order into the stored file
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    with open(os.path.join(TEST_CONTENT, "test_file1.jpeg"), "rb") as file:
+        content = file.read()
+    upload_id = create_upload(client, headers)
+
+    for part_number, start, end in [
+        (3, 300000, None),
+        (1, 0, 150000),
+        (2, 150000, 300000),
+    ]:
+        response = upload_part(
+            client, headers, upload_id, part_number, content[start:end]
+        )
+        assert response.status_code == 204
+        assert "ETag" in response.headers
+
+    response = client.get(f"uploads/{upload_id}", headers=headers)
+    assert response.json()["parts"] == [
+        {"part_number": 1, "size": 150000},
+        {"part_number": 2, "size": 150000},
+        {"part_number": 3, "size": 130061},
+    ]
+
+    response = client.post(f"uploads/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 201
+    assert response.json()["sha256"] == TEST_FILE_SHA256
+    with open(os.path.join(TEST_STORAGE, response.json()["filename"]), "rb") as file:
+        assert file.read() == content
+    assert os.listdir(os.path.join(TEST_STORAGE, ".partial")) == []
+    uploads = await test_db_session.execute(select(Upload))
+    assert uploads.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_upload_part_001_anomalous_parts_exceed_length(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 001 - Anomalous
+    Conditions: A part would take the parts received past the declared length
+    Result: HTTP 422 - "Parts exceed the upload length of 10B" - Part discarded
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers, size=10)
+    assert upload_part(client, headers, upload_id, 1, b"0" * 6).status_code == 204
+
+    response = upload_part(client, headers, upload_id, 2, b"0" * 6)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Parts exceed the upload length of 10B"
+    response = client.get(f"uploads/{upload_id}", headers=headers)
+    assert response.json()["parts"] == [{"part_number": 1, "size": 6}]
+
+
+@pytest.mark.asyncio
+async def test_upload_part_002_anomalous_missing_part(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 002 - Anomalous
+    Conditions: The upload is finalized before all of its parts are received
+    Result: HTTP 409 - "Upload is incomplete: 150000B of 430061B received"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers)
+    upload_part(client, headers, upload_id, 1, b"0" * 150000)
+
+    response = client.post(f"uploads/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 409
+    assert (
+        response.json()["detail"] == "Upload is incomplete: 150000B of 430061B received"
+    )
+
+
+@pytest.mark.asyncio
+async def test_upload_part_003_anomalous_mixed_with_chunks(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 003 - Anomalous
+    Conditions: A part is sent to an upload which has received sequential chunks
+    Result: HTTP 409 - "Upload is already being sent in sequential chunks"
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers, size=10)
+    append_chunk(client, headers, upload_id, 0, b"0" * 5)
+
+    response = upload_part(client, headers, upload_id, 1, b"0" * 5)
+    assert response.status_code == 409
+    assert (
+        response.json()["detail"] == "Upload is already being sent in sequential chunks"
+    )
+
+
+@pytest.mark.asyncio
+async def test_upload_part_004_nominal_concurrent_attempts(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 004 - Nominal
+    Conditions: A part is sent while an earlier attempt at the same part is still
+    arriving, and then a later attempt fails part way through
+    Result: HTTP 204 - The part always holds the whole of one attempt
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_id = create_upload(client, headers, size=10)
+    part_path = os.path.join(
+        TEST_STORAGE, ".partial", get_upload_part_filename(upload_id, 1)
+    )
+    earlier = await get_upload_part_attempt(upload_id, 1).open()
+    await earlier.write(b"AAAA")
+
+    assert upload_part(client, headers, upload_id, 1, b"BBBBBB").status_code == 204
+    with open(part_path, "rb") as file:
+        assert file.read() == b"BBBBBB"
+    await earlier.write(b"AAAA")
+    await earlier.rename(get_upload_part_filename(upload_id, 1))
+    with open(part_path, "rb") as file:
+        assert file.read() == b"AAAAAAAA"
+
+    assert upload_part(client, headers, upload_id, 1, b"C" * 11).status_code == 422
+    with open(part_path, "rb") as file:
+        assert file.read() == b"AAAAAAAA"
+    assert os.listdir(os.path.join(TEST_STORAGE, ".partial")) == [upload_id]
+    assert sorted(os.listdir(os.path.dirname(part_path))) == ["part00001", "upload"]
+
+
+@pytest.mark.asyncio
+async def test_upload_part_005_nominal_staged_per_upload(
+    monkeypatch, client, seed_jwt, clear_storage_directory
+):
+    """
+    Test 005 - Nominal
+    Conditions: Parts are sent to two uploads, and then one of them is aborted
+    Result: HTTP 204 - Each upload lists only its own parts, which are staged in a
+    directory of its own that is removed with the upload
+    """
+    monkeypatch.setenv("STORAGE_PATH", TEST_STORAGE)
+    headers = {"Authorization": f"Bearer {seed_jwt}"}
+    upload_ids = [create_upload(client, headers, size=10) for _ in range(2)]
+    assert upload_part(client, headers, upload_ids[0], 1, b"0" * 4).status_code == 204
+    assert upload_part(client, headers, upload_ids[1], 2, b"0" * 6).status_code == 204
+    assert upload_part(client, headers, upload_ids[1], 1, b"0" * 3).status_code == 204
+
+    response = client.get(f"uploads/{upload_ids[0]}", headers=headers)
+    assert response.json()["parts"] == [{"part_number": 1, "size": 4}]
+    response = client.get(f"uploads/{upload_ids[1]}", headers=headers)
+    assert response.json()["parts"] == [
+        {"part_number": 1, "size": 3},
+        {"part_number": 2, "size": 6},
+    ]
+
+    assert client.delete(f"uploads/{upload_ids[1]}", headers=headers).status_code == 204
+    assert not os.path.exists(os.path.join(TEST_STORAGE, ".partial", upload_ids[1]))
+    response = client.get(f"uploads/{upload_ids[0]}", headers=headers)
+    assert response.json()["parts"] == [{"part_number": 1, "size": 4}]